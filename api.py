@@ -0,0 +1,250 @@
+"""
+视频分析 HTTP 服务
+
+启动:
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+主要接口:
+    POST /jobs/analysis        提交分析任务（返回 202 和任务信息，队列已满时返回 429）
+    POST /jobs/compose         提交视频合成任务
+    POST /compose/estimate     构建合成时间线并估算渲染耗时（不渲染）
+    GET  /jobs                 任务列表
+    GET  /jobs/{id}            任务状态
+    GET  /jobs/{id}/result     任务结果（未完成时返回 409）
+    GET  /jobs/{id}/stream     以 NDJSON 流式返回已完成的片段
+    POST /jobs/{id}/cancel     取消任务（终止正在运行的 ffmpeg 子进程）
+"""
+import os
+import sys
+import json
+import types
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core.processor import VideoProcessor
+from core.composer import VideoComposer, VideoSegment
+from core.jobs import Job, JobManager, JobQueueFullError
+from core.resources import default_governor
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisRequest(BaseModel):
+    urls: List[str]
+    threshold: float = 0.7
+    priority: str = '综合评分'
+    dimensions: Optional[Dict[str, Any]] = None
+
+
+class ComposeRequest(BaseModel):
+    segments: List[Dict[str, Any]]
+    settings: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ServiceState:
+    """跨请求共享的资源：语义模型、维度嵌入缓存、合成器和任务管理器"""
+
+    def __init__(self):
+        self.model = None
+        self.embedding_cache: Dict[str, Any] = {}
+        self.composer: Optional[VideoComposer] = None
+        self.jobs = JobManager(max_concurrent=config.API_MAX_CONCURRENT_JOBS,
+                               max_queued=config.API_MAX_QUEUED_JOBS)
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+        logger.info("加载语义模型...")
+        self.model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        self.composer = VideoComposer({
+            'TRANSITION_TYPES': config.TRANSITION_TYPES,
+            'RENDERER': config.RENDERER,
+            'CAPTION_FONT_NAME': config.CAPTION_FONT_NAME,
+            'CAPTION_FONT_FILE': config.CAPTION_FONT_FILE,
+            'RENDER_WORKERS': config.RENDER_WORKERS,
+            'MAX_OPEN_READERS': config.MAX_OPEN_READERS,
+            'RENDER_CACHE': config.RENDER_CACHE,
+            'RENDER_CACHE_MAX_BYTES': config.RENDER_CACHE_MAX_BYTES,
+            'RENDITIONS': config.RENDITIONS,
+            'HLS_SEGMENT_TIME': config.HLS_SEGMENT_TIME,
+            'PREVIEW_RESOLUTION': config.PREVIEW_RESOLUTION,
+            'PREVIEW_FPS': config.PREVIEW_FPS,
+            'PREVIEW_ENCODE_PROFILE': config.PREVIEW_ENCODE_PROFILE
+        })
+
+    def new_processor(self, dimensions: Optional[Dict]) -> VideoProcessor:
+        processor_config = types.SimpleNamespace(
+            PROCESS_STEPS=['subtitles', 'analysis', 'matching'],
+            DEFAULT_DIMENSIONS=dimensions or config.DEFAULT_DIMENSIONS
+        )
+        return VideoProcessor(processor_config, model=self.model,
+                              embedding_cache=self.embedding_cache)
+
+
+state = ServiceState()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state.load()
+    yield
+    state.jobs.shutdown(wait=False)
+
+
+app = FastAPI(title="AI视频分析服务", lifespan=lifespan)
+
+
+def _segment_dict(segment) -> Dict[str, Any]:
+    return dict(segment.__dict__, score=float(segment.score))
+
+
+def _submit(kind: str, fn, params: Dict) -> Dict:
+    try:
+        job = state.jobs.submit(kind, fn, params)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "10"})
+    return job.to_dict()
+
+
+def _get_job(job_id: str) -> Job:
+    job = state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return job
+
+
+@app.post("/jobs/analysis", status_code=202)
+async def submit_analysis(request: AnalysisRequest):
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="urls 不能为空")
+    settings = {'threshold': request.threshold, 'priority': request.priority}
+
+    def run(job: Job):
+        processor = state.new_processor(request.dimensions)
+        segments = processor.process_pipeline(
+            request.urls, settings,
+            on_segment=lambda seg: job.add_result(_segment_dict(seg)),
+            token=job.token
+        )
+        metrics = processor.last_metrics
+        return {
+            'segment_count': len(segments),
+            'metrics': metrics.to_dict() if metrics else None
+        }
+
+    return _submit('analysis', run, request.dict())
+
+
+@app.post("/jobs/compose", status_code=202)
+async def submit_compose(request: ComposeRequest):
+    if not request.segments:
+        raise HTTPException(status_code=400, detail="segments 不能为空")
+    fields = VideoSegment.__dataclass_fields__
+    segments = [VideoSegment(**{k: v for k, v in seg.items() if k in fields})
+                for seg in request.segments]
+
+    def run(job: Job):
+        settings = dict(request.settings)
+        settings.setdefault('output_name', f"composed_{job.id}.mp4")
+        # 渲染进度（已输出秒数、倍速、预计剩余时间）写入任务状态，可通过 GET /jobs/{id} 查看
+        progress = lambda p: job.update_progress(**p.to_dict())
+        if settings.get('preview'):
+            # 草稿预览：低分辨率、低帧率、最快编码
+            output_path = state.composer.compose_preview(segments, settings, progress=progress, token=job.token)
+            job.add_result({'output_path': output_path})
+            return {'output_path': output_path}
+        if settings.get('renditions') or settings.get('hls'):
+            # 多档输出（可选 HLS）：一次解码，按档位分别编码
+            outputs = state.composer.compose_renditions(segments, settings, progress=progress, token=job.token)
+            job.add_result({'outputs': outputs})
+            return {'outputs': outputs}
+        output_path = state.composer.compose_video(segments, settings, progress=progress, token=job.token)
+        job.add_result({'output_path': output_path})
+        return {'output_path': output_path}
+
+    return _submit('compose', run, {'segment_count': len(segments), 'settings': request.settings})
+
+
+@app.post("/compose/estimate")
+async def estimate_compose(request: ComposeRequest):
+    if not request.segments:
+        raise HTTPException(status_code=400, detail="segments 不能为空")
+    fields = VideoSegment.__dataclass_fields__
+    segments = [VideoSegment(**{k: v for k, v in seg.items() if k in fields})
+                for seg in request.segments]
+    try:
+        timeline = await asyncio.to_thread(state.composer.build_timeline, segments, request.settings, False)
+        estimate = await asyncio.to_thread(state.composer.estimate_render, timeline, request.settings)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {'timeline': timeline.to_dict(), 'estimate': estimate}
+
+
+@app.get("/jobs")
+async def list_jobs():
+    return {
+        'active': state.jobs.active_count,
+        'saturated': state.jobs.saturated,
+        'jobs': [job.to_dict() for job in state.jobs.list_jobs()]
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return _get_job(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = _get_job(job_id)
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"任务尚未完成: {job.status}")
+    return job.to_dict(include_results=True)
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    job = _get_job(job_id)
+    if not state.jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"任务已结束: {job.status}")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    job = _get_job(job_id)
+    loop = asyncio.get_running_loop()
+
+    async def events():
+        offset = 0
+        while True:
+            items, finished = await loop.run_in_executor(None, job.wait_for_results, offset, 5.0)
+            for item in items:
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            offset += len(items)
+            if finished and not items:
+                yield json.dumps({'job': job.to_dict()}, ensure_ascii=False) + "\n"
+                break
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/health")
+async def health():
+    governor = default_governor()
+    return {
+        'status': 'ok',
+        'model_loaded': state.model is not None,
+        'scratch_bytes': governor.scratch_bytes,
+        'throttled': governor.throttle_stats()
+    }
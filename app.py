@@ -3,7 +3,6 @@ import os
 import logging
 from datetime import datetime
 import pandas as pd
-import numpy as np
 import sys
 import asyncio
 import requests
@@ -13,7 +12,6 @@ import uuid
 from typing import Dict, List, Any, Optional
 import nest_asyncio
 import platform
-import subprocess
 import glob  # 添加glob导入
 import shutil
 from manage_projects import delete_project as manage_delete_project
@@ -436,6 +434,8 @@ from ui.components.dimension_editor_fixed import DimensionEditor
 from ui.components.video_preview import VideoPreview
 from core.processor import VideoProcessor
 from core.composer import VideoComposer, VideoSegment
+from core.timeline import Timeline
+from core.jobs import JobManager, JobQueueFullError
 from config import config
 
 # 配置日志
@@ -451,175 +451,30 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Use Streamlit's caching to prevent repeated disk scans
+# Use Streamlit's caching to prevent repeated project store queries
 @st.cache_data(ttl=60) # Cache for 60 seconds, adjust as needed
 def get_projects_from_disk():
-    """从磁盘读取项目列表 (Cached)"""
-    projects = []
+    """从项目存储读取项目列表 (Cached)"""
     try:
-        session_dir = os.path.join(os.getcwd(), "data", "session")
-        logging.info(f"正在扫描目录 (缓存可能生效): {session_dir}")
-
-        if not os.path.exists(session_dir):
-            os.makedirs(session_dir, exist_ok=True)
-            logging.info(f"创建了目录: {session_dir}")
-            return [] # Return empty list if directory was just created
-
-        files = os.listdir(session_dir)
-        settings_files = [f for f in files if f.endswith('_settings.json')]
-
-        for file in settings_files:
-            project_name = file.replace("_settings.json", "")
-            projects.append(project_name)
-
+        projects = session_state.store.list_projects()
         logging.info(f"找到 {len(projects)} 个项目: {', '.join(projects)}")
-        return sorted(projects)
+        return projects
     except Exception as e:
         logging.error(f"获取项目列表失败: {str(e)}")
         return [] # Return empty list on error
 
-# 在 get_projects_from_disk 函数后添加一个强制删除函数
+# 在 get_projects_from_disk 函数后添加一个删除函数
 def force_delete_project(project_name):
-    """直接使用系统命令强制删除项目文件"""
+    """从项目存储中删除项目及其设置、URL和结果（单个事务）"""
     try:
-        # 获取绝对路径
-        abs_path = os.path.abspath(os.path.join('data', 'session'))
-        settings_file = os.path.join(abs_path, f"{project_name}_settings.json")
-        results_file = os.path.join(abs_path, f"{project_name}_results.json")
-        
         logger.info(f"准备删除项目 '{project_name}'")
-        logger.info(f"设置文件路径: {settings_file}")
-        logger.info(f"结果文件路径: {results_file}")
-        
-        # 使用多种方法尝试删除
-        success = False
-        
-        # 检查文件是否存在
-        if not os.path.exists(settings_file):
-            logger.warning(f"设置文件不存在: {settings_file}")
-            # 如果设置文件不存在，我们认为这是成功的
-            success = True
-        else:
-            # 记录文件属性以便调试
-            try:
-                file_stat = os.stat(settings_file)
-                logger.info(f"文件权限: {oct(file_stat.st_mode)}, 拥有者: {file_stat.st_uid}")
-            except Exception as stat_err:
-                logger.error(f"无法获取文件属性: {str(stat_err)}")
-            
-            # 尝试方法1: 使用os.remove
-            try:
-                logger.info("尝试使用os.remove删除设置文件")
-                os.remove(settings_file)
-                if not os.path.exists(settings_file):
-                    logger.info("成功删除设置文件")
-                    success = True
-                else:
-                    logger.warning("文件仍然存在，尝试其他方法")
-            except PermissionError as perm_err:
-                logger.error(f"权限错误: {str(perm_err)}")
-                # 尝试更改文件权限后再次删除
-                try:
-                    logger.info("尝试更改文件权限后删除")
-                    os.chmod(settings_file, 0o777)
-                    os.remove(settings_file)
-                    if not os.path.exists(settings_file):
-                        logger.info("权限更改后成功删除设置文件")
-                        success = True
-                    else:
-                        logger.warning("更改权限后，文件仍然存在")
-                except Exception as chmod_err:
-                    logger.error(f"更改权限并删除失败: {str(chmod_err)}")
-            except FileNotFoundError:
-                logger.info("文件已不存在，视为删除成功")
-                success = True
-            except Exception as e:
-                logger.error(f"使用os.remove删除设置文件失败: {str(e)}")
-        
-        # 尝试方法2: 使用系统命令(如果文件仍然存在)
-        if os.path.exists(settings_file):
-            try:
-                logger.info("尝试使用系统命令删除设置文件")
-                # 使用subprocess而不是os.system以获取错误输出
-                result = subprocess.run(["rm", "-f", settings_file], 
-                                      capture_output=True, text=True, check=False)
-                
-                if result.returncode != 0:
-                    logger.error(f"系统命令删除失败: {result.stderr}")
-                    logger.debug(f"命令输出: {result.stdout}")
-                else:
-                    logger.info("系统命令删除成功")
-                    if os.path.exists(settings_file):
-                        logger.warning("尽管命令成功执行，文件仍然存在")
-                    else:
-                        success = True
-            except Exception as e:
-                logger.error(f"执行系统命令失败: {str(e)}")
-                
-            # 如果仍然存在，尝试使用shell=True参数
-            if os.path.exists(settings_file):
-                try:
-                    logger.info("尝试使用shell=True方式删除设置文件")
-                    result = subprocess.run(f"rm -f '{settings_file}'", 
-                                          shell=True, capture_output=True, text=True, check=False)
-                    
-                    if result.returncode != 0:
-                        logger.error(f"shell命令删除失败: {result.stderr}")
-                        logger.debug(f"命令输出: {result.stdout}")
-                    else:
-                        logger.info("shell命令删除成功")
-                        if os.path.exists(settings_file):
-                            logger.warning("尽管shell命令成功执行，文件仍然存在")
-                        else:
-                            success = True
-                except Exception as e:
-                    logger.error(f"执行shell命令失败: {str(e)}")
-        
-        # 最后尝试使用sudo（如果可用）
-        if os.path.exists(settings_file):
-            try:
-                logger.info("尝试使用sudo命令删除设置文件")
-                # 注意：这需要用户有sudo权限，而且可能会要求输入密码
-                result = subprocess.run(f"sudo rm -f '{settings_file}'", 
-                                      shell=True, capture_output=True, text=True, check=False)
-                
-                if result.returncode != 0:
-                    logger.error(f"sudo命令删除失败: {result.stderr}")
-                else:
-                    logger.info("sudo命令删除成功")
-                    success = not os.path.exists(settings_file)
-            except Exception as e:
-                logger.error(f"执行sudo命令失败: {str(e)}")
-        
-        # 尝试删除结果文件（如果存在）
-        if os.path.exists(results_file):
-            try:
-                logger.info("尝试删除结果文件")
-                os.remove(results_file)
-                logger.info("成功删除结果文件")
-            except PermissionError:
-                logger.warning("删除结果文件时出现权限错误，尝试其他方法")
-                try:
-                    # 尝试使用系统命令删除
-                    subprocess.run(["rm", "-f", results_file], check=False)
-                    if not os.path.exists(results_file):
-                        logger.info("使用系统命令成功删除结果文件")
-                    else:
-                        logger.warning("结果文件删除失败，但这不影响主要功能")
-                except Exception as rm_err:
-                    logger.error(f"使用系统命令删除结果文件失败: {str(rm_err)}")
-            except Exception as e:
-                logger.error(f"删除结果文件失败: {str(e)}")
-                logger.warning("结果文件删除失败，但这不影响主要功能")
-        
-        # 检查最终结果
-        if success or not os.path.exists(settings_file):
+        # 丢弃尚未写入的设置，避免定时保存重新创建该项目
+        session_state.settings_persister.discard(project_name)
+        if session_state.store.delete_project(project_name):
             logger.info(f"成功删除项目 '{project_name}'")
-            return True
         else:
-            logger.error(f"无法删除项目 '{project_name}'，文件仍然存在: {settings_file}")
-            return False
-            
+            logger.warning(f"项目不存在，视为删除成功: {project_name}")
+        return True
     except Exception as e:
         logger.error(f"删除项目过程中发生错误: {str(e)}")
         import traceback
@@ -718,7 +573,7 @@ def main():
         logger.info("没有找到任何项目，正在创建默认项目...")
         default_project_name = "default"
         # 保存默认设置到新项目
-        if session_state.save_settings(default_project_name):
+        if session_state.save_settings(default_project_name, immediate=True):
             logger.info(f"已自动创建默认项目: {default_project_name}")
             # 设置当前项目为默认项目
             st.session_state['current_project'] = default_project_name
@@ -877,7 +732,7 @@ def main():
                                 get_projects_from_disk.clear()
                                 st.rerun() # Rerun to update UI
                             else:
-                                st.error(f"删除项目失败，请检查权限或手动删除文件")
+                                st.error(f"删除项目失败，请查看日志")
                                 st.session_state.pop('show_delete_confirm', None) # Hide confirm dialog on failure
                                 st.rerun()
                 
@@ -934,7 +789,7 @@ def main():
         # 处理创建逻辑并显示提示
         if save_clicked:
             if new_project:
-                if session_state.save_settings(new_project):
+                if session_state.save_settings(new_project, immediate=True):
                     st.success(f"项目 '{new_project}' 已创建")
                     st.session_state['current_project'] = new_project
                     # 重新加载页面以更新项目列表
@@ -2435,6 +2290,17 @@ def show_dimension_analysis_tab():
             help="每个维度最多匹配的视频片段数"
         )
         st.session_state.settings['max_clips'] = max_clips
+        
+        # 目标成片时长：按时长和匹配分数自动选择片段（0 表示不限）
+        target_duration = st.number_input(
+            "目标时长(秒)",
+            min_value=0,
+            max_value=600,
+            value=int(st.session_state.settings.get('target_duration', 0)),
+            step=5,
+            help="在不超过该时长的前提下选出加权匹配分数最高的片段（扣除转场重叠和片尾），每个维度最多选“最大片段数量”个；0 表示不限"
+        )
+        st.session_state.settings['target_duration'] = target_duration
     
     # 添加"开始维度分析"按钮
     if st.button("开始维度分析", type="primary"):
@@ -2449,182 +2315,162 @@ def show_dimension_analysis_tab():
         if not urls:
             st.error("请先添加视频URL，再进行分析。")
             return
-            
-        # 显示进度信息
-        with st.spinner("正在分析视频内容..."):
-            try:
-                # 这里添加维度分析的实际处理逻辑
-                # 导入相关模块
-                import time  # 临时使用，实际应用中应该导入实际处理模块
-                
-                # 创建一个示例进度条
-                progress_bar = st.progress(0)
-                for i in range(101):
-                    time.sleep(0.05)  # 模拟处理时间
-                    progress_bar.progress(i)
-                
-                # 模拟生成一些示例结果
-                sample_results = []
-                for i, url in enumerate(urls[:3]):  # 处理前3个URL作为示例
-                    for j in range(3):  # 每个URL生成3个结果
-                        sample_results.append({
-                            'start': float(i * 10 + j * 5),
-                            'end': float(i * 10 + j * 5 + 3),
-                            'text': f"这是来自视频 {i+1} 的第 {j+1} 个匹配片段，与维度相关度为0.{75+j}",
-                            'source': url,
-                            'score': 0.75 + j * 0.05,
-                            'dimension': f"{dimensions.get('level1')} > {dimensions.get('level2', [''])[min(j, len(dimensions.get('level2', [''])) - 1)]}",
-                            'clip_path': None  # 实际应用中应该有真实路径
-                        })
-                
-                # 保存到结果列表
-                st.session_state.results = sample_results
-                
-                # 显示成功信息
-                if sample_results:
-                    st.success(f"分析完成！找到 {len(sample_results)} 个与维度相关的片段。")
-                    
-                    # 添加一个简单的结果预览
-                    st.subheader("结果预览")
-                    for i, result in enumerate(sample_results[:5]):  # 只显示前5个结果
-                        # 创建一个美观的结果卡片
-                        with st.container():
-                            st.markdown(f"### 片段 {i+1} (匹配度: {result['score']:.2f})")
-                            cols = st.columns([3, 2])
-                            
-                            with cols[0]:
-                                # 从维度信息中提取二级维度
-                                dimension_info = result['dimension']
-                                if ' > ' in dimension_info:
-                                    _, second_level = dimension_info.split(' > ', 1)
-                                    st.markdown(f"**维度:** {second_level}")
-                                else:
-                                    st.markdown(f"**维度:** {dimension_info}")
-                                
-                                st.markdown(f"**来源:** {result['source']}")
-                                st.markdown(f"**时间:** {result['start']:.1f}s - {result['end']:.1f}s")
-                                
-                                # 显示片段文字
-                                st.caption(result['text'])
-                                
-                            with cols[1]:
-                                # 如果有视频片段，显示预览
-                                if result['clip_path'] and os.path.exists(result['clip_path']):
-                                    st.video(result['clip_path'])
-                                else:
-                                    st.info("视频片段预览不可用")
-                            
-                            # 添加分隔线
-                            st.markdown("---")
-                    
-                    # 添加"查看详细结果"按钮
-                    if st.button("查看详细结果", key="dim_goto_results", on_click=set_navigate_to_results):
-                        # 按钮点击处理由 set_navigate_to_results 回调函数处理
-                        pass
-                else:
-                    st.warning("未找到与维度相关的内容。请尝试调整维度设置或降低相似度阈值。")
-                    
-            except Exception as e:
-                st.error(f"处理失败: {str(e)}")
-                import traceback
-                st.error(traceback.format_exc())
         
-        # 替换模拟代码，使用真实的视频处理
+        # 获取用户设置
+        user_settings = {
+            'threshold': threshold,
+            'priority': priority,
+            'max_clips': max_clips,
+            'slogan': slogan,
+            'target_duration': target_duration
+        }
+        
+        # 在后台任务中处理视频，页面可以查看进度并随时取消
         try:
-            # 获取视频URL列表
-            urls = st.session_state.settings.get('urls', [])
-            if not urls:
-                st.error("请先添加视频URL，再进行分析。")
-                return
-            
-            # 获取用户设置
-            user_settings = {
-                'threshold': threshold,
-                'priority': priority,
-                'max_clips': max_clips,
-                'slogan': slogan
-            }
-            
-            # 初始化视频处理器
-            video_processor = VideoProcessor()
-            
-            # 创建处理配置
-            class ProcessorConfig:
-                PROCESS_STEPS = ['subtitles', 'analysis', 'matching']
-                DEFAULT_DIMENSIONS = st.session_state.settings.get('dimensions', {
-                    'level1': '品牌认知',
-                    'level2': ['目标人群', '产品特性', '使用场景']
-                })
-            
-            video_processor.config = ProcessorConfig()
-            
-            # 处理视频
-            results = video_processor.process_pipeline(urls, user_settings)
-            
-            # 将结果转换为字典列表以便于UI展示
-            formatted_results = []
-            for result in results:
-                formatted_results.append({
-                    'start': result.start,
-                    'end': result.end,
-                    'text': result.text,
-                    'score': float(result.score),
-                    'source': result.source,
-                    'dimension': result.dimension,
-                    'clip_path': result.clip_path
-                })
-            
-            # 保存到会话状态
-            st.session_state.results = formatted_results
-            
-            # 显示结果
-            if formatted_results:
-                st.success(f"分析完成！找到 {len(formatted_results)} 个与维度相关的片段。")
+            job = get_job_manager().submit(
+                'dimension_analysis',
+                functools.partial(run_dimension_analysis, list(urls), user_settings, dict(dimensions)),
+                {'url_count': len(urls)}
+            )
+            st.session_state['dimension_job_id'] = job.id
+        except JobQueueFullError as e:
+            st.error(f"当前分析任务过多，请稍后再试: {str(e)}")
+    
+    show_dimension_job_status()
+
+@st.cache_resource
+def get_job_manager():
+    """进程内共享的后台任务管理器"""
+    return JobManager(max_concurrent=config.API_MAX_CONCURRENT_JOBS,
+                      max_queued=config.API_MAX_QUEUED_JOBS)
+
+def run_dimension_analysis(urls, user_settings, dimensions, job):
+    """后台执行维度分析（运行在任务线程中，不能访问 st.session_state）"""
+    # 初始化视频处理器
+    video_processor = VideoProcessor()
+    
+    # 创建处理配置
+    class ProcessorConfig:
+        PROCESS_STEPS = ['subtitles', 'analysis', 'matching']
+        DEFAULT_DIMENSIONS = dimensions or {
+            'level1': '品牌认知',
+            'level2': ['目标人群', '产品特性', '使用场景']
+        }
+    
+    video_processor.config = ProcessorConfig()
+    
+    # 处理视频
+    results = video_processor.process_pipeline(
+        urls,
+        user_settings,
+        on_segment=lambda seg: job.add_result(seg.clip_path),
+        token=job.token
+    )
+    
+    # 将结果转换为字典列表以便于UI展示
+    formatted_results = []
+    for result in results:
+        formatted_results.append({
+            'start': result.start,
+            'end': result.end,
+            'text': result.text,
+            'score': float(result.score),
+            'source': result.source,
+            'dimension': result.dimension,
+            'clip_path': result.clip_path
+        })
+    
+    return {'results': formatted_results, 'metrics': video_processor.last_metrics}
+
+def show_dimension_job_status():
+    """显示后台维度分析任务的进度和结果"""
+    job_id = st.session_state.get('dimension_job_id')
+    job = get_job_manager().get(job_id) if job_id else None
+    if job is None:
+        return
+    
+    if not job.done:
+        status_text = "排队中..." if job.status == 'queued' else f"正在分析视频内容... 已提取 {len(job.results)} 个片段"
+        st.info(status_text)
+        if st.button("取消分析", key="cancel_dimension_job"):
+            get_job_manager().cancel(job_id)
+            st.warning("正在取消分析，将在当前片段处理完成前终止...")
+        # 定期刷新页面以更新进度
+        time.sleep(1)
+        st.rerun()
+        return
+    
+    if job.status == 'cancelled':
+        st.warning("分析已取消。")
+        return
+    if job.status == 'failed':
+        st.error(f"处理失败: {job.error}")
+        return
+    
+    formatted_results = job.result['results']
+    # 任务结果只写入会话一次，避免覆盖用户之后的修改
+    if st.session_state.get('dimension_job_applied') != job_id:
+        st.session_state.results = formatted_results
+        session_state.save_results(formatted_results)
+        st.session_state['dimension_job_applied'] = job_id
+    
+    # 显示各阶段性能统计
+    metrics = job.result.get('metrics')
+    if metrics:
+        with st.expander("性能统计", expanded=False):
+            st.caption(f"运行ID: {metrics.run_id}，总耗时 {metrics.total_wall_time:.2f} 秒")
+            st.dataframe(pd.DataFrame(metrics.summary_rows()), use_container_width=True)
+            st.download_button(
+                "下载Prometheus指标",
+                metrics.to_prometheus(),
+                f"analysis_{metrics.run_id}.prom",
+                "text/plain",
+                key="download_pipeline_metrics"
+            )
+    
+    # 显示结果
+    if formatted_results:
+        st.success(f"分析完成！找到 {len(formatted_results)} 个与维度相关的片段。")
+        
+        # 添加一个简单的结果预览
+        st.subheader("结果预览")
+        for i, result in enumerate(formatted_results[:5]):  # 只显示前5个结果
+            # 创建一个美观的结果卡片
+            with st.container():
+                st.markdown(f"### 片段 {i+1} (匹配度: {result['score']:.2f})")
+                cols = st.columns([3, 2])
                 
-                # 添加一个简单的结果预览
-                st.subheader("结果预览")
-                for i, result in enumerate(formatted_results[:5]):  # 只显示前5个结果
-                    # 创建一个美观的结果卡片
-                    with st.container():
-                        st.markdown(f"### 片段 {i+1} (匹配度: {result['score']:.2f})")
-                        cols = st.columns([3, 2])
-                        
-                        with cols[0]:
-                            # 从维度信息中提取二级维度
-                            dimension_info = result['dimension']
-                            if ' > ' in dimension_info:
-                                _, second_level = dimension_info.split(' > ', 1)
-                                st.markdown(f"**维度:** {second_level}")
-                            else:
-                                st.markdown(f"**维度:** {dimension_info}")
-                            
-                            st.markdown(f"**来源:** {result['source']}")
-                            st.markdown(f"**时间:** {result['start']:.1f}s - {result['end']:.1f}s")
-                            
-                            # 显示片段文字
-                            st.caption(result['text'])
-                            
-                        with cols[1]:
-                            # 如果有视频片段，显示预览
-                            if result['clip_path'] and os.path.exists(result['clip_path']):
-                                st.video(result['clip_path'])
-                            else:
-                                st.info("视频片段预览不可用")
-                            
-                            # 添加分隔线
-                            st.markdown("---")
+                with cols[0]:
+                    # 从维度信息中提取二级维度
+                    dimension_info = result['dimension']
+                    if ' > ' in dimension_info:
+                        _, second_level = dimension_info.split(' > ', 1)
+                        st.markdown(f"**维度:** {second_level}")
+                    else:
+                        st.markdown(f"**维度:** {dimension_info}")
                     
-                    # 添加"查看详细结果"按钮
-                    if st.button("查看详细结果", key="dim_goto_results", on_click=set_navigate_to_results):
-                        # 按钮点击处理由 set_navigate_to_results 回调函数处理
-                        pass
-            else:
-                st.warning("未找到与维度相关的内容。请尝试调整维度设置或降低相似度阈值。")
+                    st.markdown(f"**来源:** {result['source']}")
+                    st.markdown(f"**时间:** {result['start']:.1f}s - {result['end']:.1f}s")
+                    
+                    # 显示片段文字
+                    st.caption(result['text'])
+                    
+                with cols[1]:
+                    # 如果有视频片段，显示预览
+                    if result['clip_path'] and os.path.exists(result['clip_path']):
+                        st.video(result['clip_path'])
+                    else:
+                        st.info("视频片段预览不可用")
                 
-        except Exception as e:
-            st.error(f"处理失败: {str(e)}")
-            import traceback
-            st.error(traceback.format_exc())
+                # 添加分隔线
+                st.markdown("---")
+        
+        # 添加"查看详细结果"按钮
+        if st.button("查看详细结果", key="dim_goto_results", on_click=set_navigate_to_results):
+            # 按钮点击处理由 set_navigate_to_results 回调函数处理
+            pass
+    else:
+        st.warning("未找到与维度相关的内容。请尝试调整维度设置或降低相似度阈值。")
 
 def show_keyword_analysis_tab():
     """关键词分析标签页内容"""
@@ -2833,13 +2679,199 @@ def show_keyword_analysis_tab():
             </div>
             """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_composer():
+    """进程内共享的视频合成器"""
+    return VideoComposer({
+        'TRANSITION_TYPES': config.TRANSITION_TYPES,
+        'RENDERER': config.RENDERER,
+        'CAPTION_FONT_NAME': config.CAPTION_FONT_NAME,
+        'CAPTION_FONT_FILE': config.CAPTION_FONT_FILE,
+        'RENDER_WORKERS': config.RENDER_WORKERS,
+        'MAX_OPEN_READERS': config.MAX_OPEN_READERS,
+        'RENDER_CACHE': config.RENDER_CACHE,
+        'RENDER_CACHE_MAX_BYTES': config.RENDER_CACHE_MAX_BYTES,
+        'RENDITIONS': config.RENDITIONS,
+        'HLS_SEGMENT_TIME': config.HLS_SEGMENT_TIME,
+        'PREVIEW_RESOLUTION': config.PREVIEW_RESOLUTION,
+        'PREVIEW_FPS': config.PREVIEW_FPS,
+        'PREVIEW_ENCODE_PROFILE': config.PREVIEW_ENCODE_PROFILE
+    })
+
+def run_compose(segments, settings, job, preview=False):
+    """后台执行视频合成或草稿预览（运行在任务线程中，不能访问 st.session_state）"""
+    compose = get_composer().compose_preview if preview else get_composer().compose_video
+    output_path = compose(
+        segments, settings,
+        progress=lambda p: job.update_progress(**p.to_dict()),
+        token=job.token
+    )
+    return {'output_path': output_path}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def estimate_compose(segment_rows, compose_settings):
+    """构建合成时间线并估算渲染耗时 (Cached)
+
+    按片段（含片段文件修改时间）和合成设置缓存，页面重新运行时不再逐个探测片段。
+    返回 (时间线字典, 估算结果)。
+    """
+    segments = [
+        VideoSegment(start=start, end=end, text=text, score=score, source=source, clip_path=clip_path)
+        for start, end, text, score, source, clip_path, _ in segment_rows
+    ]
+    composer = get_composer()
+    timeline = composer.build_timeline(segments, compose_settings, conform=False)
+    return timeline.to_dict(), composer.estimate_render(timeline, compose_settings)
+
+def show_compose_section(results):
+    """视频合成：选择合成设置，渲染前查看时间线和预计渲染耗时"""
+    st.subheader("视频合成")
+    
+    segments = [
+        VideoSegment(start=r.get('start', 0), end=r.get('end', 0), text=r.get('text', ''),
+                     score=float(r.get('score', 0)), source=r.get('source', ''), clip_path=r.get('clip_path'))
+        for r in results if r.get('clip_path') and os.path.exists(r['clip_path'])
+    ]
+    if not segments:
+        st.info("没有可用的片段文件，无法合成视频。")
+        return
+    
+    transitions = list(config.TRANSITION_TYPES) + ['none']
+    profiles = list(config.ENCODE_PROFILES)
+    renderers = ['moviepy', 'ffmpeg']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        transition = st.selectbox("转场效果", transitions, key="compose_transition")
+    with col2:
+        encode_profile = st.selectbox(
+            "编码配置", profiles,
+            index=profiles.index(config.DEFAULT_ENCODE_PROFILE) if config.DEFAULT_ENCODE_PROFILE in profiles else 0,
+            key="compose_encode_profile"
+        )
+    with col3:
+        renderer = st.selectbox("渲染后端", renderers,
+                                index=renderers.index(config.RENDERER) if config.RENDERER in renderers else 0,
+                                key="compose_renderer")
+    slogan = st.text_input("片尾标语（可选）", key="compose_slogan")
+    compose_settings = {
+        'transition': transition,
+        'encode_profile': encode_profile,
+        'renderer': renderer,
+        'slogan': slogan
+    }
+    
+    # 渲染前构建时间线并估算耗时（不转换片段，结果缓存）
+    segment_rows = tuple(
+        (seg.start, seg.end, seg.text, seg.score, seg.source, seg.clip_path, os.stat(seg.clip_path).st_mtime_ns)
+        for seg in segments
+    )
+    try:
+        timeline_dict, estimate = estimate_compose(segment_rows, compose_settings)
+        timeline = Timeline.from_dict(timeline_dict)
+    except Exception as e:
+        st.error(f"无法构建合成时间线: {str(e)}")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("成片时长", f"{estimate['duration']:.1f}秒")
+    with col2:
+        st.metric("片段数", estimate['clips'])
+    with col3:
+        st.metric("预计渲染耗时", f"{estimate['estimated_seconds']:.0f}秒")
+    if not estimate['samples']:
+        st.caption("尚无该渲染后端和编码配置的实测编码速度，按默认速度估算。")
+    
+    previous = st.session_state.get('last_compose_timeline')
+    if previous:
+        try:
+            diff = timeline.diff(Timeline.from_dict(previous))
+            st.caption(f"与上次合成相比：{diff['changed']} 个分段变化（{diff['changed_seconds']:.1f}秒），"
+                       f"{diff['unchanged']} 个分段未变化")
+        except Exception as e:
+            logging.warning(f"比较合成时间线失败: {str(e)}")
+    
+    with st.expander("时间线（JSON）", expanded=False):
+        st.json(timeline_dict)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        # 低分辨率、低帧率、最快编码的草稿，用于检查片段顺序和转场
+        preview = st.button("快速预览", key="start_preview", use_container_width=True)
+    with col2:
+        start = st.button("开始合成", key="start_compose", use_container_width=True)
+    if preview or start:
+        settings = dict(compose_settings, output_name=f"composed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
+        try:
+            job = get_job_manager().submit(
+                'preview' if preview else 'compose',
+                functools.partial(run_compose, segments, settings, preview=preview),
+                {'segment_count': len(segments)}
+            )
+            st.session_state['compose_job_id'] = job.id
+            if start:
+                st.session_state['last_compose_timeline'] = timeline_dict
+        except JobQueueFullError as e:
+            st.error(f"当前任务过多，请稍后再试: {str(e)}")
+    
+    show_compose_job_status()
+
+def show_compose_job_status():
+    """显示后台合成（或草稿预览）任务的状态和结果"""
+    job_id = st.session_state.get('compose_job_id')
+    job = get_job_manager().get(job_id) if job_id else None
+    if job is None:
+        return
+    label = "预览" if job.kind == 'preview' else "合成"
+    
+    if not job.done:
+        progress = dict(job.progress)
+        if job.status == 'queued':
+            st.info("排队中...")
+        elif 'fraction' in progress:
+            speed = f"{progress['speed']:.2f}x" if progress.get('speed') else "-"
+            eta = f"{progress['eta']:.0f}秒" if progress.get('eta') is not None else "-"
+            st.progress(progress['fraction'],
+                        text=f"已编码 {progress['seconds']:.1f}/{progress['total']:.1f} 秒，"
+                             f"速度 {speed}，预计剩余 {eta}")
+        else:
+            st.info("正在准备片段...")
+        if st.button(f"取消{label}", key="cancel_compose_job"):
+            get_job_manager().cancel(job_id)
+            st.warning(f"正在取消{label}，将终止正在运行的编码...")
+        # 定期刷新页面以更新进度
+        time.sleep(1)
+        st.rerun()
+        return
+    
+    if job.status == 'cancelled':
+        st.warning(f"{label}已取消。")
+        return
+    if job.status == 'failed':
+        st.error(f"{label}失败: {job.error}")
+        return
+    
+    output_path = job.result['output_path']
+    st.success(f"{label}完成: {output_path}")
+    if os.path.exists(output_path):
+        st.video(output_path)
+
 def show_results_page():
     """显示结果管理页面"""
     st.header("结果管理")
     st.markdown("查看和导出处理结果，管理生成的视频片段和分析数据。")
     
+    project = st.session_state.get('current_project') or 'default'
+    store = session_state.store
+    summary = store.segment_summary(project)
+    
+    # 会话中有尚未写入项目存储的结果时先保存
+    if summary['count'] == 0 and st.session_state.get('results'):
+        session_state.save_results(st.session_state.results, project)
+        summary = store.segment_summary(project)
+    
     # 检查是否有结果
-    if 'results' not in st.session_state or not st.session_state.results:
+    if summary['count'] == 0:
         st.warning("尚未有分析结果，请先进行视频分析。")
         
         if st.button("前往视频分析"):
@@ -2848,60 +2880,90 @@ def show_results_page():
             
         return
     
-    # 结果摘要
+    # 结果摘要（在项目存储中聚合统计，不加载全部片段）
     st.subheader("结果摘要")
     
-    results = st.session_state.results
-    
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("匹配片段数", len(results))
+        st.metric("匹配片段数", summary['count'])
     
     with col2:
-        avg_score = np.mean([r.get('score', 0) for r in results])
-        st.metric("平均匹配分数", f"{avg_score:.2f}")
+        st.metric("平均匹配分数", f"{summary['avg_score'] or 0:.2f}")
     
     with col3:
-        total_duration = sum([r.get('end', 0) - r.get('start', 0) for r in results])
-        st.metric("总时长", f"{total_duration:.1f}秒")
+        st.metric("总时长", f"{summary['total_duration']:.1f}秒")
     
-    # 添加分析描述
+    dimension_names = [d['dimension'] or '未分类' for d in summary['dimensions']]
+    with st.expander("各维度统计", expanded=False):
+        st.dataframe(pd.DataFrame([
+            {'维度': name, '片段数': d['count'], '平均分数': round(d['avg_score'] or 0, 3),
+             '总时长(秒)': round(d['total_duration'], 1)}
+            for name, d in zip(dimension_names, summary['dimensions'])
+        ]), use_container_width=True, hide_index=True)
+    
+    # 筛选、排序和分页
     st.subheader("分析描述")
-    st.markdown("以下是视频片段按维度和关键词组织的分析结果，按匹配分数从高到低排序。")
+    sort_options = {'匹配分数': 'score', '开始时间': 'start', '片段时长': 'duration', '原始顺序': 'position'}
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        dimension_choice = st.selectbox("维度", ['全部'] + dimension_names, key="results_dimension")
+    with col2:
+        keyword_filter = st.text_input("关键词", value="", placeholder="在关键词和文本中搜索", key="results_keyword")
+    with col3:
+        min_score = st.slider("最低匹配分数", 0.0, 1.0, 0.0, 0.05, key="results_min_score")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_label = st.selectbox("排序", list(sort_options), key="results_sort")
+    with col2:
+        descending = st.checkbox("降序", value=True, key="results_descending")
+    with col3:
+        page_size = st.selectbox("每页片段数", [20, 50, 100], index=0, key="results_page_size")
     
-    # 按维度和关键词组织结果
+    filters = {
+        'dimension': None if dimension_choice == '全部' else ('' if dimension_choice == '未分类' else dimension_choice),
+        'keyword': keyword_filter.strip() or None,
+        'min_score': min_score if min_score > 0 else None
+    }
+    # 筛选条件变化时回到第一页
+    filter_key = (project, tuple(filters.values()), sort_label, descending, page_size)
+    if st.session_state.get('results_filter_key') != filter_key:
+        st.session_state['results_filter_key'] = filter_key
+        st.session_state['results_page'] = 1
+    
+    total = store.count_segments(project, **filters)
+    page_count = max(1, (total + page_size - 1) // page_size)
+    if st.session_state['results_page'] > page_count:
+        st.session_state['results_page'] = page_count
+    page_number = st.number_input(f"页码（共 {page_count} 页，{total} 个片段）", min_value=1, max_value=page_count,
+                                  key="results_page")
+    offset = (page_number - 1) * page_size
+    results, total = store.query_segments(project, **filters, sort=sort_options[sort_label],
+                                          descending=descending, offset=offset, limit=page_size)
+    
+    if not results:
+        st.info("没有符合筛选条件的片段。")
+    
+    # 当前页的片段按维度和关键词分组显示
     dimension_keyword_mapping = {}
-    
-    # 收集维度和关键词信息
-    for seg in results:
+    for index, seg in enumerate(results, start=offset + 1):
         dimension = seg.get('dimension', '未分类')
         keyword = seg.get('keyword', '未知关键词')
-        
         key = f"{dimension}：【{keyword}】"
-        if key not in dimension_keyword_mapping:
-            dimension_keyword_mapping[key] = []
-        
-        dimension_keyword_mapping[key].append(seg)
+        dimension_keyword_mapping.setdefault(key, []).append((index, seg))
     
-    # 排序并显示结果
     for key, segments in dimension_keyword_mapping.items():
-        # 按匹配分数从高到低排序
-        segments.sort(key=lambda x: x.get('score', 0), reverse=True)
-        
-        # 显示维度和关键词
         st.markdown(f"### {key}")
         
-        # 为每个分组创建一个可折叠的部分
-        with st.expander(f"查看 {len(segments)} 个匹配片段", expanded=True):
-            for i, seg in enumerate(segments):
+        with st.expander(f"本页 {len(segments)} 个匹配片段", expanded=True):
+            for i, (index, seg) in enumerate(segments):
                 score = seg.get('score', 0)
                 source = seg.get('source', '')
                 start = seg.get('start', 0)
                 end = seg.get('end', 0)
                 text = seg.get('text', '')
                 
-                st.markdown(f"**[{i+1}] 匹配分数: {score:.2f}**")
+                st.markdown(f"**[{index}] 匹配分数: {score:.2f}**")
                 st.markdown(f"- **视频URL**: {source}")
                 st.markdown(f"- **时间段**: {start:.1f}秒 - {end:.1f}秒")
                 st.markdown(f"- **内容描述**: {text}")
@@ -2910,14 +2972,17 @@ def show_results_page():
                 if i < len(segments) - 1:
                     st.markdown("---")
     
+    if not results:
+        return
+    
     # 详细预览
     st.subheader("详细预览")
     
-    # 选择片段
+    # 选择片段（当前页）
     selected_idx = st.selectbox(
         "选择片段查看详情",
         range(len(results)),
-        format_func=lambda i: f"片段 {i+1}: {results[i].get('text', '')[:30]}..."
+        format_func=lambda i: f"片段 {offset+i+1}: {results[i].get('text', '')[:30]}..."
     )
     
     if selected_idx is not None:
@@ -2926,7 +2991,7 @@ def show_results_page():
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            st.subheader(f"片段 {selected_idx+1}")
+            st.subheader(f"片段 {offset+selected_idx+1}")
             st.write(f"**时间段**: {seg.get('start', 0):.1f}-{seg.get('end', 0):.1f}秒")
             st.write(f"**匹配分数**: {seg.get('score', 0):.2f}")
             
@@ -2955,7 +3020,7 @@ def show_results_page():
                 preview = VideoPreview()
                 preview_img = preview._generate_segment_preview(
                     seg, 
-                    f"片段 {selected_idx+1}", 
+                    f"片段 {offset+selected_idx+1}", 
                     st.session_state.settings
                 )
                 
@@ -2995,37 +3060,37 @@ def show_results_page():
                     data=clip_bytes,
                     file_name=clip_filename,
                     mime="video/mp4",
-                    key=f"download_clip_{selected_idx}"
+                    key=f"download_clip_{seg.get('id', selected_idx)}"
                 )
     
-    # 导出结果
-    st.subheader("导出结果")
-    
-    # 准备导出数据 - 直接使用JSON格式，按照维度和关键词组织
-    organized_data = {}
-    for dimension_key, segments in dimension_keyword_mapping.items():
-        organized_data[dimension_key] = []
-        for seg in segments:
-            item = {
-                "score": seg.get('score', 0),
-                "source": seg.get('source', ''),
-                "start": seg.get('start', 0),
-                "end": seg.get('end', 0),
-                "text": seg.get('text', '')  # 确保包含文本内容
+    # 视频合成和导出使用全部符合筛选条件的片段（按原有顺序）：点击后才从项目存储加载并保存在会话中，
+    # 页面每次运行只查询当前页和聚合统计；筛选条件或结果变化后需要重新加载
+    full_key = (project, tuple(filters.values()), summary['count'], summary['total_duration'])
+    full = st.session_state.get('results_full')
+    if full is not None and full['key'] != full_key:
+        full = None
+    
+    if full is None:
+        st.subheader("视频合成")
+        st.caption("合成视频和下载JSON需要全部符合筛选条件的片段。")
+        if st.button(f"加载全部片段（{total} 个）", key="load_full_results"):
+            filtered_results, _ = store.query_segments(project, **filters, sort='position', descending=False,
+                                                       limit=None)
+            st.session_state['results_full'] = {
+                'key': full_key,
+                'results': filtered_results,
+                # 将数据转换为JSON字符串
+                'json': json.dumps(organize_results(filtered_results), ensure_ascii=False, indent=2)
             }
-            
-            # 添加关键词信息（如果存在）
-            if 'keyword' in seg:
-                item["keyword"] = seg.get('keyword', '')
-            
-            # 添加维度信息（如果存在）
-            if 'dimension' in seg:
-                item["dimension"] = seg.get('dimension', '')
-            
-            organized_data[dimension_key].append(item)
+            st.rerun()
+        # 已提交的合成任务继续显示进度
+        show_compose_job_status()
+    else:
+        # 视频合成
+        show_compose_section(full['results'])
     
-    # 将数据转换为JSON字符串
-    json_str = json.dumps(organized_data, ensure_ascii=False, indent=2)
+    # 导出结果
+    st.subheader("导出结果")
     
     # 分两列显示
     col1, col2 = st.columns(2)
@@ -3034,21 +3099,47 @@ def show_results_page():
         # 显示JSON格式说明
         st.info("JSON格式包含完整的文本内容和关键词信息")
         
-        # 直接显示下载按钮，无需额外点击
-        st.download_button(
-            "下载JSON",
-            json_str,
-            "analysis_results.json",
-            "application/json",
-            key="download_json",
-            use_container_width=True
-        )
+        if full is not None:
+            st.download_button(
+                "下载JSON",
+                full['json'],
+                "analysis_results.json",
+                "application/json",
+                key="download_json",
+                use_container_width=True
+            )
+        else:
+            st.caption("加载全部片段后可下载。")
     
     with col2:
         # 在页面上直接显示JSON结果的摘要
-        st.info("预览JSON结果（点击展开查看完整内容）")
+        st.info("预览当前页的JSON结果（下载文件包含全部符合筛选条件的片段）")
         with st.expander("JSON内容", expanded=False):
-            st.json(organized_data)
+            st.json(organize_results(results))
+
+def organize_results(segments):
+    """导出数据：按照维度和关键词组织，组内按匹配分数从高到低"""
+    organized = {}
+    for seg in sorted(segments, key=lambda x: x.get('score', 0), reverse=True):
+        dimension_key = f"{seg.get('dimension', '未分类')}：【{seg.get('keyword', '未知关键词')}】"
+        item = {
+            "score": seg.get('score', 0),
+            "source": seg.get('source', ''),
+            "start": seg.get('start', 0),
+            "end": seg.get('end', 0),
+            "text": seg.get('text', '')  # 确保包含文本内容
+        }
+        
+        # 添加关键词信息（如果存在）
+        if 'keyword' in seg:
+            item["keyword"] = seg.get('keyword', '')
+        
+        # 添加维度信息（如果存在）
+        if 'dimension' in seg:
+            item["dimension"] = seg.get('dimension', '')
+        
+        organized.setdefault(dimension_key, []).append(item)
+    return organized
 
 # CSV文件导入URL工具函数
 def import_urls_from_csv(uploaded_file):
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+无界面批处理入口
+
+示例:
+    python batch.py run data/input/videos.csv -o data/output/nightly --workers 8
+    python batch.py run videos.csv --project default
+
+多主机共享一个批次（队列文件和输出目录放在共享存储上）:
+    python batch.py enqueue videos.csv --queue /mnt/shared/queue.db --batch nightly -o /mnt/shared/nightly
+    python batch.py worker --queue /mnt/shared/queue.db --processes 4     # 在每台主机上启动
+    python batch.py status --queue /mnt/shared/queue.db --batch nightly
+    python batch.py collect --queue /mnt/shared/queue.db --batch nightly
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core.processor import VideoProcessor
+from core.metrics import PipelineMetrics
+from core.work_queue import WorkQueue
+from session.store import ProjectStore
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(verbose: bool = False):
+    """配置日志"""
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("logs/batch.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+
+def load_settings(args) -> dict:
+    """加载设置：项目设置（项目存储中的项目或JSON文件，可选）+ 命令行覆盖"""
+    settings = {}
+    if args.project:
+        settings = ProjectStore(args.project_store).load_settings(args.project)
+        if settings is None:
+            raise SystemExit(f"项目不存在: {args.project}")
+    elif args.settings:
+        with open(args.settings, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+    if args.dimensions:
+        with open(args.dimensions, 'r', encoding='utf-8') as f:
+            settings['dimensions'] = json.load(f)
+    if not settings.get('dimensions'):
+        settings['dimensions'] = config.DEFAULT_DIMENSIONS
+    if args.threshold is not None:
+        settings['threshold'] = args.threshold
+    return settings
+
+
+def cmd_run(args) -> int:
+    """读取CSV清单并批量处理"""
+    settings = load_settings(args)
+    processor = VideoProcessor(config)
+    urls = processor.iter_csv_urls(args.manifest)
+    segments = processor.batch_process(
+        urls,
+        settings,
+        output_dir=args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size
+    )
+    print(f"完成：共提取 {len(segments)} 个片段")
+    return 0
+
+
+def cmd_enqueue(args) -> int:
+    """把CSV清单作为一个批次写入共享队列"""
+    settings = load_settings(args)
+    batch_id = args.batch or datetime.now().strftime("batch_%Y%m%d_%H%M%S")
+    output_dir = os.path.abspath(args.output or os.path.join("data", "output", batch_id))
+    os.makedirs(output_dir, exist_ok=True)
+    work_queue = WorkQueue(args.queue)
+    # 仅解析CSV，不需要加载模型
+    urls = VideoProcessor.iter_csv_urls(args.manifest)
+    added = work_queue.create_batch(batch_id, urls, settings, output_dir)
+    print(f"批次 {batch_id}：新入队 {added} 个视频，输出目录 {output_dir}")
+    return 0
+
+
+def _queue_worker_main(queue_path: str, batch_id, lease_seconds: float, forever: bool) -> int:
+    work_queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    processor = VideoProcessor(config)
+    return processor.run_queue_worker(work_queue, batch_id=batch_id, forever=forever)
+
+
+def _queue_worker_process(queue_path, batch_id, lease_seconds, forever, verbose):
+    setup_logging(verbose)
+    _queue_worker_main(queue_path, batch_id, lease_seconds, forever)
+
+
+def cmd_worker(args) -> int:
+    """工作进程模式：从共享队列领取任务，可在多台主机上同时运行"""
+    if args.processes <= 1:
+        processed = _queue_worker_main(args.queue, args.batch, args.lease, args.forever)
+        print(f"处理了 {processed} 个任务")
+        return 0
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=_queue_worker_process,
+                         args=(args.queue, args.batch, args.lease, args.forever, args.verbose))
+             for _ in range(args.processes)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return 0 if all(proc.exitcode == 0 for proc in procs) else 1
+
+
+def cmd_status(args) -> int:
+    counts = WorkQueue(args.queue).stats(args.batch)
+    total = sum(counts.values())
+    print(" ".join(f"{status}={n}" for status, n in counts.items()) + f" total={total}")
+    return 0
+
+
+def cmd_collect(args) -> int:
+    """汇总批次结果：segments.jsonl、batch_report.json 和合并后的运行剖析"""
+    work_queue = WorkQueue(args.queue)
+    batch = work_queue.get_batch(args.batch)
+    if batch is None:
+        print(f"批次不存在: {args.batch}")
+        return 1
+    output_dir = args.output or batch['output_dir']
+    os.makedirs(output_dir, exist_ok=True)
+
+    metrics = PipelineMetrics(run_id=args.batch)
+    video_count = 0
+    segment_count = 0
+    with open(os.path.join(output_dir, "segments.jsonl"), 'w', encoding='utf-8') as f:
+        for item in work_queue.iter_results(args.batch):
+            video_count += 1
+            result = item['result']
+            if result.get('metrics'):
+                metrics.merge_dict(result['metrics'])
+            for seg in result.get('segments', []):
+                f.write(json.dumps(seg, ensure_ascii=False) + "\n")
+                segment_count += 1
+    metrics.save(os.path.join(output_dir, "batch.profile.json"))
+
+    counts = work_queue.stats(args.batch)
+    with open(os.path.join(output_dir, "batch_report.json"), 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": "1.0",
+            "batch_id": args.batch,
+            "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "video_count": video_count,
+            "segment_count": segment_count,
+            "task_status": counts,
+            "failed_tasks": work_queue.failures(args.batch)
+        }, f, ensure_ascii=False, indent=2)
+    print(f"已汇总 {video_count} 个视频、{segment_count} 个片段到 {output_dir}"
+          + (f"（仍有 {counts['pending'] + counts['running']} 个任务未完成）"
+             if counts['pending'] + counts['running'] else ""))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="AI视频分析系统 - 批处理命令行")
+    parser.add_argument('-v', '--verbose', action='store_true', help="输出调试日志")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="处理CSV清单中的所有视频")
+    run.add_argument('manifest', help="包含视频URL的CSV文件")
+    run.add_argument('-o', '--output', default=None, help="结果输出目录")
+    run.add_argument('-w', '--workers', type=int, default=None, help="工作进程数（默认CPU核数）")
+    run.add_argument('--chunk-size', type=int, default=10, help="每个任务包含的视频数")
+    run.add_argument('--settings', default=None, help="项目设置JSON文件")
+    run.add_argument('--project', default=None, help="使用项目存储中该项目的设置（优先于 --settings）")
+    run.add_argument('--project-store', default=os.path.join('data', 'session', 'projects.db'), help="项目存储数据库文件")
+    run.add_argument('--dimensions', default=None, help="维度结构JSON文件（包含 level1/level2）")
+    run.add_argument('--threshold', type=float, default=None, help="相似度阈值")
+    run.set_defaults(func=cmd_run)
+
+    enqueue = subparsers.add_parser('enqueue', help="把CSV清单写入共享任务队列")
+    enqueue.add_argument('manifest', help="包含视频URL的CSV文件")
+    enqueue.add_argument('--queue', required=True, help="队列数据库文件（放在共享存储上）")
+    enqueue.add_argument('--batch', default=None, help="批次ID（默认按时间生成）")
+    enqueue.add_argument('-o', '--output', default=None, help="批次输出目录（各主机都需可访问）")
+    enqueue.add_argument('--settings', default=None, help="项目设置JSON文件")
+    enqueue.add_argument('--project', default=None, help="使用项目存储中该项目的设置（优先于 --settings）")
+    enqueue.add_argument('--project-store', default=os.path.join('data', 'session', 'projects.db'), help="项目存储数据库文件")
+    enqueue.add_argument('--dimensions', default=None, help="维度结构JSON文件")
+    enqueue.add_argument('--threshold', type=float, default=None, help="相似度阈值")
+    enqueue.set_defaults(func=cmd_enqueue)
+
+    worker = subparsers.add_parser('worker', help="从共享队列领取并处理任务")
+    worker.add_argument('--queue', required=True, help="队列数据库文件")
+    worker.add_argument('--batch', default=None, help="只处理指定批次")
+    worker.add_argument('-p', '--processes', type=int, default=1, help="本机启动的工作进程数")
+    worker.add_argument('--lease', type=float, default=300.0, help="任务租约时长（秒）")
+    worker.add_argument('--forever', action='store_true', help="队列为空时继续等待新任务")
+    worker.set_defaults(func=cmd_worker)
+
+    status = subparsers.add_parser('status', help="查看队列进度")
+    status.add_argument('--queue', required=True, help="队列数据库文件")
+    status.add_argument('--batch', default=None, help="批次ID")
+    status.set_defaults(func=cmd_status)
+
+    collect = subparsers.add_parser('collect', help="汇总批次结果到输出目录")
+    collect.add_argument('--queue', required=True, help="队列数据库文件")
+    collect.add_argument('--batch', required=True, help="批次ID")
+    collect.add_argument('-o', '--output', default=None, help="输出目录（默认使用批次输出目录）")
+    collect.set_defaults(func=cmd_collect)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    setup_logging(args.verbose)
+    try:
+        return args.func(args)
+    except Exception as e:
+        logger.error(f"批处理失败: {str(e)}", exc_info=True)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""合成测试视频语料：ffmpeg lavfi 测试图案 + 正弦音频"""
+import os
+import subprocess
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+def generate_video(path: str, duration: float, width: int, height: int,
+                   fps: int = 30, frequency: int = 440):
+    """生成一个带测试图案和单音音轨的 H.264/AAC 视频"""
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency={frequency}:sample_rate=48000:duration={duration}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', '-g', str(fps * 2),
+        '-c:a', 'aac', '-b:a', '128k', '-ac', '2',
+        '-shortest', '-movflags', '+faststart',
+        path
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def build_corpus(directory: str, count: int, duration: float, width: int, height: int,
+                 fps: int = 30) -> List[str]:
+    """
+    生成（或复用）语料目录下的 count 个视频，返回文件路径列表
+
+    相同参数的语料会被复用，参数编码在文件名中。
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        name = f"synthetic_{width}x{height}_{fps}fps_{int(duration)}s_{i:03d}.mp4"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            logger.info(f"生成合成视频: {path}")
+            generate_video(path, duration, width, height, fps, frequency=440 + 40 * (i % 10))
+        paths.append(path)
+    return paths
@@ -0,0 +1,26 @@
+"""本地 HTTP 文件服务器，在基准测试中代替 OSS"""
+import os
+import threading
+import functools
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import Iterator
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory: str, host: str = '127.0.0.1') -> Iterator[str]:
+    """在后台线程中提供目录下载，产出服务根URL（如 http://127.0.0.1:54321）"""
+    handler = functools.partial(_QuietHandler, directory=os.path.abspath(directory))
+    server = ThreadingHTTPServer((host, 0), handler)
+    thread = threading.Thread(target=server.serve_forever, name="bench-oss", daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
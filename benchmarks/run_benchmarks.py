@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+端到端基准测试：合成视频语料 + 本地HTTP服务（代替OSS）
+
+分别测量下载、字幕、匹配、片段提取、视频合成以及端到端的吞吐量，
+结果写入 benchmarks/results/，并与 benchmarks/baseline.json 中同一语料配置的基线比较，
+任一阶段吞吐量低于基线超过容差时以非零状态退出。
+
+示例:
+    python -m benchmarks.run_benchmarks --count 4 --duration 30 --resolution 1280x720
+    python -m benchmarks.run_benchmarks --update-baseline
+"""
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from benchmarks.corpus import build_corpus
+from benchmarks.oss_server import serve_directory
+from core.processor import VideoProcessor
+from core.composer import VideoComposer, VideoSegment as ComposeSegment
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(current_dir, "baseline.json")
+RESULTS_DIR = os.path.join(current_dir, "results")
+CORPUS_DIR = os.path.join(project_root, "data", "cache", "bench_corpus")
+STAGES = ['download', 'subtitles', 'matching', 'extraction', 'composition', 'end_to_end']
+
+
+def measure(stage: str, fn: Callable[[], Tuple[int, float, int]]) -> Dict:
+    """运行 fn 并计时；fn 返回 (条目数, 媒体时长秒数, 字节数)"""
+    logger.info(f"开始测量阶段: {stage}")
+    start = time.perf_counter()
+    items, media_seconds, nbytes = fn()
+    wall = time.perf_counter() - start
+    result = {
+        'wall_time': round(wall, 4),
+        'items': items,
+        'items_per_sec': round(items / wall, 4) if wall > 0 else 0.0,
+        'media_seconds_per_sec': round(media_seconds / wall, 4) if wall > 0 else 0.0,
+        'mb_per_sec': round(nbytes / 1024 / 1024 / wall, 4) if wall > 0 else 0.0,
+        'bytes': nbytes
+    }
+    logger.info(f"{stage}: {result}")
+    return result
+
+
+def corpus_signature(args) -> str:
+    return f"{args.count}x{args.resolution}@{args.fps}fps_{int(args.duration)}s"
+
+
+def run_benchmarks(args) -> Dict:
+    width, height = (int(v) for v in args.resolution.lower().split('x'))
+    paths = build_corpus(CORPUS_DIR, args.count, args.duration, width, height, args.fps)
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+
+    processor = VideoProcessor(types.SimpleNamespace(
+        PROCESS_STEPS=['subtitles', 'analysis', 'matching'],
+        DEFAULT_DIMENSIONS=Config.DEFAULT_DIMENSIONS
+    ))
+    processor.clips_dir = os.path.join(work_dir, "clips")
+    processor.output_dir = os.path.join(work_dir, "output")
+    os.makedirs(processor.clips_dir, exist_ok=True)
+    composer = VideoComposer({
+        'OUTPUT_DIR': os.path.join(work_dir, "videos"),
+        'TEMP_DIR': os.path.join(work_dir, "temp")
+    })
+    # 阈值设为0，使所有片段都进入提取和合成阶段
+    settings = {'threshold': 0.0, 'priority': '综合评分'}
+    compose_settings = {'transition': args.transition, 'resolution': (width, height), 'fps': args.fps,
+                        'renderer': args.renderer, 'smart_render': args.smart_render,
+                        'render_workers': args.render_workers}
+    local_by_name = {os.path.basename(p): p for p in paths}
+    stages: Dict[str, Dict] = {}
+
+    try:
+        with serve_directory(CORPUS_DIR) as base_url:
+            urls = [f"{base_url}/{os.path.basename(p)}" for p in paths]
+
+            def download():
+                nbytes = 0
+                for url in urls:
+                    path = processor.download_video(url)
+                    if not path:
+                        raise RuntimeError(f"下载失败: {url}")
+                    nbytes += os.path.getsize(path)
+                    processor._discard_download(path, url)
+                return len(urls), args.duration * len(urls), nbytes
+
+            subtitles: List = []
+
+            def generate_subtitles():
+                subtitles.extend(processor._generate_subtitles(urls))
+                return len(subtitles), 0.0, 0
+
+            matched: List = []
+
+            def match():
+                matched.extend(processor._match_segments(subtitles, settings['threshold'], settings['priority']))
+                return len(subtitles), 0.0, 0
+
+            clips: List[ComposeSegment] = []
+
+            def extract():
+                media = 0.0
+                nbytes = 0
+                for seg in matched:
+                    local_path = local_by_name[os.path.basename(seg.source)]
+                    clip_path = processor.extract_video_segment(local_path, seg.start, seg.end, seg.dimension)
+                    if not clip_path:
+                        raise RuntimeError(f"片段提取失败: {seg.source} {seg.start}-{seg.end}")
+                    clips.append(ComposeSegment(seg.start, seg.end, seg.text, seg.score, seg.source, clip_path))
+                    media += seg.end - seg.start
+                    nbytes += os.path.getsize(clip_path)
+                return len(matched), media, nbytes
+
+            def compose(profile=None):
+                run_settings = dict(compose_settings, output_name="bench_compose.mp4")
+                if profile:
+                    run_settings['encode_profile'] = profile
+                output = composer.compose_video(clips, run_settings)
+                media = sum(c.end - c.start for c in clips)
+                return len(clips), media, os.path.getsize(output)
+
+            def end_to_end():
+                segments = processor.process_pipeline(urls, settings)
+                compose_segments = [ComposeSegment(s.start, s.end, s.text, s.score, s.source, s.clip_path)
+                                    for s in segments]
+                composer.compose_video(compose_segments, dict(compose_settings, output_name="bench_e2e.mp4"))
+                return len(urls), args.duration * len(urls), 0
+
+            runners = {
+                'download': download,
+                'subtitles': generate_subtitles,
+                'matching': match,
+                'extraction': extract,
+                'composition': compose,
+                'end_to_end': end_to_end
+            }
+            for stage in STAGES:
+                if stage in args.stages:
+                    stages[stage] = measure(stage, runners[stage])
+                # 按编码配置分别测量合成阶段的耗时和输出大小
+                if stage == 'composition' and stage in args.stages:
+                    for profile in args.profiles:
+                        name = f"composition[{profile}]"
+                        stages[name] = measure(name, lambda p=profile: compose(p))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'version': '1.0',
+        'run_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'signature': corpus_signature(args),
+        'corpus': {'count': args.count, 'duration': args.duration,
+                   'resolution': args.resolution, 'fps': args.fps},
+        'stages': stages
+    }
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """返回吞吐量低于基线超过容差的阶段描述"""
+    regressions = []
+    reference = baseline.get(results['signature'], {})
+    for stage, data in results['stages'].items():
+        expected = reference.get(stage)
+        if not expected:
+            continue
+        floor = expected * (1 - tolerance)
+        if data['items_per_sec'] < floor:
+            regressions.append(f"{stage}: {data['items_per_sec']:.3f} 条目/秒 < 基线 {expected:.3f} "
+                               f"(容差 {tolerance:.0%})")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="视频处理流水线基准测试")
+    parser.add_argument('--count', type=int, default=4, help="合成视频数量")
+    parser.add_argument('--duration', type=float, default=30.0, help="每个视频时长（秒）")
+    parser.add_argument('--resolution', default='1280x720', help="分辨率，如 1280x720")
+    parser.add_argument('--fps', type=int, default=30, help="帧率")
+    parser.add_argument('--transition', default='fade', help="合成阶段使用的转场")
+    parser.add_argument('--renderer', default='moviepy', choices=['moviepy', 'ffmpeg'], help="合成渲染后端")
+    parser.add_argument('--smart-render', action='store_true', help="合成阶段使用智能渲染")
+    parser.add_argument('--render-workers', type=int, default=0, help="ffmpeg 后端并行渲染的分段数（0 为CPU核数）")
+    parser.add_argument('--profiles', nargs='*', default=[], choices=list(Config.ENCODE_PROFILES),
+                        help="额外按这些编码配置测量合成阶段（耗时和输出大小）")
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES, help="要测量的阶段")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的吞吐量下降比例")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="基线文件")
+    parser.add_argument('--update-baseline', action='store_true', help="用本次结果更新基线")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    results = run_benchmarks(args)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"基准测试结果已保存至 {result_path}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline[results['signature']] = {stage: data['items_per_sec']
+                                          for stage, data in results['stages'].items()}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if results['signature'] not in baseline:
+        print(f"基线中没有语料配置 {results['signature']}，跳过回归检查（使用 --update-baseline 记录基线）")
+        return 0
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("吞吐量回归:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("所有阶段均未低于基线")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
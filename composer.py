@@ -1,17 +1,35 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import List, Dict, Any, Tuple, Optional
+from collections import OrderedDict
 import os
+import time
+import uuid
 import logging
+import threading
 import numpy as np
 # 使用修复版的moviepy导入
 from core.fixed_imports.moviepy_fixed import (
     VideoFileClip, 
-    TextClip, 
-    CompositeVideoClip, 
+    VideoClip,
+    AudioClip,
     concatenate_videoclips,
     ColorClip,
     vfx
 )
+from core.ffmpeg_tools import run_ffmpeg, probe_media
+from core.ffmpeg_renderer import FFmpegRenderer, ClipInput, RenderSpec, xfade_transition, concat_pieces
+from core import smart_render
+from core.parallel_render import ParallelRenderer
+from core.encoding import ffmpeg_encode_args, moviepy_write_kwargs
+from core.subtitles import caption_events, subtitles_filter, write_ass
+from core.clip_store import ClipStore, ConformTarget
+from core.render_cache import RenderCache
+from core.end_cards import EndCardCache
+from core.renditions import parse_ladder, render_renditions
+from core.timeline import Timeline
+from core.encode_stats import EncodeStats
+from core.cancellation import CancellationToken, PipelineCancelled
+from core.progress import ProgressCallback, ProgressTracker, moviepy_progress_logger
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +43,46 @@ class VideoSegment:
     source: str   # 视频源（URL或文件路径）
     clip_path: Optional[str] = None  # 提取的片段文件路径
 
+class ClipReaderPool:
+    """
+    片段读取器池：渲染游标到达片段时才打开 VideoFileClip（含 ffmpeg 读取子进程），
+    游标越过后关闭已消费的片段，并限制同时打开的读取器数量（超出时关闭最久未用的）
+    """
+    
+    def __init__(self, paths: List[str], max_open: int = 8):
+        self.paths = paths
+        self.max_open = max(1, max_open)
+        self._open: "OrderedDict[int, VideoFileClip]" = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, index: int) -> VideoFileClip:
+        with self._lock:
+            clip = self._open.get(index)
+            if clip is not None:
+                self._open.move_to_end(index)
+                return clip
+            # 时间线按顺序渲染，之前的片段已消费完毕
+            for consumed in [i for i in self._open if i < index]:
+                self._close(consumed)
+            while len(self._open) >= self.max_open:
+                self._close(next(iter(self._open)))
+            clip = VideoFileClip(self.paths[index])
+            self._open[index] = clip
+            return clip
+    
+    def close_all(self):
+        with self._lock:
+            for index in list(self._open):
+                self._close(index)
+    
+    def _close(self, index: int):
+        clip = self._open.pop(index)
+        try:
+            clip.close()
+        except Exception as e:
+            logger.debug(f"Error closing clip reader {self.paths[index]}: {str(e)}")
+
+
 class VideoComposer:
     """视频合成引擎：将匹配的片段合成为最终输出视频"""
     
@@ -41,14 +99,47 @@ class VideoComposer:
             'zoom': {'factor': 1.2, 'duration': 1.2},
             'none': {}
         })
+        # 渲染后端：'moviepy'（逐帧合成）或 'ffmpeg'（单进程 xfade 滤镜图）
+        self.renderer = config.get('RENDERER', 'moviepy')
+        self.font_file = config.get('CAPTION_FONT_FILE', '')
+        self.font_name = config.get('CAPTION_FONT_NAME', 'Arial')
+        self.clip_store = ClipStore(config.get('CLIP_STORE_DIR', os.path.join('data', 'clips')))
+        # ffmpeg 后端并行渲染的分段数（0 表示使用全部CPU核）
+        self.render_workers = config.get('RENDER_WORKERS', 0)
+        # 同时打开的片段读取器上限（moviepy 读取器 / 单个 ffmpeg 进程的输入数）
+        self.max_open_readers = config.get('MAX_OPEN_READERS', 16)
+        # 时间线分段渲染缓存（ffmpeg 后端与智能渲染）：重新合成时只渲染哈希变化的分段
+        self.use_render_cache = config.get('RENDER_CACHE', True)
+        self.render_cache = RenderCache(config.get('RENDER_CACHE_DIR', os.path.join('data', 'cache', 'render')),
+                                        config.get('RENDER_CACHE_MAX_BYTES', 0))
+        self.end_cards = EndCardCache(config.get('END_CARD_CACHE_DIR', os.path.join('data', 'cache', 'endcards')))
+        # 多档输出的默认档位与 HLS 分片时长
+        self.renditions = config.get('RENDITIONS', [
+            {'name': '1080p', 'width': 1920, 'height': 1080},
+            {'name': '720p', 'width': 1280, 'height': 720},
+            {'name': '480p', 'width': 854, 'height': 480}
+        ])
+        self.hls_segment_time = config.get('HLS_SEGMENT_TIME', 6.0)
+        # 草稿预览的输出参数
+        self.preview_dir = config.get('PREVIEW_DIR', os.path.join('data', 'output', 'previews'))
+        os.makedirs(self.preview_dir, exist_ok=True)
+        self.preview_resolution = tuple(config.get('PREVIEW_RESOLUTION', (640, 360)))
+        self.preview_fps = config.get('PREVIEW_FPS', 15)
+        self.preview_encode_profile = config.get('PREVIEW_ENCODE_PROFILE', 'draft')
+        # 各渲染后端/编码配置的实测编码速度，用于渲染前估算耗时
+        self.encode_stats = EncodeStats(config.get('ENCODE_STATS_PATH', os.path.join('data', 'cache', 'encode_stats.json')))
     
-    def compose_video(self, segments: List[VideoSegment], settings: Dict) -> str:
+    def compose_video(self, segments: List[VideoSegment], settings: Dict,
+                      progress: Optional[ProgressCallback] = None,
+                      token: Optional[CancellationToken] = None) -> str:
         """
         合成最终视频
         
         Args:
             segments: 视频片段列表
             settings: 用户设置（转场、时长等）
+            progress: 渲染进度回调，接收 RenderProgress（已输出秒数、倍速、预计剩余时间）
+            token: 取消令牌，取消时终止正在运行的编码并抛出 PipelineCancelled
             
         Returns:
             str: 输出视频路径
@@ -58,77 +149,498 @@ class VideoComposer:
             raise ValueError("No segments provided for composition")
         
         try:
-            # 1. 准备片段
-            clips = self._prepare_clips(segments)
-            
-            # 2. 应用转场效果
-            transition = settings.get('transition', 'fade')
-            final_clips = self._apply_transitions(clips, transition, 
-                                              settings.get('transition_duration', 1.0))
-            
-            # 3. 添加文本标语（如果有）
-            if 'slogan' in settings and settings['slogan']:
-                final_clips = self._add_slogan(final_clips, settings['slogan'])
-            
-            # 4. 渲染输出视频
             output_path = os.path.join(self.output_dir, 
                                       settings.get('output_name', 'final_video.mp4'))
-            
-            final_clip = concatenate_videoclips(final_clips)
-            
-            # 设置目标分辨率
-            target_resolution = settings.get('resolution', (1280, 720))
-            if target_resolution != (final_clip.w, final_clip.h):
-                final_clip = final_clip.resize(target_resolution)
-            
-            # 导出视频
-            final_clip.write_videofile(
-                output_path, 
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile=os.path.join(self.temp_dir, 'temp_audio.m4a'),
-                remove_temp=True,
-                fps=settings.get('fps', 30)
-            )
-            
-            logger.info(f"Video successfully composed: {output_path}")
-            return output_path
+            timeline = self.build_timeline(segments, settings, token=token)
+            return self.render_timeline(timeline, output_path, settings, progress=progress, token=token)
             
         except Exception as e:
             logger.error(f"Error composing video: {str(e)}")
             raise
     
-    def _prepare_clips(self, segments: List[VideoSegment]) -> List[VideoFileClip]:
-        """准备视频片段"""
-        clips = []
+    def build_timeline(self, segments: List[VideoSegment], settings: Dict,
+                       conform: Optional[bool] = None, token: Optional[CancellationToken] = None) -> Timeline:
+        """
+        根据片段和用户设置构建合成时间线
+        
+        conform 为 None 时按 settings['conform']（默认 True）把片段统一到输出参数；
+        只用于查看或估算时可传 False，跳过片段转换，但片段存储中已有的统一版本照常使用，
+        使估算时的分段缓存键与实际渲染一致。
+        """
+        use_store = settings.get('conform', True)
+        if conform is None:
+            conform = use_store
+        # 片段统一到输出参数（已统一的片段原样使用，其余转换一次并缓存），之后不再缩放
+        if conform or use_store:
+            segments = self._conform_segments(segments, settings, token, convert=conform)
+        inputs, _ = self._probe_inputs(segments, settings.get('captions', True), token)
+        return Timeline(
+            clips=inputs,
+            spec=self._render_spec(settings),
+            transition_type=settings.get('transition', 'fade'),
+            encode_profile=settings.get('encode_profile')
+        )
+    
+    def render_timeline(self, timeline: Timeline, output_path: str, settings: Optional[Dict] = None,
+                        progress: Optional[ProgressCallback] = None,
+                        token: Optional[CancellationToken] = None) -> str:
+        """
+        渲染时间线到 output_path
+        
+        输出内容和参数全部来自时间线；settings 只提供渲染选项
+        （renderer、smart_render、render_cache、render_workers、max_open_readers）。
+        """
+        settings = settings or {}
+        if not timeline.clips:
+            raise ValueError("No usable clips for composition")
+        tracker = ProgressTracker(timeline.duration, progress)
+        
+        # 0. 快速路径：无转场、无字幕、无标语且片段参数一致时，直接用 concat demuxer 流复制拼接
+        if self._can_stream_copy(timeline):
+            self._concat_stream_copy([clip.path for clip in timeline.clips], output_path, tracker, token)
+            tracker.finish()
+            logger.info(f"Video composed by stream copy: {output_path}")
+            return output_path
+        
+        # 智能渲染：只重新编码转场/字幕/片尾窗口，片段内部流复制；条件不满足时走完整渲染
+        if settings.get('smart_render', False) and self._compose_smart(timeline, settings, output_path,
+                                                                       tracker, token):
+            tracker.finish()
+            logger.info(f"Video successfully composed by smart render: {output_path}")
+            return output_path
+        
+        backend = self._backend(settings)
+        cache = self._render_cache(settings) if backend == 'ffmpeg' else None
+        encoded_seconds = timeline.uncached_seconds(
+            cache, self.end_cards.contains(timeline.spec, timeline.encode_profile))
+        started = time.time()
+        if backend == 'ffmpeg':
+            self._compose_ffmpeg(timeline, settings, output_path, tracker, token)
+        else:
+            self._compose_moviepy(timeline, settings, output_path, tracker, token)
+        tracker.finish()
+        # 记录实测编码速度，供下次渲染前估算耗时
+        self.encode_stats.record(backend, timeline.encode_profile, encoded_seconds,
+                                 timeline.spec.width, timeline.spec.height, time.time() - started)
+        logger.info(f"Video successfully composed with {backend}: {output_path}")
+        return output_path
+    
+    def estimate_render(self, timeline: Timeline, settings: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        渲染前估算耗时：按需要实际编码的时长（扣除已缓存的分段和片尾）
+        和该后端/编码配置的实测编码速度计算
+        """
+        settings = settings or {}
+        backend = self._backend(settings)
+        cache = self._render_cache(settings) if backend == 'ffmpeg' else None
+        spec = timeline.spec
+        encoded_seconds = timeline.uncached_seconds(cache, self.end_cards.contains(spec, timeline.encode_profile))
+        return {
+            'backend': backend,
+            'duration': timeline.duration,
+            'clips': len(timeline.clips),
+            'encode_seconds': encoded_seconds,
+            'estimated_seconds': self.encode_stats.estimate(backend, timeline.encode_profile, encoded_seconds,
+                                                            spec.width, spec.height),
+            'samples': self.encode_stats.samples(backend, timeline.encode_profile)
+        }
+    
+    def compose_preview(self, segments: List[VideoSegment], settings: Dict,
+                        progress: Optional[ProgressCallback] = None,
+                        token: Optional[CancellationToken] = None) -> str:
+        """
+        草稿预览：按低分辨率、低帧率和最快的编码配置渲染同一条时间线，用于检查片段顺序和转场
+        
+        片段先转换为预览参数的代理文件（由片段存储按参数缓存，之后的预览直接复用），
+        再用 ffmpeg 后端渲染；转场、字幕和片尾与正式合成一致。
+        
+        Returns:
+            str: 预览视频路径
+        """
+        if not segments:
+            logger.error("No segments provided for composition")
+            raise ValueError("No segments provided for composition")
+        
+        width, height = self.preview_resolution
+        preview_settings = dict(
+            settings,
+            resolution=(width, height),
+            fps=settings.get('preview_fps', self.preview_fps),
+            encode_profile=settings.get('preview_encode_profile', self.preview_encode_profile),
+            renderer='ffmpeg',
+            smart_render=False,
+            conform=True
+        )
+        timeline = self.build_timeline(segments, preview_settings, token=token)
+        # ASS 字号以输出高度为坐标系，按比例缩小以保持与正式输出相同的观感
+        timeline.spec = replace(timeline.spec, caption_font_size=max(
+            10, round(timeline.spec.caption_font_size * height / 720)))
+        output_path = os.path.join(self.preview_dir, f"preview_{settings.get('output_name', 'final_video.mp4')}")
+        self.render_timeline(timeline, output_path, preview_settings, progress=progress, token=token)
+        logger.info(f"Draft preview composed: {output_path}")
+        return output_path
+    
+    def compose_renditions(self, segments: List[VideoSegment], settings: Dict,
+                           renditions: Optional[List] = None,
+                           progress: Optional[ProgressCallback] = None,
+                           token: Optional[CancellationToken] = None) -> Dict[str, str]:
+        """
+        多档输出：时间线只解码和滤镜处理一次，split 后按各档分辨率分别编码
+        
+        Args:
+            segments: 视频片段列表
+            settings: 用户设置；settings['hls'] 为 True 时输出 HLS 分片和主播放列表
+            renditions: 输出档位（Rendition 或字典），默认使用配置中的 RENDITIONS
+            progress: 渲染进度回调（同 compose_video）
+            token: 取消令牌
+            
+        Returns:
+            Dict[str, str]: {档位名称: 输出路径}；HLS 模式下另含 'master'
+        """
+        if not segments:
+            logger.error("No segments provided for composition")
+            raise ValueError("No segments provided for composition")
+        
+        ladder = parse_ladder(renditions or settings.get('renditions') or self.renditions)
+        top = ladder[0]
+        # 按最高档统一片段参数，时间线在最高档分辨率上合成
+        timeline = self.build_timeline(segments, dict(settings, resolution=(top.width, top.height)), token=token)
+        stem = os.path.splitext(settings.get('output_name', 'final_video.mp4'))[0]
+        tracker = ProgressTracker(timeline.duration, progress)
+        paths = render_renditions(
+            timeline.clips, timeline.spec, ladder, self.output_dir, stem, self.temp_dir,
+            encode_profile=timeline.encode_profile,
+            hls=settings.get('hls', False),
+            segment_time=settings.get('hls_segment_time', self.hls_segment_time),
+            token=token,
+            progress=tracker.ffmpeg_callback('main')
+        )
+        tracker.finish()
+        logger.info(f"Renditions composed: {paths}")
+        return paths
+    
+    def _conform_segments(self, segments: List[VideoSegment], settings: Dict,
+                          token: Optional[CancellationToken] = None,
+                          convert: bool = True) -> List[VideoSegment]:
+        """
+        把片段替换为符合输出参数的版本；转换失败时保留原片段（由渲染阶段处理）
+
+        convert 为 False 时不转换，只替换为片段存储中已有的统一版本
+        """
+        target = ConformTarget.from_settings(settings)
+        encode_profile = settings.get('encode_profile')
+        conformed = []
+        for segment in segments:
+            if segment.clip_path and os.path.exists(segment.clip_path):
+                try:
+                    if convert:
+                        path = self.clip_store.conform(segment.clip_path, target, encode_profile, token=token)
+                    else:
+                        path = self.clip_store.lookup(segment.clip_path, target, encode_profile, token=token)
+                    segment = replace(segment, clip_path=path or segment.clip_path)
+                except PipelineCancelled:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Failed to conform {segment.clip_path}: {str(e)}")
+            conformed.append(segment)
+        return conformed
+    
+    def _can_stream_copy(self, timeline: Timeline) -> bool:
+        """
+        判断能否走流复制快速路径
+        
+        条件：无转场（或只有一个片段）、不叠加字幕、无片尾标语、片段未裁剪，且所有片段的编码、
+        分辨率、帧率、像素格式和音频参数一致并与目标输出相同。
+        """
+        clips, spec = timeline.clips, timeline.spec
+        if spec.transition and len(clips) > 1:
+            return False
+        if spec.end_card:
+            return False
+        if any(clip.caption for clip in clips):
+            return False
+        if any(clip.start > 0 for clip in clips):
+            return False
+        
+        try:
+            infos = [probe_media(clip.path) for clip in clips]
+        except Exception as e:
+            logger.warning(f"Probe failed, falling back to re-encode: {str(e)}")
+            return False
+        if any(abs(info['duration'] - clip.duration) > 0.01 for info, clip in zip(infos, clips)):
+            return False
+        
+        def signature(info):
+            video, audio = info['video'], info['audio']
+            if not video:
+                return None
+            return (video['codec'], video['profile'], video['width'], video['height'],
+                    round(video['fps'], 3), video['pix_fmt'],
+                    audio and (audio['codec'], audio['sample_rate'], audio['channels']))
+        
+        signatures = {signature(info) for info in infos}
+        if len(signatures) != 1 or None in signatures:
+            logger.info("Clips have different stream parameters, re-encoding")
+            return False
+        
+        video = infos[0]['video']
+        if (video['width'], video['height']) != (spec.width, spec.height):
+            return False
+        if abs(video['fps'] - spec.fps) > 0.01:
+            return False
+        return True
+    
+    def _concat_stream_copy(self, paths: List[str], output_path: str, tracker: Optional[ProgressTracker] = None,
+                            token: Optional[CancellationToken] = None):
+        """使用 ffmpeg concat demuxer 无损拼接（不解码、不重新编码）"""
+        list_path = os.path.join(self.temp_dir, f"{os.path.splitext(os.path.basename(output_path))[0]}.concat.txt")
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for path in paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        try:
+            run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', list_path,
+                        '-c', 'copy', '-movflags', '+faststart', output_path],
+                       token=token, progress=tracker.ffmpeg_callback('copy') if tracker else None)
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+    
+    def _compose_ffmpeg(self, timeline: Timeline, settings: Dict, output_path: str,
+                        tracker: ProgressTracker, token: Optional[CancellationToken] = None):
+        """使用 ffmpeg 滤镜图渲染：转场用 xfade/acrossfade，字幕用 subtitles 滤镜"""
+        inputs = timeline.clips
+        encode_args = ffmpeg_encode_args(timeline.encode_profile)
+        # 片尾使用缓存的预渲染分段，流复制拼接在结尾
+        end_card = self._end_card(timeline.spec, timeline.encode_profile, tracker, token)
+        spec = replace(timeline.spec, end_card=None)
+        workers = self._render_workers(settings)
+        max_inputs = self._max_open_readers(settings)
+        cache = self._render_cache(settings)
+        started = time.time()
+        # 启用渲染缓存时总是按片段分段渲染（每段一个编码进程，最后无损拼接）：首次合成多出
+        # 进程启动和拼接的开销，换来之后修改单个片段、转场或标语时只重新编码对应分段；
+        # 只合成一次的场景可用 settings['render_cache'] = False 或 RENDER_CACHE=0 关闭
+        if cache is not None or (workers > 1 and len(inputs) > 1) or len(inputs) > max_inputs:
+            # 在片段边界切分时间线，各分段由独立的编码进程并行渲染后无损拼接；
+            # 片段数超过读取器上限时也分段渲染，限制同时打开的输入数
+            ParallelRenderer(self.temp_dir, workers, max_inputs, cache=cache).render(
+                inputs, spec, output_path, encode_args, token=token, suffix=end_card, tracker=tracker)
+            if cache is not None:
+                logger.info(f"Render cache: {cache.hits} hits, {cache.misses} misses")
+                cache.prune(since=started)
+            return
+        renderer = FFmpegRenderer(self.temp_dir)
+        if end_card is None:
+            renderer.render(inputs, spec, output_path, encode_args + ['-movflags', '+faststart'],
+                            token=token, progress=tracker.ffmpeg_callback('main'))
+            return
+        main_path = os.path.join(self.temp_dir, f"{os.path.splitext(os.path.basename(output_path))[0]}"
+                                                f"_{uuid.uuid4().hex[:8]}.main.ts")
+        try:
+            duration = renderer.render(inputs, spec, main_path, encode_args + ['-f', 'mpegts'],
+                                       token=token, progress=tracker.ffmpeg_callback('main'))
+            concat_pieces([main_path, end_card[0]], [duration, end_card[1]], output_path, self.temp_dir,
+                          token=token)
+        finally:
+            if os.path.exists(main_path):
+                os.remove(main_path)
+    
+    def _compose_smart(self, timeline: Timeline, settings: Dict, output_path: str,
+                       tracker: ProgressTracker, token: Optional[CancellationToken] = None) -> bool:
+        """智能渲染；片段参数与输出不一致时返回 False，由调用方完整渲染"""
+        inputs = timeline.clips
+        infos = [probe_media(clip.path, token=token) for clip in inputs]
+        reason = smart_render.compatible(infos, timeline.spec)
+        if reason:
+            logger.info(f"Smart render not applicable ({reason}), rendering full timeline")
+            return False
+        spec = replace(timeline.spec, sample_rate=infos[0]['audio']['sample_rate'])
+        # 重新编码的窗口和片尾都与源片段使用相同的 profile/level，拼接后同一轨道内参数集一致
+        stream_args = smart_render.h264_stream_args(infos[0]['video'])
+        end_card = self._end_card(spec, timeline.encode_profile, tracker, token, stream_args=stream_args)
+        spec = replace(spec, end_card=None)
+        keyframes = [smart_render.keyframe_times(clip.path, token=token) for clip in inputs]
+        cache = self._render_cache(settings)
+        started = time.time()
+        renderer = smart_render.SmartRenderer(self.temp_dir, self._render_workers(settings), cache=cache)
+        encode_args = ffmpeg_encode_args(timeline.encode_profile) + stream_args
+        renderer.render(inputs, spec, output_path, encode_args, keyframes,
+                        token=token, suffix=end_card, tracker=tracker)
+        if cache is not None:
+            cache.prune(since=started)
+        return True
+    
+    def _compose_moviepy(self, timeline: Timeline, settings: Dict, output_path: str,
+                         tracker: ProgressTracker, token: Optional[CancellationToken] = None):
+        """使用 moviepy 逐帧合成；进度按已写出的帧数报告，取消时在下一帧中止写出"""
+        spec = timeline.spec
+        
+        # 1. 准备片段（按需打开读取器）
+        pool = ClipReaderPool([], self._max_open_readers(settings))
+        clips, texts = self._prepare_clips(timeline.clips, pool)
+        if not clips:
+            raise ValueError("No usable clips for composition")
+        
+        # 2. 应用转场效果
+        final_clips = self._apply_transitions(clips, timeline.transition_type, spec.transition_duration)
+        
+        # 3. 片尾标语：使用缓存的预渲染片尾，正片写完后流复制拼接到结尾
+        end_card = self._end_card(spec, timeline.encode_profile, tracker, token)
+        
+        # 4. 渲染输出视频
+        final_clip = concatenate_videoclips(final_clips)
+        
+        # 片段参数未统一时才需要整体缩放
+        if (spec.width, spec.height) != (final_clip.w, final_clip.h):
+            final_clip = final_clip.resize((spec.width, spec.height))
         
-        for i, segment in enumerate(segments):
+        # 字幕：整条时间线生成一个 ASS 文件，编码时由 subtitles 滤镜烧录
+        write_kwargs = moviepy_write_kwargs(timeline.encode_profile)
+        write_kwargs['audio_fps'] = spec.sample_rate
+        write_kwargs['logger'] = moviepy_progress_logger(tracker, 'main', spec.fps, token)
+        output_stem = os.path.splitext(os.path.basename(output_path))[0]
+        main_path = (os.path.join(self.temp_dir, f"{output_stem}_{uuid.uuid4().hex[:8]}.main.ts")
+                     if end_card else output_path)
+        subtitles_path = None
+        events = caption_events([(clip.duration, text) for clip, text in zip(clips, texts)])
+        if events:
+            subtitles_path = write_ass(os.path.join(self.temp_dir, f"{output_stem}.captions.ass"),
+                                       events, final_clip.w, final_clip.h, spec.font_name, spec.caption_font_size)
+            write_kwargs['ffmpeg_params'] += ['-vf', subtitles_filter(subtitles_path, spec.font_file)]
+        
+        # 导出视频（临时音频文件按输出名区分，避免并发合成时相互覆盖）
+        try:
+            final_clip.write_videofile(
+                main_path, 
+                temp_audiofile=os.path.join(self.temp_dir, f"{output_stem}.temp-audio.m4a"),
+                remove_temp=True,
+                fps=spec.fps,
+                **write_kwargs
+            )
+            if end_card:
+                concat_pieces([main_path, end_card[0]], [final_clip.duration, end_card[1]],
+                              output_path, self.temp_dir, token=token)
+        finally:
+            pool.close_all()
+            for path in (subtitles_path, main_path if end_card else None):
+                if path and os.path.exists(path):
+                    os.remove(path)
+    
+    def _probe_inputs(self, segments: List[VideoSegment], captions: bool,
+                      token: Optional[CancellationToken] = None) -> Tuple[List[ClipInput], List[Dict]]:
+        """探测片段文件，返回渲染输入及对应的媒体信息"""
+        inputs = []
+        infos = []
+        for segment in segments:
             if not segment.clip_path or not os.path.exists(segment.clip_path):
                 logger.warning(f"Segment clip not found at {segment.clip_path}, skipping.")
                 continue
+            info = probe_media(segment.clip_path, token=token)
+            if not info['video'] or info['duration'] <= 0:
+                logger.warning(f"Segment clip has no video stream, skipping: {segment.clip_path}")
+                continue
+            inputs.append(ClipInput(
+                path=segment.clip_path,
+                duration=info['duration'],
+                has_audio=info['audio'] is not None,
+                caption=segment.text if captions else ""
+            ))
+            infos.append(info)
+        if not inputs:
+            raise ValueError("No usable clips for composition")
+        return inputs, infos
+    
+    def _end_card(self, spec: RenderSpec, encode_profile=None, tracker: Optional[ProgressTracker] = None,
+                  token: Optional[CancellationToken] = None,
+                  stream_args: Optional[List[str]] = None) -> Optional[Tuple[str, float]]:
+        """缓存的片尾分段 (路径, 时长)；未设置标语时返回 None"""
+        if not spec.end_card:
+            return None
+        card = self.end_cards.get(spec, encode_profile, token=token, stream_args=stream_args)
+        if tracker is not None:
+            tracker.update('end_card', card[1])
+        return card
+    
+    def _backend(self, settings: Dict) -> str:
+        return 'ffmpeg' if settings.get('renderer', self.renderer) == 'ffmpeg' else 'moviepy'
+    
+    def _render_cache(self, settings: Dict) -> Optional[RenderCache]:
+        return self.render_cache if settings.get('render_cache', self.use_render_cache) else None
+    
+    def _render_workers(self, settings: Dict) -> int:
+        workers = settings.get('render_workers', self.render_workers)
+        return max(1, workers or os.cpu_count() or 1)
+    
+    def _render_spec(self, settings: Dict) -> RenderSpec:
+        """根据用户设置生成输出参数与时间线效果"""
+        transition = settings.get('transition', 'fade')
+        width, height = settings.get('resolution', (1280, 720))
+        return RenderSpec(
+            width=width,
+            height=height,
+            fps=settings.get('fps', 30),
+            sample_rate=settings.get('sample_rate', 48000),
+            transition=xfade_transition(transition, self.transition_types.get(transition)),
+            transition_duration=settings.get('transition_duration', 1.0),
+            end_card=settings.get('slogan') or None,
+            font_file=self.font_file,
+            font_name=self.font_name
+        )
+    
+    def _max_open_readers(self, settings: Dict) -> int:
+        return max(1, settings.get('max_open_readers', self.max_open_readers))
+    
+    def _prepare_clips(self, inputs: List[ClipInput],
+                       pool: ClipReaderPool) -> Tuple[List[VideoClip], List[str]]:
+        """
+        准备视频片段，返回惰性片段及其对应的字幕文本
+        
+        片段参数由 ffprobe 获取，帧和音频在渲染时才通过读取器池读取，
+        因此长时间线不会一次性占用大量文件描述符和内存。
+        """
+        clips = []
+        texts = []
+        
+        for i, clip_input in enumerate(inputs):
+            if not os.path.exists(clip_input.path):
+                logger.warning(f"Segment clip not found at {clip_input.path}, skipping.")
+                continue
                 
             try:
-                clip = VideoFileClip(segment.clip_path)
-                # 添加字幕
-                if segment.text:
-                    txt_clip = TextClip(
-                        segment.text, 
-                        fontsize=24, 
-                        color='white',
-                        bg_color='rgba(0,0,0,0.5)',
-                        font='Arial',
-                        size=(clip.w * 0.9, None),
-                        method='caption'
-                    ).set_position(('center', 'bottom')).set_duration(clip.duration)
-                    
-                    clip = CompositeVideoClip([clip, txt_clip])
-                
-                clips.append(clip)
-                logger.debug(f"Added clip {i+1}/{len(segments)}: {segment.clip_path}")
+                info = probe_media(clip_input.path)
+                if not info['video']:
+                    logger.warning(f"Segment clip has no video stream, skipping: {clip_input.path}")
+                    continue
+                pool.paths.append(clip_input.path)
+                clips.append(self._lazy_clip(pool, len(pool.paths) - 1, info,
+                                             clip_input.start, clip_input.duration))
+                texts.append(clip_input.caption)
+                logger.debug(f"Added clip {i+1}/{len(inputs)}: {clip_input.path}")
             except Exception as e:
-                logger.error(f"Error loading clip {segment.clip_path}: {str(e)}")
+                logger.error(f"Error loading clip {clip_input.path}: {str(e)}")
+        
+        return clips, texts
+    
+    @staticmethod
+    def _lazy_clip(pool: ClipReaderPool, index: int, info: Dict,
+                   start: float = 0.0, duration: Optional[float] = None) -> VideoClip:
+        """构造不立即打开文件的片段（直接设置属性，避免构造函数读取第一帧）；start/duration 为裁剪区间"""
+        duration = duration or info['duration']
+        clip = VideoClip()
+        clip.make_frame = lambda t: pool.get(index).get_frame(start + t)
+        clip.size = (info['video']['width'], info['video']['height'])
+        clip.fps = info['video']['fps']
+        clip.duration = clip.end = duration
         
-        return clips
+        if info['audio']:
+            audio = AudioClip()
+            audio.make_frame = lambda t: pool.get(index).audio.get_frame(start + t)
+            audio.fps = info['audio']['sample_rate']
+            audio.nchannels = info['audio']['channels']
+            audio.duration = audio.end = duration
+            clip = clip.set_audio(audio)
+        return clip
     
     def _apply_transitions(self, clips: List[VideoFileClip], 
                           transition_type: str, 
@@ -160,42 +672,3 @@ class VideoComposer:
             result_clips.append(clip)
             
         return result_clips
-    
-    def _add_slogan(self, clips: List[VideoFileClip], slogan: str) -> List[VideoFileClip]:
-        """添加宣传语片尾"""
-        if not clips:
-            return []
-            
-        # 获取第一个片段的分辨率作为标准
-        width, height = clips[0].size
-        
-        # 创建片尾标语
-        duration = 5.0  # 宣传语持续5秒
-        
-        txt_clip = TextClip(
-            slogan,
-            fontsize=36,
-            color='white',
-            bg_color='black',
-            font='Arial-Bold',
-            size=(width * 0.8, None),
-            method='caption'
-        ).set_position('center').set_duration(duration)
-        
-        # 创建背景
-        bg_clip = TextClip(
-            " ", 
-            color='white', 
-            bg_color='black',
-            size=(width, height),
-            fontsize=1
-        ).set_duration(duration)
-        
-        # 合成片尾
-        end_clip = CompositeVideoClip([bg_clip, txt_clip])
-        end_clip = end_clip.fadein(1.0)
-        
-        # 添加到片段列表
-        clips.append(end_clip)
-        
-        return clips
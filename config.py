@@ -18,6 +18,38 @@ class Config:
         'slide': {'direction': 'right', 'duration': 0.8},
         'zoom': {'factor': 1.2, 'duration': 1.2}
     }
+    # 合成渲染后端：moviepy（逐帧合成）或 ffmpeg（单进程 xfade 滤镜图）
+    RENDERER = os.getenv('VIDEO_RENDERER', 'moviepy')
+    # 字幕字体：ASS 样式中的字体名，以及可选的字体文件（其所在目录作为 libass 字体目录）
+    CAPTION_FONT_NAME = os.getenv('CAPTION_FONT_NAME', 'Arial')
+    CAPTION_FONT_FILE = os.getenv('CAPTION_FONT_FILE', '')
+    # ffmpeg 后端并行渲染的分段数（0 表示使用全部CPU核）
+    RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', '0'))
+    # 合成时同时打开的片段读取器上限（moviepy 读取器，或所有 ffmpeg 渲染进程的输入总数）
+    MAX_OPEN_READERS = int(os.getenv('MAX_OPEN_READERS', '16'))
+    # 时间线分段渲染缓存（ffmpeg 后端与智能渲染）及其容量上限（0 表示不限制）；
+    # 开启时每个片段单独编码后拼接，首次合成稍慢，重新合成时只编码变化的分段
+    RENDER_CACHE = os.getenv('RENDER_CACHE', '1') != '0'
+    RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', str(10 * 1024 ** 3)))
+    
+    # 编码配置（片段提取和视频合成共用）：preset、crf 或 bitrate、tune、线程数（0 为自动）、GOP 长度、音频码率
+    ENCODE_PROFILES = {
+        'draft': {'preset': 'ultrafast', 'crf': 30, 'tune': 'fastdecode', 'threads': 0, 'gop': 60, 'audio_bitrate': '96k'},
+        'balanced': {'preset': 'medium', 'crf': 23, 'threads': 0, 'gop': 120, 'audio_bitrate': '128k'},
+        'final': {'preset': 'slow', 'crf': 18, 'threads': 0, 'gop': 250, 'audio_bitrate': '192k'}
+    }
+    DEFAULT_ENCODE_PROFILE = os.getenv('ENCODE_PROFILE', 'balanced')
+    # 多档输出（compose_renditions）：各档名称、分辨率和目标码率，一次解码后分别编码
+    RENDITIONS = [
+        {'name': '1080p', 'width': 1920, 'height': 1080, 'bitrate': '5000k', 'audio_bitrate': '192k'},
+        {'name': '720p', 'width': 1280, 'height': 720, 'bitrate': '2800k', 'audio_bitrate': '128k'},
+        {'name': '480p', 'width': 854, 'height': 480, 'bitrate': '1400k', 'audio_bitrate': '96k'}
+    ]
+    HLS_SEGMENT_TIME = float(os.getenv('HLS_SEGMENT_TIME', '6'))
+    # 草稿预览（compose_preview）：低分辨率、低帧率、最快编码配置，片段使用按预览参数缓存的代理文件
+    PREVIEW_RESOLUTION = (640, 360)
+    PREVIEW_FPS = int(os.getenv('PREVIEW_FPS', '15'))
+    PREVIEW_ENCODE_PROFILE = os.getenv('PREVIEW_ENCODE_PROFILE', 'draft')
     
     # 默认维度结构
     DEFAULT_DIMENSIONS = {
@@ -34,6 +66,29 @@ class Config:
     def DASHSCOPE_API_KEY(self):
         return os.getenv('DASHSCOPE_API_KEY', '')
     
+    # API服务配置（并发任务数和排队上限，超出时返回429）
+    API_MAX_CONCURRENT_JOBS = int(os.getenv('API_MAX_CONCURRENT_JOBS', '2'))
+    API_MAX_QUEUED_JOBS = int(os.getenv('API_MAX_QUEUED_JOBS', '8'))
+    
+    # 资源上限（0 表示不限制）：临时磁盘字节数、并发解码器数、常驻内存字节数
+    MAX_SCRATCH_BYTES = int(os.getenv('MAX_SCRATCH_BYTES', str(20 * 1024 ** 3)))
+    MAX_DECODERS = int(os.getenv('MAX_DECODERS', '4'))
+    MAX_RESIDENT_MEMORY_BYTES = int(os.getenv('MAX_RESIDENT_MEMORY_BYTES', '0'))
+    # 等待磁盘配额或内存回落的最长时间（秒），超时后放行，避免上限低于基线内存时永久阻塞
+    RESOURCE_MAX_WAIT = float(os.getenv('RESOURCE_MAX_WAIT', '60'))
+    # 下载阶段最多预取的视频数；未知大小的下载按此估算预留磁盘
+    DOWNLOAD_PREFETCH = int(os.getenv('DOWNLOAD_PREFETCH', '2'))
+    DOWNLOAD_SIZE_ESTIMATE = 500 * 1024 ** 2
+    
+    # 超时配置（秒，0 表示不限制）：单个条目的截止时间，以及整个阶段的总预算
+    DOWNLOAD_CONNECT_TIMEOUT = 10
+    DOWNLOAD_READ_TIMEOUT = 60
+    ITEM_TIMEOUTS = {'download': 900, 'extraction': 300}
+    STAGE_TIMEOUTS = {'download': 0, 'extraction': 0}
+    
+    # 维度水印字体文件（为空时由 fontconfig 按字体名查找）
+    WATERMARK_FONT_FILE = os.getenv('WATERMARK_FONT_FILE', '')
+    
     # 路径配置
     INPUT_DIR = 'data/input'
     OUTPUT_DIR = 'data/output'
@@ -0,0 +1,66 @@
+import time
+import threading
+from typing import Optional
+
+
+class PipelineCancelled(Exception):
+    """运行被用户或调用方取消"""
+    pass
+
+
+class StageTimeout(Exception):
+    """单个条目或阶段超过了截止时间"""
+    pass
+
+
+class CancellationToken:
+    """协作式取消令牌：流水线在条目之间调用 check()，子进程轮询 cancelled"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "用户取消"):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise PipelineCancelled(self.reason or "已取消")
+
+    def wait(self, timeout: float) -> bool:
+        """等待至多 timeout 秒，期间被取消时返回 True（用于可中断的 sleep）"""
+        return self._event.wait(timeout)
+
+
+class Deadline:
+    """截止时间；seconds 为 None 或 <=0 表示不限时"""
+
+    def __init__(self, seconds: Optional[float], label: str = ""):
+        self.label = label
+        self.expires_at = time.monotonic() + seconds if seconds and seconds > 0 else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self):
+        if self.expired:
+            raise StageTimeout(f"{self.label} 超时")
+
+    def earliest(self, other: "Deadline") -> "Deadline":
+        """返回两者中更早到期的一个"""
+        if self.expires_at is None:
+            return other
+        if other.expires_at is None or self.expires_at <= other.expires_at:
+            return self
+        return other
@@ -0,0 +1,118 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from core.cancellation import CancellationToken
+from core.encoding import ffmpeg_encode_args, resolve_profile
+from core.ffmpeg_tools import run_ffmpeg, probe_media, conform_video_filter, conform_audio_filter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ConformTarget:
+    """片段统一的输出参数"""
+    width: int = 1280
+    height: int = 720
+    fps: float = 30
+    sample_rate: int = 48000
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> "ConformTarget":
+        width, height = settings.get('resolution', (cls.width, cls.height))
+        return cls(int(width), int(height), settings.get('fps', cls.fps),
+                   settings.get('sample_rate', cls.sample_rate))
+
+    def matches(self, info: Dict) -> bool:
+        """媒体是否已经符合目标参数（h264/yuv420p、分辨率、帧率、aac 立体声及采样率）"""
+        video, audio = info.get('video'), info.get('audio')
+        return bool(
+            video and audio
+            and video['codec'] == 'h264' and video['pix_fmt'] == 'yuv420p'
+            and (video['width'], video['height']) == (self.width, self.height)
+            and abs(video['fps'] - self.fps) <= 0.01
+            and audio['codec'] == 'aac' and audio['channels'] == 2
+            and audio['sample_rate'] == self.sample_rate
+        )
+
+    def ffmpeg_args(self, has_audio: bool, extra_video_filter: Optional[str] = None) -> Tuple[List[str], List[str]]:
+        """
+        统一参数对应的 ffmpeg 参数
+
+        Returns:
+            (追加的输入参数, 输出参数)；源没有音轨时补一条静音立体声
+        """
+        vf = conform_video_filter(self.width, self.height, self.fps)
+        if extra_video_filter:
+            vf += f",{extra_video_filter}"
+        inputs: List[str] = []
+        if has_audio:
+            outputs = ['-map', '0:v:0', '-map', '0:a:0']
+        else:
+            inputs = ['-f', 'lavfi', '-i', f"anullsrc=r={self.sample_rate}:cl=stereo"]
+            outputs = ['-map', '0:v:0', '-map', '1:a:0', '-shortest']
+        outputs += ['-vf', vf, '-af', conform_audio_filter(self.sample_rate)]
+        return inputs, outputs
+
+
+class ClipStore:
+    """片段存储：片段进入存储时统一一次输出参数并缓存，合成阶段不再缩放或转换帧率"""
+
+    def __init__(self, root: str = os.path.join("data", "clips")):
+        self.root = root
+        self.conformed_dir = os.path.join(root, "conformed")
+        os.makedirs(self.conformed_dir, exist_ok=True)
+
+    def conform(self, path: str, target: ConformTarget, encode_profile=None,
+                token: Optional[CancellationToken] = None) -> str:
+        """
+        返回符合目标参数的片段路径：已符合时原样返回，否则转换一次并按
+        (源文件, 修改时间, 大小, 目标参数, 编码配置) 缓存
+        """
+        info = probe_media(path, token=token)
+        if target.matches(info):
+            return path
+
+        key = self._key(path, target, encode_profile)
+        output_path = os.path.join(self.conformed_dir, f"{key}.mp4")
+        if os.path.exists(output_path):
+            return output_path
+
+        if not info.get('video'):
+            raise ValueError(f"No video stream in {path}")
+        extra_inputs, output_args = target.ffmpeg_args(info['audio'] is not None)
+        tmp_path = os.path.join(self.conformed_dir, f"{key}.{uuid.uuid4().hex[:8]}.tmp.mp4")
+        try:
+            run_ffmpeg(['-i', path] + extra_inputs + output_args + ffmpeg_encode_args(encode_profile)
+                       + ['-movflags', '+faststart', tmp_path], token=token)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.info(f"Conformed clip {path} -> {output_path}")
+        return output_path
+
+    def lookup(self, path: str, target: ConformTarget, encode_profile=None,
+               token: Optional[CancellationToken] = None) -> Optional[str]:
+        """
+        不转换，只返回 conform() 会直接使用的路径：源已符合目标参数时为源路径，
+        已有缓存的统一版本时为其路径，否则为 None
+        """
+        if target.matches(probe_media(path, token=token)):
+            return path
+        output_path = os.path.join(self.conformed_dir, f"{self._key(path, target, encode_profile)}.mp4")
+        return output_path if os.path.exists(output_path) else None
+
+    @staticmethod
+    def _key(path: str, target: ConformTarget, encode_profile=None) -> str:
+        """统一版本的缓存键：源文件、修改时间、大小、目标参数和编码配置"""
+        stat = os.stat(path)
+        return hashlib.sha1(json.dumps([
+            os.path.abspath(path), stat.st_mtime_ns, stat.st_size,
+            [target.width, target.height, target.fps, target.sample_rate],
+            resolve_profile(encode_profile)
+        ], sort_keys=True).encode('utf-8')).hexdigest()[:20]
@@ -0,0 +1,92 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Union
+
+from config import Config
+from utils.file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# 没有实测数据时各编码配置的默认吞吐量（每秒编码的 百万像素·秒 输出）
+DEFAULT_THROUGHPUT = {'draft': 60.0, 'balanced': 15.0, 'final': 5.0}
+# 指数滑动平均的权重：新测量值占比
+SMOOTHING = 0.3
+
+
+def profile_name(encode_profile: Union[str, Dict, None]) -> str:
+    """编码配置的统计名称：自定义字典统一记为 'custom'"""
+    if encode_profile is None:
+        return Config.DEFAULT_ENCODE_PROFILE
+    if isinstance(encode_profile, dict):
+        return 'custom'
+    return encode_profile
+
+
+class EncodeStats:
+    """
+    按 (渲染后端, 编码配置) 记录实测编码速度，用于渲染前估算耗时
+
+    速度以吞吐量表示：输出时长 × 分辨率（百万像素） / 实际耗时，
+    因此不同分辨率和时长的合成可以共用同一组统计。
+    """
+
+    def __init__(self, path: str = os.path.join("data", "cache", "encode_stats.json")):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load encode stats {self.path}: {str(e)}")
+            return {}
+
+    def _save(self):
+        atomic_write_json(self.path, self._stats)
+
+    @staticmethod
+    def _key(backend: str, encode_profile) -> str:
+        return f"{backend}/{profile_name(encode_profile)}"
+
+    def throughput(self, backend: str, encode_profile=None) -> float:
+        """实测吞吐量；没有记录时使用编码配置的默认值"""
+        entry = self._stats.get(self._key(backend, encode_profile))
+        if entry:
+            return entry['throughput']
+        return DEFAULT_THROUGHPUT.get(profile_name(encode_profile), DEFAULT_THROUGHPUT['balanced'])
+
+    def samples(self, backend: str, encode_profile=None) -> int:
+        entry = self._stats.get(self._key(backend, encode_profile))
+        return entry['samples'] if entry else 0
+
+    def record(self, backend: str, encode_profile, output_seconds: float,
+               width: int, height: int, elapsed: float):
+        """记录一次渲染：output_seconds 为实际编码的输出时长（不含复用的缓存分段）"""
+        if output_seconds <= 0 or elapsed <= 0:
+            return
+        measured = output_seconds * width * height / 1e6 / elapsed
+        key = self._key(backend, encode_profile)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry:
+                entry['throughput'] = (1 - SMOOTHING) * entry['throughput'] + SMOOTHING * measured
+                entry['samples'] += 1
+            else:
+                self._stats[key] = {'throughput': measured, 'samples': 1}
+            try:
+                self._save()
+            except Exception as e:
+                logger.warning(f"Failed to save encode stats {self.path}: {str(e)}")
+
+    def estimate(self, backend: str, encode_profile, output_seconds: float,
+                 width: int, height: int) -> float:
+        """估算编码 output_seconds 秒输出所需的时间（秒）"""
+        if output_seconds <= 0:
+            return 0.0
+        return output_seconds * width * height / 1e6 / self.throughput(backend, encode_profile)
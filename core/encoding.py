@@ -0,0 +1,62 @@
+import logging
+from typing import Any, Dict, List, Union
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_profile(profile: Union[str, Dict, None] = None) -> Dict[str, Any]:
+    """
+    解析编码配置：可以是 Config.ENCODE_PROFILES 中的名称，也可以是自定义字典
+    （自定义字典在默认配置基础上覆盖）；未知名称时使用默认配置
+    """
+    default = Config.ENCODE_PROFILES.get(Config.DEFAULT_ENCODE_PROFILE, Config.ENCODE_PROFILES['balanced'])
+    if profile is None:
+        return dict(default)
+    if isinstance(profile, dict):
+        return dict(default, **profile)
+    if profile not in Config.ENCODE_PROFILES:
+        logger.warning(f"Unknown encode profile '{profile}', using default")
+        return dict(default)
+    return dict(Config.ENCODE_PROFILES[profile])
+
+
+def ffmpeg_encode_args(profile: Union[str, Dict, None] = None) -> List[str]:
+    """编码配置对应的 ffmpeg 输出参数（libx264 + aac，不含容器参数）"""
+    p = resolve_profile(profile)
+    args = ['-c:v', 'libx264', '-preset', p['preset'], '-pix_fmt', 'yuv420p']
+    if p.get('bitrate'):
+        args += ['-b:v', p['bitrate']]
+    else:
+        args += ['-crf', str(p['crf'])]
+    if p.get('tune'):
+        args += ['-tune', p['tune']]
+    if p.get('gop'):
+        args += ['-g', str(p['gop'])]
+    if p.get('threads'):
+        args += ['-threads', str(p['threads'])]
+    args += ['-c:a', 'aac', '-b:a', p['audio_bitrate']]
+    return args
+
+
+def moviepy_write_kwargs(profile: Union[str, Dict, None] = None) -> Dict[str, Any]:
+    """编码配置对应的 moviepy write_videofile 参数"""
+    p = resolve_profile(profile)
+    ffmpeg_params: List[str] = ['-pix_fmt', 'yuv420p']
+    if not p.get('bitrate'):
+        ffmpeg_params += ['-crf', str(p['crf'])]
+    if p.get('tune'):
+        ffmpeg_params += ['-tune', p['tune']]
+    if p.get('gop'):
+        ffmpeg_params += ['-g', str(p['gop'])]
+    return {
+        'codec': 'libx264',
+        'audio_codec': 'aac',
+        'preset': p['preset'],
+        'bitrate': p.get('bitrate') or None,
+        'audio_bitrate': p['audio_bitrate'],
+        'threads': p.get('threads') or None,
+        'ffmpeg_params': ffmpeg_params
+    }
+
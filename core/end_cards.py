@@ -0,0 +1,68 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+from dataclasses import replace
+from typing import List, Optional, Tuple
+
+from core.cancellation import CancellationToken
+from core.encoding import ffmpeg_encode_args, resolve_profile
+from core.ffmpeg_renderer import FFmpegRenderer, RenderSpec
+
+logger = logging.getLogger(__name__)
+
+
+class EndCardCache:
+    """
+    片尾标语缓存：每个 (标语, 分辨率, 帧率, 编码配置, 码流参数) 只渲染一次，合成时以流复制拼接到结尾
+
+    stream_args 为附加的编码参数（如智能渲染时与源视频一致的 -profile:v/-level:v），
+    保证片尾与其前面流复制的分段参数集一致。
+    """
+
+    def __init__(self, root: str = os.path.join("data", "cache", "endcards")):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(spec: RenderSpec, encode_profile=None, stream_args: Optional[List[str]] = None) -> str:
+        payload = [spec.end_card, spec.width, spec.height, spec.fps, spec.sample_rate,
+                   spec.end_card_duration, spec.end_card_fade, spec.font_file, resolve_profile(encode_profile)]
+        if stream_args:
+            payload.append(list(stream_args))
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def path(self, spec: RenderSpec, encode_profile=None, stream_args: Optional[List[str]] = None) -> str:
+        return os.path.join(self.root, f"{self.key(spec, encode_profile, stream_args)}.ts")
+
+    def contains(self, spec: RenderSpec, encode_profile=None, stream_args: Optional[List[str]] = None) -> bool:
+        return bool(spec.end_card) and os.path.exists(self.path(spec, encode_profile, stream_args))
+
+    def get(self, spec: RenderSpec, encode_profile=None,
+            token: Optional[CancellationToken] = None,
+            stream_args: Optional[List[str]] = None) -> Tuple[str, float]:
+        """
+        返回片尾分段（MPEG-TS）的路径和时长，缓存中没有时渲染一次
+
+        spec.end_card 为标语文本，spec 的分辨率、帧率和采样率须与正片一致。
+        """
+        if not spec.end_card:
+            raise ValueError("No slogan for end card")
+        path = self.path(spec, encode_profile, stream_args)
+        if os.path.exists(path):
+            os.utime(path)
+            return path, spec.end_card_duration
+
+        tmp_path = os.path.join(self.root, f"{os.path.basename(path)[:-3]}.{uuid.uuid4().hex[:8]}.tmp.ts")
+        try:
+            FFmpegRenderer(self.root).render([], replace(spec, transition=None), tmp_path,
+                                             ffmpeg_encode_args(encode_profile) + list(stream_args or [])
+                                             + ['-f', 'mpegts'],
+                                             token=token)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.info(f"Rendered end card '{spec.end_card}' -> {path}")
+        return path, spec.end_card_duration
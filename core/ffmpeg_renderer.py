@@ -0,0 +1,350 @@
+import os
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.cancellation import CancellationToken
+from core.ffmpeg_tools import run_ffmpeg, escape_filter_value, conform_video_filter, conform_audio_filter
+from core.subtitles import caption_events, subtitles_filter, write_ass
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg xfade 支持的过渡名称（可在设置中直接使用）
+XFADE_NAMES = {
+    'fade', 'fadeblack', 'fadewhite', 'dissolve', 'distance',
+    'wipeleft', 'wiperight', 'wipeup', 'wipedown',
+    'slideleft', 'slideright', 'slideup', 'slidedown',
+    'smoothleft', 'smoothright', 'smoothup', 'smoothdown',
+    'circlecrop', 'rectcrop', 'circleopen', 'circleclose',
+    'radial', 'pixelize', 'zoomin', 'hblur'
+}
+
+
+def xfade_transition(transition_type: str, options: Optional[Dict] = None) -> Optional[str]:
+    """把 Config.TRANSITION_TYPES 中的转场类型映射为 xfade 过渡名称；'none' 返回 None"""
+    options = options or {}
+    if not transition_type or transition_type == 'none':
+        return None
+    if transition_type == 'fade':
+        return 'fade'
+    if transition_type == 'slide':
+        return f"slide{options.get('direction', 'right')}"
+    if transition_type == 'zoom':
+        return 'zoomin'
+    if transition_type in XFADE_NAMES:
+        return transition_type
+    logger.warning(f"Unknown transition '{transition_type}', using fade")
+    return 'fade'
+
+
+@dataclass
+class ClipInput:
+    """渲染输入：一个片段文件中 [start, start + duration) 的部分"""
+    path: str
+    duration: float
+    start: float = 0.0
+    has_audio: bool = True
+    caption: str = ""
+
+
+@dataclass
+class RenderSpec:
+    """输出参数与时间线效果"""
+    width: int = 1280
+    height: int = 720
+    fps: float = 30
+    sample_rate: int = 48000
+    transition: Optional[str] = None        # xfade 过渡名称，None 表示直接拼接
+    transition_duration: float = 1.0
+    end_card: Optional[str] = None          # 片尾标语
+    end_card_duration: float = 5.0
+    end_card_fade: float = 1.0
+    font_file: str = ""
+    font_name: str = "Arial"
+    caption_font_size: int = 24
+
+
+@dataclass
+class Piece:
+    """分段渲染的一段输出：'copy' 为流复制的片段区间，'render' 为需要重新编码的一段时间线"""
+    kind: str
+    clips: List[ClipInput]
+    end_card: bool = False
+
+    @property
+    def media_duration(self) -> float:
+        return sum(c.duration for c in self.clips)
+
+
+def effective_transition_duration(clips: List[ClipInput], spec: RenderSpec) -> float:
+    """转场时长不能超过相邻片段时长的一半；过短时退化为直接拼接"""
+    if not spec.transition or len(clips) < 2:
+        return 0.0
+    d = min(spec.transition_duration, min(c.duration for c in clips) / 2)
+    return d if d >= 0.05 else 0.0
+
+
+def timeline_duration(clips: List[ClipInput], spec: RenderSpec,
+                      transition_duration: Optional[float] = None) -> float:
+    """渲染结果的总时长（扣除转场重叠，加上片尾）"""
+    d = effective_transition_duration(clips, spec) if transition_duration is None else transition_duration
+    total = sum(c.duration for c in clips) - d * max(0, len(clips) - 1)
+    if spec.end_card:
+        total += spec.end_card_duration
+    return total
+
+
+def _font_option(font_file: str) -> str:
+    return f"fontfile={escape_filter_value(font_file)}" if font_file else "font=Arial"
+
+
+def build_filter_graph(clips: List[ClipInput], spec: RenderSpec,
+                       subtitles_file: Optional[str] = None, end_card_text_file: Optional[str] = None,
+                       transition_duration: Optional[float] = None
+                       ) -> Tuple[List[str], str, str, str]:
+    """
+    构建 ffmpeg 输入参数和 filter_complex
+
+    每个输入先统一到目标分辨率、帧率、像素格式和音频采样率，再用 xfade / acrossfade
+    串联（或 concat 直接拼接），整条时间线的字幕由 subtitles 滤镜按 ASS 文件一次烧录，
+    最后拼接片尾。transition_duration 用于指定已按完整时间线
+    计算好的转场时长（分段渲染时各段的输入是裁剪后的片段，不能再按它们的时长钳制）。
+
+    Returns:
+        (输入参数, filter_complex, 视频输出标签, 音频输出标签)
+    """
+    w, h, fps, sr = spec.width, spec.height, spec.fps, spec.sample_rate
+    input_args: List[str] = []
+    filters: List[str] = []
+
+    for i, clip in enumerate(clips):
+        if clip.start > 0:
+            input_args += ['-ss', f"{clip.start:.3f}"]
+        input_args += ['-t', f"{clip.duration:.3f}", '-i', clip.path]
+
+        filters.append(f"[{i}:v]{conform_video_filter(w, h, fps)},setpts=PTS-STARTPTS[v{i}]")
+
+        if clip.has_audio:
+            filters.append(f"[{i}:a]{conform_audio_filter(sr)},"
+                           f"apad,atrim=0:{clip.duration:.3f},asetpts=PTS-STARTPTS[a{i}]")
+        else:
+            filters.append(f"anullsrc=r={sr}:cl=stereo,atrim=0:{clip.duration:.3f},"
+                           f"asetpts=PTS-STARTPTS[a{i}]")
+
+    d = effective_transition_duration(clips, spec) if transition_duration is None else transition_duration
+    if d > 0 and len(clips) > 1:
+        cur_v, cur_a = "v0", "a0"
+        length = clips[0].duration
+        for k in range(1, len(clips)):
+            offset = length - d
+            filters.append(f"[{cur_v}][v{k}]xfade=transition={spec.transition}:"
+                           f"duration={d:.3f}:offset={offset:.3f}[vx{k}]")
+            filters.append(f"[{cur_a}][a{k}]acrossfade=d={d:.3f}[ax{k}]")
+            cur_v, cur_a = f"vx{k}", f"ax{k}"
+            length += clips[k].duration - d
+    elif len(clips) > 1:
+        pairs = "".join(f"[v{i}][a{i}]" for i in range(len(clips)))
+        filters.append(f"{pairs}concat=n={len(clips)}:v=1:a=1[vcat][acat]")
+        cur_v, cur_a = "vcat", "acat"
+    elif clips:
+        cur_v, cur_a = "v0", "a0"
+    else:
+        cur_v = cur_a = None
+
+    if subtitles_file and cur_v is not None:
+        filters.append(f"[{cur_v}]{subtitles_filter(subtitles_file, spec.font_file)}[vsub]")
+        cur_v = "vsub"
+
+    if spec.end_card:
+        n = len(clips)
+        dur = spec.end_card_duration
+        input_args += ['-f', 'lavfi', '-t', f"{dur:.3f}", '-i', f"color=c=black:s={w}x{h}:r={fps}"]
+        card = f"[{n}:v]format=yuv420p,setsar=1"
+        if end_card_text_file:
+            card += (f",drawtext=textfile={escape_filter_value(end_card_text_file)}:"
+                     f"{_font_option(spec.font_file)}:fontsize=36:fontcolor=white:"
+                     f"x=(w-tw)/2:y=(h-th)/2")
+        card += f",fade=t=in:st=0:d={spec.end_card_fade:.3f}[vend]"
+        filters.append(card)
+        filters.append(f"anullsrc=r={sr}:cl=stereo,atrim=0:{dur:.3f},asetpts=PTS-STARTPTS[aend]")
+        if cur_v is None:
+            cur_v, cur_a = "vend", "aend"
+        else:
+            filters.append(f"[{cur_v}][{cur_a}][vend][aend]concat=n=2:v=1:a=1[vout][aout]")
+            cur_v, cur_a = "vout", "aout"
+
+    return input_args, ";".join(filters), cur_v, cur_a
+
+
+class FFmpegRenderer:
+    """基于单个 ffmpeg 进程的渲染后端：整条时间线构建为一个 filter graph 原生执行"""
+
+    def __init__(self, temp_dir: str):
+        self.temp_dir = temp_dir
+        os.makedirs(temp_dir, exist_ok=True)
+
+    def render(self, clips: List[ClipInput], spec: RenderSpec, output_path: str,
+               encode_args: List[str], token: Optional[CancellationToken] = None,
+               transition_duration: Optional[float] = None,
+               progress: Optional[Callable[[Dict], None]] = None) -> float:
+        """渲染时间线到 output_path，返回输出时长（秒）；progress 接收 ffmpeg 编码进度（见 run_ffmpeg）"""
+        return self.render_outputs(clips, spec, [(spec.width, spec.height, encode_args + [output_path])],
+                                   token=token, transition_duration=transition_duration, progress=progress)
+
+    def render_outputs(self, clips: List[ClipInput], spec: RenderSpec,
+                       outputs: List[Tuple[int, int, List[str]]],
+                       token: Optional[CancellationToken] = None,
+                       transition_duration: Optional[float] = None,
+                       progress: Optional[Callable[[Dict], None]] = None) -> float:
+        """
+        时间线只解码和滤镜处理一次，经 split/asplit 分给多个输出
+
+        Args:
+            outputs: [(宽, 高, 输出参数)]，输出参数包含编码参数和输出路径；
+                     尺寸与 spec 不同的输出先缩放（保持比例并补黑边）
+
+        Returns:
+            float: 输出时长（秒）
+        """
+        if not clips and not spec.end_card:
+            raise ValueError("No clips to render")
+        if not outputs:
+            raise ValueError("No outputs to render")
+        d = effective_transition_duration(clips, spec) if transition_duration is None else transition_duration
+        subtitles_file = None
+        end_card_text_file = None
+        try:
+            events = caption_events([(clip.duration, clip.caption) for clip in clips], d)
+            if events:
+                subtitles_file = os.path.join(self.temp_dir, f"captions_{uuid.uuid4().hex[:8]}.ass")
+                write_ass(subtitles_file, events, spec.width, spec.height,
+                          spec.font_name, spec.caption_font_size)
+            if spec.end_card:
+                end_card_text_file = self._write_text(spec.end_card)
+
+            input_args, graph, vout, aout = build_filter_graph(clips, spec, subtitles_file, end_card_text_file, d)
+            labels = [(vout, aout)]
+            if len(outputs) > 1:
+                n = len(outputs)
+                graph += (f";[{vout}]split={n}" + "".join(f"[vs{k}]" for k in range(n))
+                          + f";[{aout}]asplit={n}" + "".join(f"[as{k}]" for k in range(n)))
+                labels = [(f"vs{k}", f"as{k}") for k in range(n)]
+            output_args: List[str] = []
+            for k, (width, height, out_args) in enumerate(outputs):
+                v, a = labels[k]
+                if (width, height) != (spec.width, spec.height):
+                    graph += f";[{v}]{conform_video_filter(width, height, spec.fps)}[vo{k}]"
+                    v = f"vo{k}"
+                output_args += ['-map', f"[{v}]", '-map', f"[{a}]", '-r', str(spec.fps)] + out_args
+            args = input_args + ['-filter_complex', graph] + output_args
+            logger.debug(f"ffmpeg filter graph: {graph}")
+            run_ffmpeg(args, token=token, progress=progress)
+        finally:
+            for path in (subtitles_file, end_card_text_file):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        return timeline_duration(clips, spec, d)
+
+    def _write_text(self, text: str) -> str:
+        path = os.path.join(self.temp_dir, f"text_{uuid.uuid4().hex[:8]}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+
+def render_pieces(pieces: List[Piece], spec: RenderSpec, encode_args: List[str], temp_dir: str,
+                  stem: str, transition_duration: float, workers: int = 1,
+                  token: Optional[CancellationToken] = None, cache=None,
+                  tracker=None) -> Tuple[List[str], List[float]]:
+    """
+    把各段渲染为 MPEG-TS 文件（workers > 1 时并行运行多个 ffmpeg 进程）
+
+    任一段失败或外部取消时终止其余正在运行的 ffmpeg 进程。指定 cache（RenderCache）时，
+    重新编码段按内容哈希复用已缓存的渲染结果，新渲染的段写入缓存。
+    指定 tracker（ProgressTracker）时各段以序号为任务报告已输出的秒数。
+
+    Returns:
+        (分段文件路径, 分段时长)；调用方用 remove_pieces(paths, cache) 删除临时分段
+    """
+    renderer = FFmpegRenderer(temp_dir)
+    paths = [os.path.join(temp_dir, f"{stem}_{index:04d}.ts") for index in range(len(pieces))]
+    abort = CancellationToken()
+
+    def run(index: int) -> float:
+        duration = render_piece(index)
+        if tracker is not None:
+            tracker.update(index, duration)
+        return duration
+
+    def render_piece(index: int) -> float:
+        abort.check()
+        piece = pieces[index]
+        progress = tracker.ffmpeg_callback(index) if tracker is not None else None
+        if piece.kind == 'copy':
+            clip = piece.clips[0]
+            run_ffmpeg(['-ss', f"{clip.start:.6f}", '-i', clip.path, '-t', f"{clip.duration:.6f}",
+                        '-map', '0:v:0', '-map', '0:a:0', '-c', 'copy', '-f', 'mpegts', paths[index]],
+                       token=abort, progress=progress)
+            return clip.duration
+        piece_spec = spec if piece.end_card else replace(spec, end_card=None)
+        key = None
+        if cache is not None:
+            key = cache.key(piece, piece_spec, encode_args, transition_duration)
+            cached = cache.lookup(key)
+            if cached:
+                paths[index] = cached
+                return timeline_duration(piece.clips, piece_spec, transition_duration)
+        duration = renderer.render(piece.clips, piece_spec, paths[index], encode_args + ['-f', 'mpegts'],
+                                   token=abort, transition_duration=transition_duration, progress=progress)
+        if key is not None:
+            paths[index] = cache.store(key, paths[index])
+        return duration
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="render") as pool:
+            futures = [pool.submit(run, index) for index in range(len(pieces))]
+            try:
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.2, return_when=FIRST_EXCEPTION)
+                    for future in done:
+                        future.result()
+                    if token is not None and token.cancelled:
+                        token.check()
+            except BaseException as e:
+                abort.cancel(f"render aborted: {e}")
+                raise
+    except BaseException:
+        remove_pieces(paths, cache)
+        raise
+    return paths, [future.result() for future in futures]
+
+
+def concat_pieces(paths: List[str], durations: List[float], output_path: str, temp_dir: str,
+                  token: Optional[CancellationToken] = None):
+    """用 concat demuxer 把 MPEG-TS 分段无损拼接为 MP4"""
+    list_path = os.path.join(temp_dir, f"{os.path.splitext(os.path.basename(output_path))[0]}"
+                                       f"_{uuid.uuid4().hex[:8]}.concat.txt")
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path, duration in zip(paths, durations):
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\nduration {duration:.6f}\n")
+    try:
+        run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy',
+                    '-bsf:a', 'aac_adtstoasc', '-movflags', '+faststart', output_path],
+                   token=token)
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+
+
+def remove_pieces(paths: List[str], cache=None):
+    """删除临时分段（渲染缓存中的文件只释放占用，不删除）"""
+    for path in paths:
+        if cache is not None and cache.owns(path):
+            cache.release(path)
+            continue
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,244 @@
+import os
+import json
+import queue
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+from core.cancellation import CancellationToken, Deadline, PipelineCancelled, StageTimeout
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BIN = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BIN = os.getenv('FFPROBE_BINARY', 'ffprobe')
+
+
+class FFmpegError(Exception):
+    """ffmpeg/ffprobe 以非零状态退出"""
+
+    def __init__(self, returncode: int, stderr: str):
+        self.returncode = returncode
+        self.stderr = stderr
+        super().__init__(f"ffmpeg 退出码 {returncode}: {stderr.strip()[-500:]}")
+
+
+def _terminate(proc: subprocess.Popen, grace: float = 5.0):
+    """先 SIGTERM 再 SIGKILL 整个进程组，确保不遗留子进程"""
+    try:
+        if os.name == 'posix':
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        if os.name == 'posix':
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+def run_process(cmd: List[str], timeout: Optional[float] = None,
+                token: Optional[CancellationToken] = None,
+                deadline: Optional[Deadline] = None,
+                poll_interval: float = 0.2,
+                on_output: Optional[Callable[[str], None]] = None) -> str:
+    """
+    运行外部命令（ffmpeg/ffprobe），超时或取消时终止子进程组
+
+    Args:
+        on_output: 运行期间逐行接收标准输出（如 ffmpeg -progress 的进度信息）
+
+    Returns:
+        str: 标准输出
+    """
+    if timeout:
+        limit = Deadline(timeout, cmd[0])
+        deadline = limit if deadline is None else deadline.earliest(limit)
+    # 需要逐行读取时标准输出走管道（由后台线程读取），否则写入临时文件
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE if on_output else out, stderr=err,
+                                start_new_session=(os.name == 'posix'))
+        reader = _LineReader(proc.stdout, on_output) if on_output else None
+        try:
+            while proc.poll() is None:
+                if token is not None and token.cancelled:
+                    _terminate(proc)
+                    raise PipelineCancelled(token.reason or "已取消")
+                if deadline is not None and deadline.expired:
+                    _terminate(proc)
+                    raise StageTimeout(f"{os.path.basename(cmd[0])} 超时: {' '.join(cmd[-1:])}")
+                if reader:
+                    reader.poll()
+                time.sleep(poll_interval)
+            if reader:
+                reader.poll(final=True)
+        except BaseException:
+            if proc.poll() is None:
+                _terminate(proc)
+            raise
+        if reader:
+            stdout = reader.output()
+        else:
+            out.seek(0)
+            stdout = out.read().decode('utf-8', errors='replace')
+        err.seek(0)
+        stderr = err.read().decode('utf-8', errors='replace')
+    if proc.returncode != 0:
+        raise FFmpegError(proc.returncode, stderr)
+    return stdout
+
+
+class _LineReader:
+    """
+    在后台线程读取子进程的标准输出管道，完整的行在调用线程的 poll() 中回调
+
+    管道由读取线程独占，不与子进程共享文件偏移量，读取不会影响子进程的写入。
+    """
+
+    def __init__(self, stream, callback: Callable[[str], None]):
+        self.callback = callback
+        self.lines: "queue.Queue[bytes]" = queue.Queue()
+        self.chunks: List[bytes] = []
+        self.thread = threading.Thread(target=self._read, args=(stream,), daemon=True)
+        self.thread.start()
+
+    def _read(self, stream):
+        try:
+            for line in iter(stream.readline, b''):
+                self.chunks.append(line)
+                self.lines.put(line)
+        finally:
+            stream.close()
+
+    def poll(self, final: bool = False):
+        # 子进程退出后等待读取线程读完管道中剩余的输出
+        if final:
+            self.thread.join()
+        while True:
+            try:
+                line = self.lines.get_nowait()
+            except queue.Empty:
+                break
+            self.callback(line.decode('utf-8', errors='replace').strip())
+
+    def output(self) -> str:
+        return b''.join(self.chunks).decode('utf-8', errors='replace')
+
+
+class _ProgressParser:
+    """解析 ffmpeg -progress 输出的 key=value 块，每块结束时回调一次"""
+
+    def __init__(self, callback: Callable[[Dict], None]):
+        self.callback = callback
+        self.fields: Dict[str, str] = {}
+
+    def feed(self, line: str):
+        if '=' not in line:
+            return
+        key, value = line.split('=', 1)
+        self.fields[key] = value.strip()
+        if key != 'progress':
+            return
+        fields, self.fields = self.fields, {}
+        try:
+            # out_time_ms 实际单位也是微秒
+            out_time = int(fields.get('out_time_us') or fields.get('out_time_ms') or 0) / 1e6
+        except ValueError:
+            out_time = 0.0
+        speed = fields.get('speed', '').rstrip('x')
+        self.callback({
+            'out_time': max(0.0, out_time),
+            'frame': int(fields['frame']) if fields.get('frame', '').isdigit() else None,
+            'speed': float(speed) if speed and speed != 'N/A' else None,
+            'done': value.strip() == 'end'
+        })
+
+
+def run_ffmpeg(args: List[str], progress: Optional[Callable[[Dict], None]] = None, **kwargs) -> str:
+    """
+    运行 ffmpeg（自动加上 -y -nostdin -v error），参数同 run_process
+
+    指定 progress 时通过 -progress pipe:1 读取编码进度，回调参数为
+    {'out_time': 已输出秒数, 'frame': 已输出帧数, 'speed': 倍速, 'done': 是否结束}
+    """
+    if progress is None:
+        return run_process([FFMPEG_BIN, '-y', '-nostdin', '-v', 'error'] + args, **kwargs)
+    parser = _ProgressParser(progress)
+    return run_process([FFMPEG_BIN, '-y', '-nostdin', '-v', 'error', '-progress', 'pipe:1', '-nostats'] + args,
+                       on_output=parser.feed, **kwargs)
+
+
+def probe_media(path: str, timeout: Optional[float] = 30.0,
+                token: Optional[CancellationToken] = None) -> Dict:
+    """
+    使用 ffprobe 读取媒体信息
+
+    Returns:
+        Dict: duration、以及 video / audio 两个子字典（不存在的流为 None）
+    """
+    output = run_process([FFPROBE_BIN, '-v', 'error', '-print_format', 'json',
+                          '-show_format', '-show_streams', path],
+                         timeout=timeout, token=token)
+    data = json.loads(output or '{}')
+    video = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in data.get('streams', []) if s.get('codec_type') == 'audio'), None)
+    duration = float(data.get('format', {}).get('duration') or 0.0)
+    info = {'duration': duration, 'video': None, 'audio': None}
+    if video:
+        info['video'] = {
+            'codec': video.get('codec_name'),
+            'profile': video.get('profile'),
+            'level': video.get('level'),
+            'width': int(video.get('width') or 0),
+            'height': int(video.get('height') or 0),
+            'fps': _parse_rate(video.get('avg_frame_rate') or video.get('r_frame_rate')),
+            'pix_fmt': video.get('pix_fmt'),
+            'time_base': video.get('time_base')
+        }
+    if audio:
+        info['audio'] = {
+            'codec': audio.get('codec_name'),
+            'sample_rate': int(audio.get('sample_rate') or 0),
+            'channels': int(audio.get('channels') or 0)
+        }
+    return info
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    if not rate:
+        return 0.0
+    if '/' in rate:
+        num, den = rate.split('/', 1)
+        return float(num) / float(den) if float(den) else 0.0
+    return float(rate)
+
+
+def escape_filter_value(value: str) -> str:
+    """
+    转义放在 -vf / -filter_complex 中的滤镜参数值（用于路径等）
+
+    参数值要经过两层解析：滤镜图解析先去掉一层转义，滤镜选项解析再按 ':' 分隔，
+    因此先转义选项层的特殊字符，再对结果转义滤镜图层的特殊字符。
+    """
+    for specials in ("\\:'", "\\',[];"):
+        value = ''.join('\\' + ch if ch in specials else ch for ch in value)
+    return value
+
+
+def conform_video_filter(width: int, height: int, fps: float) -> str:
+    """把视频统一到目标分辨率（等比缩放 + 黑边填充）、帧率和 yuv420p 像素格式"""
+    return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p")
+
+
+def conform_audio_filter(sample_rate: int) -> str:
+    """把音频统一到目标采样率的立体声"""
+    return f"aresample={sample_rate},aformat=sample_fmts=fltp:channel_layouts=stereo"
@@ -0,0 +1,176 @@
+import threading
+import uuid
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.cancellation import CancellationToken, PipelineCancelled
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """任务队列已满（运行中 + 排队中 的任务数达到上限）"""
+    pass
+
+
+@dataclass
+class Job:
+    """后台任务：记录状态、进度以及逐条产生的结果"""
+    id: str
+    kind: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    results: List[Any] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    token: CancellationToken = field(default_factory=CancellationToken, repr=False)
+
+    def __post_init__(self):
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def add_result(self, item: Any):
+        """追加一条中间结果并唤醒等待中的流式读取者"""
+        with self._cond:
+            self.results.append(item)
+            self._cond.notify_all()
+
+    def update_progress(self, **progress):
+        with self._cond:
+            self.progress.update(progress)
+            self._cond.notify_all()
+
+    def _set_status(self, status: str, error: Optional[str] = None):
+        with self._cond:
+            self.status = status
+            if status == RUNNING:
+                self.started_at = time.time()
+            if status in FINISHED_STATES:
+                self.finished_at = time.time()
+            if error:
+                self.error = error
+            self._cond.notify_all()
+
+    def wait_for_results(self, offset: int, timeout: float = 1.0) -> Tuple[List[Any], bool]:
+        """阻塞等待 offset 之后的新结果，返回 (新结果, 任务是否已结束)"""
+        with self._cond:
+            if len(self.results) <= offset and not self.done:
+                self._cond.wait(timeout)
+            return self.results[offset:], self.done
+
+    def to_dict(self, include_results: bool = False) -> Dict[str, Any]:
+        def fmt(ts):
+            return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else None
+
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': fmt(self.created_at),
+            'started_at': fmt(self.started_at),
+            'finished_at': fmt(self.finished_at),
+            'progress': dict(self.progress),
+            'result_count': len(self.results),
+            'error': self.error
+        }
+        if include_results:
+            data['results'] = list(self.results)
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """后台任务管理器：限制并发数和排队长度，超出时拒绝新任务（由调用方转换为背压响应）"""
+
+    def __init__(self, max_concurrent: int = 2, max_queued: int = 8, history: int = 200):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                            thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not j.done)
+
+    @property
+    def saturated(self) -> bool:
+        return self.active_count >= self.max_concurrent + self.max_queued
+
+    def submit(self, kind: str, fn: Callable[[Job], Any], params: Optional[Dict] = None) -> Job:
+        """提交任务；fn(job) 在工作线程中执行，返回值作为 job.result"""
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if not j.done)
+            if active >= self.max_concurrent + self.max_queued:
+                raise JobQueueFullError(f"任务已满：{active} 个任务正在运行或排队")
+            job = Job(id=uuid.uuid4().hex, kind=kind, params=params or {})
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn)
+        logger.info(f"已提交任务 {job.id} ({kind})")
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """请求取消任务；运行中的任务在下一个检查点停止，排队中的任务不会开始"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.token.cancel()
+        logger.info(f"已请求取消任务 {job_id}")
+        return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        if job.token.cancelled:
+            job._set_status(CANCELLED, error=job.token.reason)
+            return
+        job._set_status(RUNNING)
+        try:
+            job.result = fn(job)
+            job._set_status(SUCCEEDED)
+            logger.info(f"任务 {job.id} 完成")
+        except PipelineCancelled as e:
+            logger.info(f"任务 {job.id} 已取消")
+            job._set_status(CANCELLED, error=str(e))
+        except Exception as e:
+            logger.error(f"任务 {job.id} 失败: {str(e)}", exc_info=True)
+            job._set_status(FAILED, error=f"{type(e).__name__}: {str(e)}")
+
+    def _prune(self):
+        """只保留最近的已完成任务记录"""
+        finished = [jid for jid, j in self._jobs.items() if j.done]
+        for jid in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[jid]
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageStats:
+    """单个阶段（可选地限定到某个视频）的累计统计"""
+    stage: str
+    video: Optional[str] = None
+    wall_time: float = 0.0   # 墙钟时间（秒）
+    cpu_time: float = 0.0    # CPU 时间（秒，含已回收的子进程）
+    bytes_in: int = 0        # 读入字节数
+    bytes_out: int = 0       # 写出字节数
+    items: int = 0           # 处理的条目数（片段、视频等）
+    calls: int = 0           # 进入该阶段的次数
+
+    @property
+    def items_per_sec(self) -> float:
+        return self.items / self.wall_time if self.wall_time > 0 else 0.0
+
+    def merge(self, other: "StageStats"):
+        self.wall_time += other.wall_time
+        self.cpu_time += other.cpu_time
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.items += other.items
+        self.calls += other.calls
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['items_per_sec'] = round(self.items_per_sec, 4)
+        return data
+
+
+class StageTimer:
+    """stage() 上下文中返回的计数器，用于在阶段内部累加字节数和条目数"""
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.items = 0
+
+    def add_bytes_in(self, n: int):
+        self.bytes_in += int(n or 0)
+
+    def add_bytes_out(self, n: int):
+        self.bytes_out += int(n or 0)
+
+    def add_items(self, n: int = 1):
+        self.items += int(n or 0)
+
+
+def _cpu_clock() -> float:
+    """当前线程 CPU 时间 + 已回收子进程（ffmpeg 等）的 CPU 时间"""
+    t = os.times()
+    return time.thread_time() + t.children_user + t.children_system
+
+
+class PipelineMetrics:
+    """流水线指标收集器：按阶段、按视频记录耗时、CPU、字节数和吞吐量"""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+        # (stage, video) -> StageStats，video 为 None 表示不区分视频
+        self._stats: Dict[Tuple[str, Optional[str]], StageStats] = {}
+
+    @contextmanager
+    def stage(self, name: str, video: Optional[str] = None):
+        """计时上下文：with metrics.stage('download', url) as t: t.add_bytes_in(n)"""
+        timer = StageTimer()
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_clock()
+        try:
+            yield timer
+        finally:
+            self.record(
+                name,
+                video=video,
+                wall_time=time.perf_counter() - wall_start,
+                cpu_time=max(0.0, _cpu_clock() - cpu_start),
+                bytes_in=timer.bytes_in,
+                bytes_out=timer.bytes_out,
+                items=timer.items
+            )
+
+    def record(self, name: str, video: Optional[str] = None, wall_time: float = 0.0,
+               cpu_time: float = 0.0, bytes_in: int = 0, bytes_out: int = 0,
+               items: int = 0, calls: int = 1):
+        """直接记录一次阶段统计（也用于合并其他进程的指标）"""
+        entry = StageStats(name, video, wall_time, cpu_time, bytes_in, bytes_out, items, calls)
+        with self._lock:
+            key = (name, video)
+            if key in self._stats:
+                self._stats[key].merge(entry)
+            else:
+                self._stats[key] = entry
+
+    def finish(self):
+        """标记运行结束，固定总耗时"""
+        if self._finished is None:
+            self._finished = time.perf_counter()
+
+    @property
+    def total_wall_time(self) -> float:
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._start
+
+    def stage_totals(self) -> Dict[str, StageStats]:
+        """按阶段汇总（合并所有视频）"""
+        totals: Dict[str, StageStats] = {}
+        with self._lock:
+            entries = list(self._stats.values())
+        for entry in entries:
+            if entry.stage not in totals:
+                totals[entry.stage] = StageStats(entry.stage)
+            totals[entry.stage].merge(entry)
+        return totals
+
+    def video_stats(self) -> List[StageStats]:
+        """按视频区分的阶段统计"""
+        with self._lock:
+            return [s for (_, video), s in self._stats.items() if video is not None]
+
+    def unattributed_stats(self) -> List[StageStats]:
+        """不属于具体视频的阶段统计（如字幕、匹配、报告）"""
+        with self._lock:
+            return [s for (_, video), s in self._stats.items() if video is None]
+
+    def summary_rows(self) -> List[Dict]:
+        """供 UI 表格展示的阶段汇总行"""
+        rows = []
+        for stats in self.stage_totals().values():
+            rows.append({
+                '阶段': stats.stage,
+                '次数': stats.calls,
+                '墙钟时间(秒)': round(stats.wall_time, 3),
+                'CPU时间(秒)': round(stats.cpu_time, 3),
+                '读入(MB)': round(stats.bytes_in / 1024 / 1024, 2),
+                '写出(MB)': round(stats.bytes_out / 1024 / 1024, 2),
+                '条目数': stats.items,
+                '条目/秒': round(stats.items_per_sec, 2)
+            })
+        return rows
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': '1.0',
+            'run_id': self.run_id,
+            'started_at': self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'total_wall_time': round(self.total_wall_time, 4),
+            'stages': {name: s.to_dict() for name, s in self.stage_totals().items()},
+            'videos': [s.to_dict() for s in self.video_stats()],
+            'unattributed': [s.to_dict() for s in self.unattributed_stats()]
+        }
+
+    def merge_dict(self, data: Dict):
+        """合并另一份 to_dict() 导出的指标（如批处理子进程的结果）"""
+        for s in data.get('videos', []) + data.get('unattributed', []):
+            self.record(s['stage'], video=s.get('video'), wall_time=s['wall_time'],
+                        cpu_time=s['cpu_time'], bytes_in=s['bytes_in'],
+                        bytes_out=s['bytes_out'], items=s['items'], calls=s['calls'])
+
+    def to_prometheus(self, prefix: str = "video_pipeline") -> str:
+        """
+        导出 Prometheus 文本格式
+
+        阶段汇总和单个视频的明细使用不同的指标名（{prefix}_stage_* / {prefix}_video_stage_*），
+        对任一指标 sum() 不会重复计数；计数器按约定以 _total 结尾
+        """
+        metrics = [
+            ('wall_seconds_total', 'counter', 'Wall clock time spent in stage', 'wall_time'),
+            ('cpu_seconds_total', 'counter', 'CPU time spent in stage', 'cpu_time'),
+            ('bytes_in_total', 'counter', 'Bytes read by stage', 'bytes_in'),
+            ('bytes_out_total', 'counter', 'Bytes written by stage', 'bytes_out'),
+            ('items_total', 'counter', 'Items processed by stage', 'items'),
+            ('items_per_second', 'gauge', 'Stage throughput', 'items_per_sec'),
+        ]
+        series = [
+            ('stage', '', list(self.stage_totals().values()), False),
+            ('video_stage', ' (per video)', self.video_stats(), True),
+        ]
+        lines = []
+        for group, help_suffix, stats_list, per_video in series:
+            for metric, kind, help_text, attr in metrics:
+                name = f"{prefix}_{group}_{metric}"
+                lines.append(f"# HELP {name} {help_text}{help_suffix}")
+                lines.append(f"# TYPE {name} {kind}")
+                for stats in stats_list:
+                    labels = f'run_id="{self.run_id}",stage="{_escape_label(stats.stage)}"'
+                    if per_video:
+                        labels += f',video="{_escape_label(stats.video)}"'
+                    lines.append(f"{name}{{{labels}}} {getattr(stats, attr)}")
+        name = f"{prefix}_run_wall_seconds"
+        lines.append(f"# HELP {name} Total wall clock time of the run")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f'{name}{{run_id="{self.run_id}"}} {self.total_wall_time}')
+        return "\n".join(lines) + "\n"
+
+    def save(self, json_path: str) -> Tuple[str, str]:
+        """保存 JSON 运行剖析，并在同目录写出同名 .prom 文件"""
+        self.finish()
+        os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        prom_path = os.path.splitext(json_path)[0]
+        if prom_path.endswith('.profile'):
+            prom_path = prom_path[:-len('.profile')]
+        prom_path += '.prom'
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        logger.info(f"运行剖析已保存至 {json_path} / {prom_path}")
+        return json_path, prom_path
+
+
+def _escape_label(value: Optional[str]) -> str:
+    return str(value or "").replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,125 @@
+import os
+import uuid
+import logging
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from core.cancellation import CancellationToken
+from core.ffmpeg_renderer import (
+    ClipInput, RenderSpec, Piece, effective_transition_duration,
+    render_pieces, concat_pieces, remove_pieces
+)
+
+logger = logging.getLogger(__name__)
+
+
+def plan_chunks(clips: List[ClipInput], transition_duration: float, chunks: int,
+                end_card: bool = False, max_inputs: Optional[int] = None) -> List[Piece]:
+    """
+    在片段边界把时间线切成若干可独立渲染的分段，各段时长尽量均衡；
+    指定 max_inputs 时再拆分输入过多的分段，限制单个 ffmpeg 进程同时打开的输入数
+
+    有转场时，分段在转场开始处切开：前一段的最后一个片段去掉尾部 d 秒，
+    后一段以这 d 秒尾部开头、紧接着与下一个片段做转场，因此拼接后与整体渲染一致。
+    """
+    d = transition_duration
+    chunks = max(1, min(chunks, len(clips)))
+    total = sum(c.duration for c in clips) - d * max(0, len(clips) - 1)
+    target = total / chunks
+
+    groups: List[List[int]] = [[]]
+    acc = 0.0
+    for i, clip in enumerate(clips):
+        groups[-1].append(i)
+        acc += clip.duration - (d if i > 0 else 0.0)
+        remaining = len(clips) - i - 1
+        if len(groups) < chunks and remaining > 0 and acc >= target * len(groups):
+            groups.append([])
+    if max_inputs:
+        # 预留上一段尾部和片尾两个输入
+        limit = max(1, max_inputs - 2)
+        groups = [g[k:k + limit] for g in groups for k in range(0, len(g), limit)]
+
+    pieces: List[Piece] = []
+    for g, indices in enumerate(groups):
+        inputs: List[ClipInput] = []
+        if g > 0 and d > 0:
+            prev = clips[indices[0] - 1]
+            inputs.append(replace(prev, start=prev.start + prev.duration - d, duration=d))
+        for i in indices:
+            inputs.append(clips[i])
+        if g < len(groups) - 1 and d > 0:
+            last = inputs[-1]
+            inputs[-1] = replace(last, duration=last.duration - d)
+        pieces.append(Piece('render', inputs, end_card=end_card and g == len(groups) - 1))
+    return pieces
+
+
+def section_pieces(clips: List[ClipInput], spec: RenderSpec, transition_duration: float) -> List[Piece]:
+    """
+    渲染缓存使用的分段方式：每段一个片段（加上一段转场尾部），片尾单独一段，
+    修改单个片段、转场或标语时只有对应分段的内容哈希改变
+    """
+    pieces = plan_chunks(clips, transition_duration, len(clips), max_inputs=3)
+    if spec.end_card:
+        pieces.append(Piece('render', [], end_card=True))
+    return pieces
+
+
+class ParallelRenderer:
+    """分块并行渲染：每个分段由独立的 ffmpeg 编码进程渲染，最后无损拼接"""
+
+    def __init__(self, temp_dir: str, workers: Optional[int] = None, max_open_inputs: Optional[int] = None,
+                 cache=None):
+        self.temp_dir = temp_dir
+        self.cache = cache
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_open_inputs = max_open_inputs
+        # 所有并行进程合计同时打开的输入上限，平均分给各个进程（每个进程至少 3 个）；
+        # 实际并行度再由 concurrency() 按各分段的输入数收紧，保证合计不超过上限
+        self.max_inputs = max(3, max_open_inputs // self.workers) if max_open_inputs else None
+        os.makedirs(temp_dir, exist_ok=True)
+
+    def concurrency(self, pieces: List[Piece]) -> int:
+        """同时运行的 ffmpeg 进程数：不超过 workers，且合计打开的输入数不超过 max_open_inputs"""
+        if not self.max_open_inputs:
+            return self.workers
+        inputs_per_piece = max([len(piece.clips) for piece in pieces] + [1])
+        return max(1, min(self.workers, self.max_open_inputs // inputs_per_piece))
+
+    def encoder_threads(self, workers: Optional[int] = None) -> int:
+        """每个编码进程的线程数：CPU 核数平均分给各个并行分段"""
+        return max(1, (os.cpu_count() or 1) // (workers or self.workers))
+
+    def render(self, clips: List[ClipInput], spec: RenderSpec, output_path: str,
+               encode_args: List[str], token: Optional[CancellationToken] = None,
+               suffix: Optional[Tuple[str, float]] = None, tracker=None) -> Dict:
+        """
+        渲染时间线到 output_path；suffix 为 (分段路径, 时长)，流复制拼接在结尾（如缓存的片尾），
+        tracker（ProgressTracker）接收各分段的编码进度
+
+        Returns:
+            Dict: 分段数与并行度
+        """
+        d = effective_transition_duration(clips, spec)
+        if self.cache is not None:
+            pieces = section_pieces(clips, spec, d)
+        else:
+            pieces = plan_chunks(clips, d, self.workers, end_card=bool(spec.end_card), max_inputs=self.max_inputs)
+        workers = self.concurrency(pieces)
+        stem = f"{os.path.splitext(os.path.basename(output_path))[0]}_{uuid.uuid4().hex[:8]}"
+        # 编码配置未固定线程数时，把CPU核平均分给各个并行编码进程
+        args = encode_args if '-threads' in encode_args else encode_args + ['-threads', str(self.encoder_threads(workers))]
+        paths, durations = render_pieces(pieces, spec, args, self.temp_dir, stem, d,
+                                         workers=workers, token=token, cache=self.cache,
+                                         tracker=tracker)
+        try:
+            tail = [suffix] if suffix else []
+            concat_pieces(paths + [t[0] for t in tail], durations + [t[1] for t in tail],
+                          output_path, self.temp_dir, token=token)
+        finally:
+            remove_pieces(paths, self.cache)
+
+        logger.info(f"Parallel render: {len(pieces)} chunks with {workers} workers "
+                    f"({self.encoder_threads(workers)} threads each)")
+        return {'pieces': len(pieces), 'workers': workers}
@@ -0,0 +1,111 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Hashable, Optional
+
+from core.cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RenderProgress:
+    """渲染进度：已输出的时长、倍速（相对实时）和预计剩余时间（秒）"""
+    seconds: float
+    total: float
+    speed: Optional[float] = None
+    eta: Optional[float] = None
+    elapsed: float = 0.0
+    done: bool = False
+
+    @property
+    def fraction(self) -> float:
+        return min(1.0, self.seconds / self.total) if self.total > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['fraction'] = self.fraction
+        return data
+
+
+ProgressCallback = Callable[[RenderProgress], None]
+
+
+class ProgressTracker:
+    """
+    汇总一次渲染的进度：并行分段各自报告已输出的秒数，按整条时间线计算进度、
+    倍速（已输出时长 / 实际耗时）和预计剩余时间，回调至多每 min_interval 秒一次
+    """
+
+    def __init__(self, total_seconds: float, callback: Optional[ProgressCallback] = None,
+                 min_interval: float = 0.5):
+        self.total = max(0.0, total_seconds)
+        self.callback = callback
+        self.min_interval = min_interval
+        self._done: Dict[Hashable, float] = {}
+        self._started = time.monotonic()
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, task: Hashable, seconds: float):
+        """设置某个任务（分段、片尾等）已输出的秒数"""
+        with self._lock:
+            self._done[task] = max(self._done.get(task, 0.0), seconds)
+            now = time.monotonic()
+            if now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+            progress = self._snapshot(now)
+        self._emit(progress)
+
+    def ffmpeg_callback(self, task: Hashable, limit: Optional[float] = None) -> Callable[[Dict], None]:
+        """供 run_ffmpeg(progress=...) 使用的回调，limit 为该任务的输出时长上限"""
+        def callback(fields: Dict):
+            seconds = fields['out_time']
+            if limit is not None:
+                seconds = min(seconds, limit)
+            self.update(task, seconds)
+        return callback
+
+    def finish(self):
+        with self._lock:
+            progress = self._snapshot(time.monotonic())
+            progress.seconds = self.total
+            progress.eta = 0.0
+            progress.done = True
+        self._emit(progress)
+
+    def _snapshot(self, now: float) -> RenderProgress:
+        seconds = min(self.total, sum(self._done.values()))
+        elapsed = now - self._started
+        speed = seconds / elapsed if elapsed > 0 and seconds > 0 else None
+        eta = (self.total - seconds) / speed if speed else None
+        return RenderProgress(seconds=seconds, total=self.total, speed=speed, eta=eta, elapsed=elapsed)
+
+    def _emit(self, progress: RenderProgress):
+        if self.callback is None:
+            return
+        try:
+            self.callback(progress)
+        except Exception as e:
+            logger.debug(f"进度回调失败: {str(e)}")
+
+
+def moviepy_progress_logger(tracker: ProgressTracker, task: Hashable, fps: float,
+                            token: Optional[CancellationToken] = None):
+    """
+    moviepy write_videofile 的 proglog 进度记录器：按已写出的帧数报告进度，
+    并在每帧检查取消令牌（取消时抛出 PipelineCancelled 中止写出）
+    """
+    from proglog import ProgressBarLogger
+
+    class _Logger(ProgressBarLogger):
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if token is not None:
+                token.check()
+            # moviepy 写视频帧的进度条名为 't'，写音频的为 'chunk'
+            if bar == 't' and attr == 'index':
+                tracker.update(task, value / fps)
+
+    return _Logger()
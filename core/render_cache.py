@@ -0,0 +1,148 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+from core.ffmpeg_renderer import Piece, RenderSpec
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(path: str) -> List:
+    """文件标识：绝对路径 + 修改时间 + 大小（文件被替换或修改后哈希随之改变）"""
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+
+def section_hash(piece: Piece, spec: RenderSpec, encode_args: List[str], transition_duration: float) -> str:
+    """
+    时间线分段的内容哈希：片段文件及裁剪区间、字幕、转场、片尾和编码参数
+
+    编码线程数不影响画面内容，不计入哈希。
+    """
+    args = []
+    skip = False
+    for arg in encode_args:
+        if skip:
+            skip = False
+            continue
+        if arg == '-threads':
+            skip = True
+            continue
+        args.append(arg)
+    spec_data = asdict(spec)
+    if not piece.end_card:
+        for field in ('end_card', 'end_card_duration', 'end_card_fade'):
+            spec_data.pop(field)
+    payload = {
+        'kind': piece.kind,
+        'clips': [file_fingerprint(c.path) + [round(c.start, 6), round(c.duration, 6), c.has_audio, c.caption]
+                  for c in piece.clips],
+        'end_card': piece.end_card,
+        'spec': spec_data,
+        'transition_duration': round(transition_duration, 6),
+        'encode': args
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """
+    时间线分段渲染缓存：按分段内容哈希保存已编码的 MPEG-TS 分段，超出容量时删除最久未用的
+
+    lookup/store 返回的分段在 release 之前被占用（同一进程内并发的合成共用一个缓存），
+    prune 不会删除被占用的分段。
+    """
+
+    def __init__(self, root: str = os.path.join("data", "cache", "render"), max_bytes: int = 0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pins: Dict[str, int] = {}
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, piece: Piece, spec: RenderSpec, encode_args: List[str], transition_duration: float) -> str:
+        return section_hash(piece, spec, encode_args, transition_duration)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.ts")
+
+    def owns(self, path: str) -> bool:
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.root)
+
+    def contains(self, key: str) -> bool:
+        """是否已缓存（不计入命中统计）"""
+        return os.path.exists(self.path(key))
+
+    def lookup(self, key: str) -> Optional[str]:
+        """查找缓存的分段，命中时占用该分段（用完后调用 release）"""
+        path = self.path(key)
+        with self._lock:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pin(path)
+            return path
+
+    def store(self, key: str, rendered_path: str) -> str:
+        """把新渲染的分段移入缓存（原子替换）并占用，返回缓存路径"""
+        path = self.path(key)
+        with self._lock:
+            os.replace(rendered_path, path)
+            self._pin(path)
+        return path
+
+    def release(self, path: str):
+        """释放 lookup/store 占用的分段"""
+        path = os.path.abspath(path)
+        with self._lock:
+            count = self._pins.get(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+            else:
+                self._pins.pop(path, None)
+
+    def _pin(self, path: str):
+        path = os.path.abspath(path)
+        self._pins[path] = self._pins.get(path, 0) + 1
+
+    def prune(self, since: Optional[float] = None):
+        """
+        按最近使用时间淘汰，直到总大小不超过 max_bytes（0 表示不限制）
+
+        被占用的分段、以及 since（time.time() 时间戳，通常为本次渲染开始时间）之后使用过的分段不会被删除。
+        """
+        if not self.max_bytes:
+            return
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith('.ts'):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if os.path.abspath(path) in self._pins or (since is not None and mtime >= since):
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    total -= size
+                except OSError as e:
+                    logger.debug(f"Failed to prune {path}: {str(e)}")
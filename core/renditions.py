@@ -0,0 +1,141 @@
+import os
+import math
+import logging
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from core.cancellation import CancellationToken
+from core.encoding import ffmpeg_encode_args, resolve_profile
+from core.ffmpeg_renderer import FFmpegRenderer, ClipInput, RenderSpec
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Rendition:
+    """一档输出：名称、分辨率及可选的目标码率（未指定时按编码配置的 crf）"""
+    name: str
+    width: int
+    height: int
+    bitrate: str = ""
+    audio_bitrate: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Rendition":
+        return cls(name=str(data['name']), width=int(data['width']), height=int(data['height']),
+                   bitrate=data.get('bitrate', ''), audio_bitrate=data.get('audio_bitrate', ''))
+
+
+def parse_ladder(ladder: List[Union[Rendition, Dict]]) -> List[Rendition]:
+    """把配置中的输出档位转换为 Rendition 列表，按分辨率从高到低排序"""
+    renditions = [r if isinstance(r, Rendition) else Rendition.from_dict(r) for r in ladder]
+    if not renditions:
+        raise ValueError("Rendition ladder is empty")
+    names = [r.name for r in renditions]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate rendition names: {names}")
+    return sorted(renditions, key=lambda r: r.width * r.height, reverse=True)
+
+
+def rendition_encode_args(rendition: Rendition, encode_profile=None) -> List[str]:
+    """单档输出的编码参数：在编码配置基础上覆盖码率"""
+    profile = resolve_profile(encode_profile)
+    if rendition.bitrate:
+        profile['bitrate'] = rendition.bitrate
+    if rendition.audio_bitrate:
+        profile['audio_bitrate'] = rendition.audio_bitrate
+    return ffmpeg_encode_args(profile)
+
+
+def hls_output_args(playlist_path: str, segment_time: float) -> List[str]:
+    """HLS 输出参数：按分片时长强制关键帧，保证每个分片以关键帧开始且各档位分片对齐"""
+    segment_pattern = os.path.join(os.path.dirname(playlist_path), "seg_%05d.ts")
+    return ['-force_key_frames', f"expr:gte(t,n_forced*{segment_time:g})", '-sc_threshold', '0',
+            '-f', 'hls', '-hls_time', f"{segment_time:g}", '-hls_playlist_type', 'vod',
+            '-hls_segment_filename', segment_pattern, playlist_path]
+
+
+def playlist_bandwidth(playlist_path: str) -> Tuple[int, int]:
+    """
+    根据媒体播放列表中各分片的实际大小和时长计算码率
+
+    Returns:
+        (峰值码率, 平均码率)，单位 bit/s
+    """
+    directory = os.path.dirname(playlist_path)
+    peak = 0.0
+    total_bits = 0.0
+    total_duration = 0.0
+    duration = None
+    with open(playlist_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',')[0])
+            elif line and not line.startswith('#') and duration:
+                bits = os.path.getsize(os.path.join(directory, line)) * 8
+                peak = max(peak, bits / duration)
+                total_bits += bits
+                total_duration += duration
+                duration = None
+    average = total_bits / total_duration if total_duration else 0.0
+    return int(math.ceil(peak)), int(math.ceil(average))
+
+
+def write_master_playlist(path: str, entries: List[Tuple[Rendition, str]], fps: float) -> str:
+    """写 HLS 主播放列表：entries 为 (档位, 媒体播放列表路径)，按峰值码率从高到低列出"""
+    directory = os.path.dirname(os.path.abspath(path))
+    variants = []
+    for rendition, playlist in entries:
+        peak, average = playlist_bandwidth(playlist)
+        variants.append((peak, average, rendition, os.path.relpath(os.path.abspath(playlist), directory)))
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for peak, average, rendition, uri in sorted(variants, key=lambda v: v[0], reverse=True):
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={peak},AVERAGE-BANDWIDTH={average},"
+                     f"RESOLUTION={rendition.width}x{rendition.height},FRAME-RATE={fps:.3f}")
+        lines.append(uri.replace(os.sep, '/'))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def render_renditions(clips: List[ClipInput], spec: RenderSpec, renditions: List[Rendition],
+                      output_dir: str, stem: str, temp_dir: str, encode_profile=None,
+                      hls: bool = False, segment_time: float = 6.0,
+                      token: Optional[CancellationToken] = None,
+                      progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, str]:
+    """
+    一次解码多档输出：时间线按最高档分辨率解码、转场、烧录字幕和片尾，
+    再 split 缩放到各档位分别编码（MP4，或 hls=True 时输出 HLS 分片和主播放列表）
+
+    Returns:
+        {档位名称: 输出路径}；HLS 模式下另含 'master' 指向主播放列表
+    """
+    renditions = parse_ladder(renditions)
+    top = renditions[0]
+    spec = replace(spec, width=top.width, height=top.height)
+    os.makedirs(output_dir, exist_ok=True)
+
+    outputs = []
+    paths: Dict[str, str] = {}
+    for rendition in renditions:
+        encode_args = rendition_encode_args(rendition, encode_profile)
+        if hls:
+            rendition_dir = os.path.join(output_dir, stem, rendition.name)
+            os.makedirs(rendition_dir, exist_ok=True)
+            path = os.path.join(rendition_dir, "index.m3u8")
+            out_args = encode_args + hls_output_args(path, segment_time)
+        else:
+            path = os.path.join(output_dir, f"{stem}_{rendition.name}.mp4")
+            out_args = encode_args + ['-movflags', '+faststart', path]
+        outputs.append((rendition.width, rendition.height, out_args))
+        paths[rendition.name] = path
+
+    FFmpegRenderer(temp_dir).render_outputs(clips, spec, outputs, token=token, progress=progress)
+
+    if hls:
+        master = os.path.join(output_dir, stem, "master.m3u8")
+        write_master_playlist(master, [(r, paths[r.name]) for r in renditions], spec.fps)
+        paths['master'] = master
+    logger.info(f"Rendered {len(renditions)} renditions: {', '.join(r.name for r in renditions)}")
+    return paths
@@ -0,0 +1,200 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from core.cancellation import CancellationToken, PipelineCancelled
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖，缺失时从 /proc 读取内存
+    psutil = None
+
+
+def current_rss_bytes() -> int:
+    """当前进程（含子进程，如 ffmpeg）的常驻内存字节数"""
+    if psutil is not None:
+        try:
+            proc = psutil.Process()
+            total = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        except psutil.Error:
+            return 0
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class ResourceGovernor:
+    """
+    资源调度器：限制临时磁盘占用、并发解码器数量和常驻内存
+
+    达到上限时，申请资源的上游阶段会阻塞等待，等待时长按资源类型累计，
+    并可写入 PipelineMetrics（阶段名为 throttle:<资源>）。上限为 0 表示不限制。
+
+    磁盘配额和内存的等待至多 max_wait 秒（<=0 表示不限），超时后放行并记录警告，
+    避免基线内存（如已加载的模型）本身超过上限时永久阻塞；等待期间设置了 stop 事件
+    或取消令牌时抛出 PipelineCancelled。
+    """
+
+    def __init__(self, max_scratch_bytes: int = 0, max_decoders: int = 0,
+                 max_memory_bytes: int = 0, poll_interval: float = 0.5,
+                 max_wait: float = 60.0):
+        self.max_scratch_bytes = max_scratch_bytes
+        self.max_decoders = max_decoders
+        self.max_memory_bytes = max_memory_bytes
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._scratch: Dict[str, int] = {}  # key -> 预留字节数
+        self._decoders = 0
+        self._throttled: Dict[str, float] = {'scratch': 0.0, 'decoder': 0.0, 'memory': 0.0}
+        self._waits: Dict[str, int] = {'scratch': 0, 'decoder': 0, 'memory': 0}
+
+    @property
+    def scratch_bytes(self) -> int:
+        with self._cond:
+            return sum(self._scratch.values())
+
+    def reserve_scratch(self, key: str, nbytes: int, metrics=None,
+                        stop: Optional[threading.Event] = None,
+                        token: Optional[CancellationToken] = None):
+        """
+        为临时文件预留磁盘配额，超出上限时阻塞；没有其他预留时总是放行，避免单个大文件永久等待，
+        等待超过 max_wait 时超额放行
+        """
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while (self.max_scratch_bytes and self._scratch
+                   and sum(self._scratch.values()) + nbytes > self.max_scratch_bytes):
+                self._check_stop(stop, token)
+                if self._wait_expired(start):
+                    logger.warning(f"等待临时磁盘配额超过 {self.max_wait} 秒，超额预留 {nbytes} 字节")
+                    break
+                waited = True
+                self._cond.wait(self.poll_interval)
+            self._scratch[key] = self._scratch.get(key, 0) + int(nbytes)
+        if waited:
+            self._record('scratch', time.perf_counter() - start, metrics)
+
+    def adjust_scratch(self, key: str, nbytes: int):
+        """按实际大小修正预留（不阻塞）"""
+        with self._cond:
+            if key in self._scratch:
+                self._scratch[key] = int(nbytes)
+                self._cond.notify_all()
+
+    def release_scratch(self, key: str):
+        with self._cond:
+            if self._scratch.pop(key, None) is not None:
+                self._cond.notify_all()
+
+    @contextmanager
+    def decoder(self, metrics=None):
+        """占用一个解码器槽位（VideoFileClip / ffmpeg 读取进程）"""
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while self.max_decoders and self._decoders >= self.max_decoders:
+                waited = True
+                self._cond.wait(self.poll_interval)
+            self._decoders += 1
+        if waited:
+            self._record('decoder', time.perf_counter() - start, metrics)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._decoders -= 1
+                self._cond.notify_all()
+
+    def wait_for_memory(self, metrics=None, stop: Optional[threading.Event] = None,
+                        token: Optional[CancellationToken] = None) -> bool:
+        """
+        常驻内存超过上限时轮询等待，直到下游释放内存（只应由上游生产者调用，
+        下游等待会与上游互相阻塞）
+
+        Returns:
+            bool: 内存回落到上限以下时为 True；等待超过 max_wait 后放行时为 False
+        """
+        if not self.max_memory_bytes:
+            return True
+        start = time.perf_counter()
+        waited = False
+        released = True
+        while current_rss_bytes() > self.max_memory_bytes:
+            self._check_stop(stop, token)
+            if self._wait_expired(start):
+                logger.warning(f"常驻内存等待超过 {self.max_wait} 秒仍高于上限 {self.max_memory_bytes} 字节，"
+                               f"继续处理（上限可能低于基线内存）")
+                released = False
+                break
+            if not waited:
+                logger.warning(f"常驻内存超过上限 {self.max_memory_bytes} 字节，暂停上游阶段")
+            waited = True
+            if stop is not None:
+                stop.wait(self.poll_interval)
+            elif token is not None:
+                token.wait(self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
+        if waited:
+            self._record('memory', time.perf_counter() - start, metrics)
+        return released
+
+    @staticmethod
+    def _check_stop(stop: Optional[threading.Event], token: Optional[CancellationToken]):
+        if token is not None:
+            token.check()
+        if stop is not None and stop.is_set():
+            raise PipelineCancelled("等待资源时被停止")
+
+    def _wait_expired(self, start: float) -> bool:
+        return self.max_wait > 0 and time.perf_counter() - start >= self.max_wait
+
+    def throttle_stats(self) -> Dict[str, Dict[str, float]]:
+        """各类资源累计的限流等待时间和次数"""
+        with self._cond:
+            return {
+                name: {'seconds': round(self._throttled[name], 3), 'waits': self._waits[name]}
+                for name in self._throttled
+            }
+
+    def _record(self, resource: str, seconds: float, metrics=None):
+        with self._cond:
+            self._throttled[resource] += seconds
+            self._waits[resource] += 1
+        if metrics is not None:
+            metrics.record(f"throttle:{resource}", wall_time=seconds)
+        logger.debug(f"资源 {resource} 限流等待 {seconds:.2f} 秒")
+
+
+_default_governor: Optional[ResourceGovernor] = None
+_default_lock = threading.Lock()
+
+
+def default_governor() -> ResourceGovernor:
+    """进程内共享的资源调度器（按 Config 中的上限创建）"""
+    global _default_governor
+    with _default_lock:
+        if _default_governor is None:
+            from config import Config
+            _default_governor = ResourceGovernor(
+                max_scratch_bytes=Config.MAX_SCRATCH_BYTES,
+                max_decoders=Config.MAX_DECODERS,
+                max_memory_bytes=Config.MAX_RESIDENT_MEMORY_BYTES,
+                max_wait=Config.RESOURCE_MAX_WAIT
+            )
+        return _default_governor
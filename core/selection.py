@@ -0,0 +1,197 @@
+import math
+import heapq
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 单次选择的运算量上限（各维度背包状态数与分组合并运算量之和，见 _dp_cells）
+MAX_DP_CELLS = 100_000_000
+
+
+def _dimension_weight(dimension: str, weights: Optional[Dict[str, float]]) -> float:
+    """维度权重：先按完整路径（如 '品牌认知 > 产品特性'）查找，再按最后一级名称查找，默认 1.0"""
+    if not weights or not dimension:
+        return 1.0
+    if dimension in weights:
+        return float(weights[dimension])
+    return float(weights.get(dimension.split(' > ')[-1], 1.0))
+
+
+def _prune_dominated(items: List[Tuple[int, int, float]], limit: int) -> List[Tuple[int, int, float]]:
+    """
+    去掉被支配的片段：若已有 limit 个保留的片段代价不高于它、价值不低于它，
+    任何最多选 limit 个片段的方案都可以用其中未选中的一个替换它，因此它不必参与背包
+    """
+    kept, heap = [], []
+    for item in sorted(items, key=lambda x: (x[1], -x[2])):
+        if len(heap) >= limit and item[2] <= heap[0]:
+            continue
+        kept.append(item)
+        heapq.heappush(heap, item[2])
+        if len(heap) > limit:
+            heapq.heappop(heap)
+    return kept
+
+
+def _group_curve(costs: np.ndarray, values: np.ndarray, capacity: int,
+                 quota: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    单个维度内的 0/1 背包：curve[c] 为总代价不超过 c、且最多选 quota 个片段时的最大价值
+
+    Returns:
+        (curve, take)；take[k, j] 为按位存储（np.packbits）的一行，第 c 位表示处理到第 k 个片段、
+        剩余名额 j、容量 c 时选中它，用于回溯（不限数量时名额维度只有一行）
+    """
+    rows = 1 if quota is None else min(quota, len(costs)) + 1
+    dp = np.zeros((rows, capacity + 1))
+    take = np.zeros((len(costs), rows, capacity // 8 + 1), dtype=np.uint8)
+    for k, (w, v) in enumerate(zip(costs, values)):
+        if w > capacity:
+            continue
+        better = np.zeros((rows, capacity + 1), dtype=bool)
+        if quota is None:
+            candidate = dp[0, :capacity + 1 - w] + v
+            better[0, w:] = candidate > dp[0, w:]
+            dp[0, w:] = np.where(better[0, w:], candidate, dp[0, w:])
+        elif rows > 1:
+            candidate = dp[:-1, :capacity + 1 - w] + v
+            better[1:, w:] = candidate > dp[1:, w:]
+            dp[1:, w:] = np.where(better[1:, w:], candidate, dp[1:, w:])
+        take[k] = np.packbits(better, axis=-1)
+    return dp[-1], take
+
+
+def _backtrack(take: np.ndarray, costs: np.ndarray, capacity: int, unlimited: bool) -> List[int]:
+    chosen = []
+    j, c = take.shape[1] - 1, capacity
+    for k in range(len(costs) - 1, -1, -1):
+        if c < 0 or j < 0:
+            break
+        if take[k, j, c >> 3] >> (7 - (c & 7)) & 1:
+            chosen.append(k)
+            c -= costs[k]
+            if not unlimited:
+                j -= 1
+    return chosen
+
+
+def _build_groups(segments: Sequence, d: float, capacity: int, resolution: float,
+                  quotas: Optional[Dict[str, int]], default_quota: Optional[int],
+                  weights: Optional[Dict[str, float]]) -> List[Tuple[List[Tuple[int, int, float]], Optional[int]]]:
+    """按维度分组并离散化代价，剔除被支配的片段；返回 [(片段列表, 名额)]，名额不起约束时为 None"""
+    groups: Dict[str, List[Tuple[int, int, float]]] = {}
+    for index, segment in enumerate(segments):
+        duration = segment.end - segment.start
+        value = float(segment.score) * _dimension_weight(getattr(segment, 'dimension', ''), weights)
+        if duration <= 0 or value <= 0:
+            continue
+        cost = max(1, int(math.ceil((duration - d) / resolution - 1e-9)))
+        if cost > capacity:
+            continue
+        groups.setdefault(getattr(segment, 'dimension', '') or '', []).append((index, cost, value))
+
+    result = []
+    for dimension, items in groups.items():
+        quota = (quotas or {}).get(dimension, default_quota)
+        if quota is not None and quota <= 0:
+            continue
+        # 容量最多装下 capacity // 最小代价 个片段，名额不小于它时不起约束
+        fits = capacity // min(cost for _, cost, _ in items)
+        if quota is not None and quota >= fits:
+            quota = None
+        result.append((_prune_dominated(items, fits if quota is None else quota), quota))
+    return result
+
+
+def _dp_cells(groups: List[Tuple[List, Optional[int]]], capacity: int) -> int:
+    """
+    求解的总运算量：各维度背包的状态数（片段数 × 名额行数 × 容量，也决定回溯表大小），
+    加上分组合并的运算量（每个维度按其可达的代价数 × 容量）
+    """
+    cells = 0
+    for items, quota in groups:
+        rows = 1 if quota is None else min(quota, len(items)) + 1
+        costs = sorted((cost for _, cost, _ in items), reverse=True)
+        # 曲线只在可达的总代价处上升，最大可达代价不超过最多 quota 个片段的代价之和
+        reach = min(capacity, sum(costs if quota is None else costs[:quota]))
+        cells += len(items) * rows * (capacity + 1) + reach * (capacity + 1)
+    return cells
+
+
+def select_segments(segments: Sequence, target_duration: float,
+                    quotas: Optional[Dict[str, int]] = None,
+                    default_quota: Optional[int] = None,
+                    weights: Optional[Dict[str, float]] = None,
+                    transition_duration: float = 0.0,
+                    resolution: float = 0.1) -> List:
+    """
+    按目标时长选择片段：在总时长不超过 target_duration 的前提下，最大化片段的加权分数之和
+
+    每个片段的价值为 score × 所属维度的权重；相邻片段有 transition_duration 秒转场重叠，
+    因此除第一个片段外每个片段只占用 (时长 - 转场时长)。每个维度最多选 quotas[维度] 个
+    （未列出的维度使用 default_quota，None 表示不限）。
+
+    求解方法：时长按 resolution 秒向上取整离散化，各维度内先剔除被支配的片段，再做带数量上限的
+    0/1 背包（回溯表按位存储），最后按维度做分组背包合并，复杂度约为
+    O(保留片段数 × 名额 × 容量 + 维度数 × 容量²)。两部分运算量之和（见 _dp_cells）超过
+    MAX_DP_CELLS 时逐次把 resolution 放大一倍再求解：总时长仍不超过目标，但结果可能略为保守。
+
+    Args:
+        segments: 候选片段（需要 start、end、score，可选 dimension 属性）
+
+    Returns:
+        List: 选中的片段，保持原有顺序
+    """
+    if not segments or target_duration <= 0:
+        return []
+    d = max(0.0, transition_duration)
+
+    # 运算量过大时放宽时长精度，限制耗时和内存
+    while True:
+        capacity = int(math.floor(max(0.0, target_duration - d) / resolution + 1e-9))
+        groups = _build_groups(segments, d, capacity, resolution, quotas, default_quota, weights)
+        cells = _dp_cells(groups, capacity)
+        if cells <= MAX_DP_CELLS or capacity <= 1:
+            break
+        logger.info(f"选择运算量 {cells} 超过上限 {MAX_DP_CELLS}，时长精度从 {resolution:g} 秒放宽到 {resolution * 2:g} 秒")
+        resolution *= 2
+
+    group_results = []
+    for items, quota in groups:
+        costs = np.array([cost for _, cost, _ in items], dtype=int)
+        values = np.array([value for _, _, value in items])
+        curve, take = _group_curve(costs, values, capacity, quota)
+        group_results.append((items, costs, curve, take, quota is None))
+
+    # 分组背包：best[c] 为前若干个维度在总代价不超过 c 时的最大价值，split 记录分给每个维度的容量
+    best = np.zeros(capacity + 1)
+    splits = []
+    for _, _, curve, _, _ in group_results:
+        merged = best.copy()
+        split = np.zeros(capacity + 1, dtype=int)
+        for a in range(1, capacity + 1):
+            if curve[a] <= curve[a - 1]:
+                continue
+            candidate = best[:capacity + 1 - a] + curve[a]
+            better = candidate > merged[a:]
+            merged[a:] = np.where(better, candidate, merged[a:])
+            split[a:] = np.where(better, a, split[a:])
+        best = merged
+        splits.append(split)
+
+    chosen = set()
+    c = capacity
+    for (items, costs, _, take, unlimited), split in zip(reversed(group_results), reversed(splits)):
+        allotted = int(split[c])
+        for k in _backtrack(take, costs, allotted, unlimited):
+            chosen.add(items[k][0])
+        c -= allotted
+
+    selected = [segment for index, segment in enumerate(segments) if index in chosen]
+    total = sum(s.end - s.start for s in selected) - d * max(0, len(selected) - 1)
+    logger.info(f"按目标时长选择片段：{len(segments)} 个候选中选出 {len(selected)} 个，"
+                f"总时长 {total:.1f} 秒（目标 {target_duration:.1f} 秒），加权分数 {best[capacity]:.2f}")
+    return selected
@@ -0,0 +1,173 @@
+import os
+import uuid
+import logging
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from core.cancellation import CancellationToken
+from core.ffmpeg_tools import FFPROBE_BIN, run_process
+from core.ffmpeg_renderer import (
+    ClipInput, RenderSpec, Piece, effective_transition_duration, timeline_duration,
+    render_pieces, concat_pieces, remove_pieces
+)
+
+logger = logging.getLogger(__name__)
+
+EPSILON = 1e-3
+
+
+def keyframe_times(path: str, timeout: Optional[float] = 60.0,
+                   token: Optional[CancellationToken] = None) -> List[float]:
+    """读取视频流的关键帧时间点（只读包头，不解码），以首个包为 0 点"""
+    output = run_process([FFPROBE_BIN, '-v', 'error', '-select_streams', 'v:0',
+                          '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path],
+                         timeout=timeout, token=token)
+    times = []
+    keyframes = []
+    for line in output.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 2 or parts[0] in ('', 'N/A'):
+            continue
+        t = float(parts[0])
+        times.append(t)
+        if 'K' in parts[1]:
+            keyframes.append(t)
+    if not times:
+        return []
+    origin = min(times)
+    return sorted(k - origin for k in keyframes)
+
+
+# ffprobe 报告的 H.264 profile -> libx264 的 -profile:v 取值（其余 profile 无法用 yuv420p 8bit 编出）
+X264_PROFILES = {
+    'Constrained Baseline': 'baseline',
+    'Baseline': 'baseline',
+    'Main': 'main',
+    'High': 'high'
+}
+
+
+def h264_stream_args(video: Dict) -> List[str]:
+    """
+    让 libx264 输出与源视频相同 profile 和 level 的编码参数，
+    重新编码的窗口与流复制的片段可以拼接到同一视频轨道
+    """
+    level = int(video['level'])
+    level_arg = '1b' if level == 9 else f"{level / 10:.1f}"
+    return ['-profile:v', X264_PROFILES[video['profile']], '-level:v', level_arg]
+
+
+def compatible(infos: List[Dict], spec: RenderSpec) -> Optional[str]:
+    """
+    检查片段能否与重新编码的窗口直接拼接（重新编码时使用 h264_stream_args 对齐 profile 和 level）
+
+    Returns:
+        不兼容的原因；兼容时返回 None
+    """
+    for info in infos:
+        video, audio = info['video'], info['audio']
+        if not video or video['codec'] != 'h264' or video['pix_fmt'] != 'yuv420p':
+            return "video is not h264/yuv420p"
+        if video.get('profile') not in X264_PROFILES or not video.get('level') or video['level'] <= 0:
+            return f"unsupported h264 profile/level {video.get('profile')}/{video.get('level')}"
+        if (X264_PROFILES[video['profile']], video['level']) != (
+                X264_PROFILES.get(infos[0]['video']['profile']), infos[0]['video']['level']):
+            return "h264 profile/level differs between clips"
+        if (video['width'], video['height']) != (spec.width, spec.height):
+            return "resolution differs from output"
+        if abs(video['fps'] - spec.fps) > 0.01:
+            return "frame rate differs from output"
+        if not audio or audio['codec'] != 'aac' or audio['channels'] != 2:
+            return "audio is not stereo aac"
+        if audio['sample_rate'] != infos[0]['audio']['sample_rate']:
+            return "audio sample rates differ"
+    return None
+
+
+def plan_pieces(clips: List[ClipInput], keyframes: List[List[float]], transition_duration: float,
+                end_card: bool = False, min_copy: float = 1.0) -> List[Piece]:
+    """
+    把时间线切分为流复制段和重新编码段
+
+    每个片段的内部（不受转场和字幕影响、且起点落在关键帧上的部分）直接流复制；
+    转场两侧到最近关键帧为止的窗口、带字幕的片段以及片尾合并为重新编码段。
+    """
+    d = transition_duration
+    n = len(clips)
+    pieces: List[Piece] = []
+    pending: List[ClipInput] = []
+
+    for i, clip in enumerate(clips):
+        interior = None
+        if not clip.caption:
+            head = d if i > 0 else 0.0
+            tail = d if i < n - 1 else 0.0
+            start = next((k for k in keyframes[i] if k >= head - EPSILON), None)
+            if tail > 0:
+                end = next((k for k in reversed(keyframes[i]) if k <= clip.duration - tail + EPSILON), None)
+            else:
+                end = clip.duration
+            if start is not None and end is not None and end - start >= min_copy:
+                interior = (start, end)
+
+        if interior is None:
+            pending.append(clip)
+            continue
+
+        start, end = interior
+        if start > EPSILON:
+            pending.append(replace(clip, start=clip.start, duration=start))
+        if pending:
+            pieces.append(Piece('render', pending))
+            pending = []
+        pieces.append(Piece('copy', [replace(clip, start=clip.start + start, duration=end - start)]))
+        if clip.duration - end > EPSILON:
+            pending.append(replace(clip, start=clip.start + end, duration=clip.duration - end))
+
+    if pending or end_card:
+        pieces.append(Piece('render', pending, end_card=end_card))
+    return pieces
+
+
+class SmartRenderer:
+    """智能渲染：只重新编码转场、字幕和片尾所在的 GOP 对齐窗口，其余部分流复制后拼接"""
+
+    def __init__(self, temp_dir: str, workers: int = 1, cache=None):
+        self.temp_dir = temp_dir
+        self.workers = workers
+        self.cache = cache
+        os.makedirs(temp_dir, exist_ok=True)
+
+    def render(self, clips: List[ClipInput], spec: RenderSpec, output_path: str,
+               encode_args: List[str], keyframes: List[List[float]],
+               token: Optional[CancellationToken] = None,
+               suffix: Optional[Tuple[str, float]] = None, tracker=None) -> Dict:
+        """
+        渲染时间线到 output_path；suffix 为 (分段路径, 时长)，流复制拼接在结尾（如缓存的片尾），
+        tracker（ProgressTracker）接收各分段的进度
+
+        Returns:
+            Dict: 分段数、流复制与重新编码的媒体时长
+        """
+        d = effective_transition_duration(clips, spec)
+        pieces = plan_pieces(clips, keyframes, d, end_card=bool(spec.end_card))
+        stem = f"{os.path.splitext(os.path.basename(output_path))[0]}_{uuid.uuid4().hex[:8]}"
+        paths, durations = render_pieces(pieces, spec, encode_args, self.temp_dir, stem, d,
+                                         workers=self.workers, token=token, cache=self.cache,
+                                         tracker=tracker)
+        try:
+            tail = [suffix] if suffix else []
+            concat_pieces(paths + [t[0] for t in tail], durations + [t[1] for t in tail],
+                          output_path, self.temp_dir, token=token)
+        finally:
+            remove_pieces(paths, self.cache)
+
+        stats = {
+            'pieces': len(pieces),
+            'copied_seconds': sum(t for p, t in zip(pieces, durations) if p.kind == 'copy'),
+            'rendered_seconds': sum(t for p, t in zip(pieces, durations) if p.kind == 'render')
+        }
+        logger.info(f"Smart render: {stats['pieces']} pieces, "
+                    f"{stats['copied_seconds']:.1f}s copied, {stats['rendered_seconds']:.1f}s re-encoded "
+                    f"(timeline {timeline_duration(clips, spec):.1f}s)")
+        return stats
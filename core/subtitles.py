@@ -0,0 +1,107 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from core.ffmpeg_tools import escape_filter_value
+
+
+@dataclass
+class CaptionEvent:
+    """时间线上的一条字幕（秒）"""
+    start: float
+    end: float
+    text: str
+
+
+def caption_events(items: Sequence[Tuple[float, str]], transition_duration: float = 0.0) -> List[CaptionEvent]:
+    """
+    根据各片段的 (时长, 字幕文本) 计算整条时间线上的字幕事件
+
+    相邻片段有 d 秒转场重叠时，字幕在转场中点切换，避免两条字幕同时出现。
+    """
+    d = transition_duration
+    events = []
+    offset = 0.0
+    for i, (duration, text) in enumerate(items):
+        start = offset + (d / 2 if i > 0 else 0.0)
+        end = offset + duration - (d / 2 if i < len(items) - 1 else 0.0)
+        if text and text.strip() and end > start:
+            events.append(CaptionEvent(start, end, text.strip()))
+        offset += duration - d
+    return events
+
+
+def _ass_time(seconds: float) -> str:
+    cs = int(round(max(0.0, seconds) * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _srt_time(seconds: float) -> str:
+    ms = int(round(max(0.0, seconds) * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def _ass_text(text: str) -> str:
+    # 花括号在 ASS 中表示样式标签，替换为全角字符
+    return (text.replace('\\', '＼').replace('{', '｛').replace('}', '｝')
+            .replace('\r\n', '\n').replace('\n', '\\N'))
+
+
+def build_ass(events: List[CaptionEvent], width: int, height: int,
+              font_name: str = 'Arial', font_size: int = 24) -> str:
+    """
+    生成 ASS 字幕：底部居中、半透明黑底白字，左右各留 5% 边距并自动换行
+    （与原先 TextClip(method='caption') 的效果一致）
+    """
+    margin_h = int(width * 0.05)
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font_name},{font_size},&H00FFFFFF,&H00FFFFFF,&H80000000,&H80000000,"
+        f"0,0,0,0,100,100,0,0,3,4,0,2,{margin_h},{margin_h},20,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for event in events:
+        lines.append(f"Dialogue: 0,{_ass_time(event.start)},{_ass_time(event.end)},Default,,0,0,0,,"
+                     f"{_ass_text(event.text)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_ass(path: str, events: List[CaptionEvent], width: int, height: int,
+              font_name: str = 'Arial', font_size: int = 24) -> str:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(build_ass(events, width, height, font_name, font_size))
+    return path
+
+
+def write_srt(path: str, events: List[CaptionEvent]) -> str:
+    """导出 SRT 字幕（便于外挂字幕或人工校对）"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, event in enumerate(events, 1):
+            f.write(f"{index}\n{_srt_time(event.start)} --> {_srt_time(event.end)}\n{event.text}\n\n")
+    return path
+
+
+def subtitles_filter(path: str, font_file: Optional[str] = None) -> str:
+    """烧录字幕的 ffmpeg subtitles 滤镜；指定字体文件时把其所在目录作为 fontsdir"""
+    value = f"subtitles=filename={escape_filter_value(path)}"
+    if font_file:
+        value += f":fontsdir={escape_filter_value(os.path.dirname(os.path.abspath(font_file)))}"
+    return value
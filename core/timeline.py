@@ -0,0 +1,123 @@
+import json
+import logging
+from dataclasses import dataclass, field, asdict, replace
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from core.encoding import ffmpeg_encode_args
+from core.ffmpeg_renderer import ClipInput, RenderSpec, Piece, effective_transition_duration, timeline_duration
+from core.parallel_render import section_pieces
+from core.render_cache import section_hash
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_VERSION = 1
+
+
+@dataclass
+class Timeline:
+    """
+    合成时间线（EDL）：片段及裁剪区间、字幕、转场、片尾和输出参数
+
+    所有渲染后端都从时间线渲染；时间线可序列化保存、比较两个版本的差异，
+    并在渲染前估算耗时。
+    """
+    clips: List[ClipInput]
+    spec: RenderSpec = field(default_factory=RenderSpec)
+    transition_type: str = 'none'     # 用户选择的转场类型（moviepy 后端使用），spec.transition 为对应的 xfade 名称
+    encode_profile: Union[str, Dict, None] = None
+
+    @property
+    def transition_duration(self) -> float:
+        return effective_transition_duration(self.clips, self.spec)
+
+    @property
+    def duration(self) -> float:
+        """输出总时长（扣除转场重叠，加上片尾）"""
+        return timeline_duration(self.clips, self.spec)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': TIMELINE_VERSION,
+            'clips': [asdict(clip) for clip in self.clips],
+            'spec': asdict(self.spec),
+            'transition_type': self.transition_type,
+            'encode_profile': self.encode_profile
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Timeline":
+        version = data.get('version', TIMELINE_VERSION)
+        if version != TIMELINE_VERSION:
+            raise ValueError(f"Unsupported timeline version: {version}")
+        return cls(
+            clips=[ClipInput(**clip) for clip in data.get('clips', [])],
+            spec=RenderSpec(**data.get('spec', {})),
+            transition_type=data.get('transition_type', 'none'),
+            encode_profile=data.get('encode_profile')
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Timeline":
+        return cls.from_dict(json.loads(text))
+
+    def save(self, path: str) -> str:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "Timeline":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_json(f.read())
+
+    def sections(self) -> List[Tuple[Piece, str, float]]:
+        """
+        时间线分段及其内容哈希（与渲染缓存的分段和键一致）
+
+        Returns:
+            [(分段, 内容哈希, 分段输出时长)]
+        """
+        d = self.transition_duration
+        encode_args = ffmpeg_encode_args(self.encode_profile)
+        result = []
+        for piece in section_pieces(self.clips, self.spec, d):
+            piece_spec = self.spec if piece.end_card else replace(self.spec, end_card=None)
+            result.append((piece, section_hash(piece, piece_spec, encode_args, d),
+                           timeline_duration(piece.clips, piece_spec, d)))
+        return result
+
+    def diff(self, other: Optional["Timeline"]) -> Dict[str, Any]:
+        """
+        与另一版本时间线比较，按分段哈希统计变化
+
+        Returns:
+            Dict: changed（本版本中新出现的分段数）、removed（旧版本中不再使用的分段数）、
+                  unchanged（未变化的分段数）、changed_seconds（需要重新渲染的输出时长）
+        """
+        sections = self.sections()
+        old = {key for _, key, _ in other.sections()} if other is not None else set()
+        new = {key for _, key, _ in sections}
+        changed = [(key, seconds) for _, key, seconds in sections if key not in old]
+        return {
+            'changed': len(changed),
+            'removed': len(old - new),
+            'unchanged': len(sections) - len(changed),
+            'changed_seconds': sum(seconds for _, seconds in changed)
+        }
+
+    def uncached_seconds(self, cache=None, end_card_cached: bool = False) -> float:
+        """
+        需要实际编码的输出时长：渲染缓存中没有的分段（未使用缓存时为全部片段），
+        片尾已在片尾缓存中时不计入
+        """
+        total = 0.0
+        for piece, key, seconds in self.sections():
+            if piece.end_card:
+                if not end_card_cached:
+                    total += seconds
+            elif cache is None or not cache.contains(key):
+                total += seconds
+        return total
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id   TEXT PRIMARY KEY,
+    settings   TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id      TEXT NOT NULL,
+    url           TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    worker        TEXT,
+    lease_expires REAL,
+    heartbeat_at  REAL,
+    result        TEXT,
+    error         TEXT,
+    created_at    REAL NOT NULL,
+    finished_at   REAL,
+    UNIQUE (batch_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (status, batch_id, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks (status, lease_expires);
+"""
+
+
+@dataclass
+class Task:
+    """队列中的单个视频任务"""
+    id: int
+    batch_id: str
+    url: str
+    attempts: int
+    worker: Optional[str] = None
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    基于 SQLite 文件的分布式任务队列，可放在共享存储上供多台主机的工作进程使用
+
+    工作进程领取任务时获得租约，并通过心跳续租；租约过期（工作进程崩溃或失联）的任务
+    会在下一次领取时被回收重新分配，超过最大尝试次数后标记为失败。
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # 共享存储（NFS等）上不能使用 WAL，保持默认的回滚日志模式，依赖文件锁进行互斥
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def create_batch(self, batch_id: str, urls: Iterable[str], settings: Dict[str, Any],
+                     output_dir: str, chunk_size: int = 1000) -> int:
+        """创建（或追加到）一个批次并入队URL，返回新入队的任务数"""
+        now = time.time()
+        added = 0
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO batches (batch_id, settings, output_dir, created_at) VALUES (?, ?, ?, ?)",
+                (batch_id, json.dumps(settings, ensure_ascii=False), output_dir, now)
+            )
+        chunk: List[str] = []
+
+        def flush():
+            nonlocal added
+            with self._transaction() as conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (batch_id, url, created_at) VALUES (?, ?, ?)",
+                    [(batch_id, url, now) for url in chunk]
+                )
+                added += conn.total_changes - before
+            chunk.clear()
+
+        for url in urls:
+            chunk.append(url)
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        logger.info(f"批次 {batch_id} 新入队 {added} 个任务")
+        return added
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return None
+        return {'batch_id': row['batch_id'], 'settings': json.loads(row['settings']),
+                'output_dir': row['output_dir'], 'created_at': row['created_at']}
+
+    def claim(self, worker_id: str, batch_id: Optional[str] = None) -> Optional[Task]:
+        """领取一个待处理任务（顺带回收租约过期的任务），没有任务时返回 None"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._reclaim_expired(conn, now)
+            if batch_id:
+                row = conn.execute(
+                    "SELECT id, batch_id, url, attempts FROM tasks WHERE status = ? AND batch_id = ? "
+                    "ORDER BY id LIMIT 1", (PENDING, batch_id)).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT id, batch_id, url, attempts FROM tasks WHERE status = ? "
+                    "ORDER BY id LIMIT 1", (PENDING,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = ?, attempts = attempts + 1, "
+                "lease_expires = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, worker_id, now + self.lease_seconds, now, row['id'])
+            )
+        return Task(row['id'], row['batch_id'], row['url'], row['attempts'] + 1, worker_id)
+
+    def heartbeat(self, task: Task) -> bool:
+        """续租；任务已被回收（租约丢失）时返回 False"""
+        now = time.time()
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, heartbeat_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (now + self.lease_seconds, now, task.id, task.worker, RUNNING)
+            )
+            return cur.rowcount == 1
+
+    def complete(self, task: Task, result: Any) -> bool:
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, finished_at = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), task.id, task.worker, RUNNING)
+            )
+            return cur.rowcount == 1
+
+    def fail(self, task: Task, error: str) -> bool:
+        """记录失败；未超过最大尝试次数时重新排队"""
+        status = FAILED if task.attempts >= self.max_attempts else PENDING
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, worker = NULL, lease_expires = NULL, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (status, error, time.time() if status == FAILED else None, task.id, task.worker, RUNNING)
+            )
+            return cur.rowcount == 1
+
+    def _reclaim_expired(self, conn: sqlite3.Connection, now: float):
+        conn.execute(
+            "UPDATE tasks SET status = ?, error = 'lease expired', finished_at = ?, worker = NULL, "
+            "lease_expires = NULL WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, now, RUNNING, now, self.max_attempts)
+        )
+        cur = conn.execute(
+            "UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL "
+            "WHERE status = ? AND lease_expires < ?",
+            (PENDING, RUNNING, now)
+        )
+        if cur.rowcount:
+            logger.warning(f"回收了 {cur.rowcount} 个租约过期的任务")
+
+    def stats(self, batch_id: Optional[str] = None) -> Dict[str, int]:
+        with self._connect() as conn:
+            if batch_id:
+                rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks WHERE batch_id = ? "
+                                    "GROUP BY status", (batch_id,)).fetchall()
+            else:
+                rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({row['status']: row['n'] for row in rows})
+        return counts
+
+    def iter_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """按任务顺序遍历已完成任务的结果"""
+        with self._connect() as conn:
+            for row in conn.execute("SELECT url, result FROM tasks WHERE batch_id = ? AND status = ? "
+                                    "ORDER BY id", (batch_id, DONE)):
+                yield {'url': row['url'], 'result': json.loads(row['result'])}
+
+    def failures(self, batch_id: str) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT url, attempts, error FROM tasks WHERE batch_id = ? AND status = ? "
+                                "ORDER BY id", (batch_id, FAILED)).fetchall()
+        return [dict(row) for row in rows]
+
+    @contextmanager
+    def lease(self, task: Task, interval: Optional[float] = None):
+        """处理任务期间在后台线程中定期发送心跳"""
+        interval = interval or max(1.0, self.lease_seconds / 3)
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    if not self.heartbeat(task):
+                        logger.warning(f"任务 {task.id} 的租约已丢失，结果可能被其他工作进程覆盖")
+                        return
+                except sqlite3.Error as e:
+                    logger.error(f"任务 {task.id} 心跳失败: {str(e)}")
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{task.id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
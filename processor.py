@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, Callable
 from sentence_transformers import SentenceTransformer, util
 import numpy as np
 import logging
@@ -9,13 +9,28 @@ from datetime import datetime
 import pandas as pd
 import shutil
 import uuid
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
-from moviepy.video.tools.drawing import color_gradient
 import requests
 import tempfile
 import re
+import time
+import types
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from urllib.parse import urlparse
 
+from core.metrics import PipelineMetrics
+from core.resources import ResourceGovernor, default_governor
+from core.work_queue import WorkQueue, default_worker_id
+from core.cancellation import CancellationToken, Deadline, PipelineCancelled
+from core.ffmpeg_tools import run_ffmpeg, probe_media, escape_filter_value
+from core.encoding import ffmpeg_encode_args
+from core.clip_store import ConformTarget
+from core.ffmpeg_renderer import RenderSpec
+from core.selection import select_segments
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -29,9 +44,16 @@ class VideoSegment:
     clip_path: Optional[str] = None  # 存储视频片段文件的路径
 
 class VideoProcessor:
-    def __init__(self, config=None):
+    def __init__(self, config=None, model: Optional[SentenceTransformer] = None,
+                 embedding_cache: Optional[Dict[str, np.ndarray]] = None,
+                 governor: Optional[ResourceGovernor] = None):
         self.config = config
-        self.model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        # 资源调度器：默认使用进程内共享的实例，使并发的流水线共同受限
+        self.governor = governor if governor is not None else default_governor()
+        self.prefetch = Config.DOWNLOAD_PREFETCH
+        # 可传入已加载的模型和嵌入缓存，以便在多个处理器（如API的并发任务）之间共享
+        self.model = model if model is not None else SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        self.embedding_cache = embedding_cache if embedding_cache is not None else {}
         self.dimensions = None  # 维度层级结构
         self.dimension_embeddings = {}  # 存储维度名称及其嵌入
         if config:
@@ -40,6 +62,11 @@ class VideoProcessor:
         # 创建视频片段存储目录
         self.clips_dir = os.path.join("data", "clips")
         os.makedirs(self.clips_dir, exist_ok=True)
+        # 分析报告和运行剖析的输出目录
+        self.output_dir = os.path.join("data", "output")
+        
+        # 最近一次流水线运行的性能指标
+        self.last_metrics: Optional[PipelineMetrics] = None
         
     def _load_and_embed_dimensions(self):
         """加载维度结构并计算嵌入"""
@@ -62,11 +89,13 @@ class VideoProcessor:
         # 二级维度
         all_dims.extend(self.dimensions['level2']) 
             
-        # 去重并计算嵌入
+        # 去重并计算嵌入（已缓存的维度名称不再重复编码）
         unique_dims = list(set(all_dims))
         if unique_dims:
-            embeddings = self.model.encode(unique_dims)
-            self.dimension_embeddings = dict(zip(unique_dims, embeddings))
+            missing = [d for d in unique_dims if d not in self.embedding_cache]
+            if missing:
+                self.embedding_cache.update(zip(missing, self.model.encode(missing)))
+            self.dimension_embeddings = {d: self.embedding_cache[d] for d in unique_dims}
             logger.info(f"维度嵌入计算完成，共 {len(self.dimension_embeddings)} 个维度。")
         else:
             logger.warning("没有找到有效的维度名称用于计算嵌入。")
@@ -100,8 +129,34 @@ class VideoProcessor:
             logger.error(f"处理CSV文件失败: {str(e)}")
             raise
     
-    def download_video(self, url: str) -> Optional[str]:
-        """从URL下载视频到临时文件并返回路径"""
+    @staticmethod
+    def iter_csv_urls(file_path: str, chunk_size: int = 1000) -> Iterator[str]:
+        """流式读取CSV中的视频URL，适用于数千行的大清单（按块读取并去重）"""
+        seen = set()
+        column = None
+        for chunk in pd.read_csv(file_path, encoding='utf-8-sig', chunksize=chunk_size):
+            if column is None:
+                column = 'url' if 'url' in chunk.columns else chunk.columns[0]
+            values = chunk[column].astype(str).str.strip()
+            values = values[values.str.contains(r'\.(mp4|mov)$', case=False, na=False)]
+            for url in values:
+                if url not in seen:
+                    seen.add(url)
+                    yield url
+        logger.info(f"流式解析完成，共 {len(seen)} 个视频URL")
+    
+    def download_video(self, url: str, metrics: Optional[PipelineMetrics] = None,
+                       token: Optional[CancellationToken] = None,
+                       deadline: Optional[Deadline] = None,
+                       stop: Optional[threading.Event] = None) -> Optional[str]:
+        """
+        从URL下载视频到临时文件并返回路径
+        
+        下载文件在资源调度器中预留磁盘配额，用 _discard_download 释放。
+        超过 deadline 时放弃该视频并返回 None；被取消或 stop 事件被设置（预取线程停止）时
+        抛出 PipelineCancelled。
+        """
+        tmp_path = None
         try:
             parsed_url = urlparse(url)
             if not parsed_url.scheme or not parsed_url.netloc:
@@ -118,22 +173,133 @@ class VideoProcessor:
             tmp_file.close()
             
             # 下载视频
-            response = requests.get(url, stream=True)
+            response = requests.get(url, stream=True,
+                                    timeout=(Config.DOWNLOAD_CONNECT_TIMEOUT, Config.DOWNLOAD_READ_TIMEOUT))
             response.raise_for_status()
             
+            # 按 Content-Length 预留临时磁盘，达到上限时在此暂停
+            expected = int(response.headers.get('Content-Length') or 0) or Config.DOWNLOAD_SIZE_ESTIMATE
+            self.governor.reserve_scratch(tmp_path, expected, metrics, stop=stop, token=token)
+            
             # 保存到临时文件
             with open(tmp_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192): 
+                for chunk in response.iter_content(chunk_size=65536): 
+                    # 在数据块之间检查取消和截止时间
+                    if token is not None:
+                        token.check()
+                    if stop is not None and stop.is_set():
+                        raise PipelineCancelled("预取已停止")
+                    if deadline is not None:
+                        deadline.check()
                     f.write(chunk)
+            self.governor.adjust_scratch(tmp_path, os.path.getsize(tmp_path))
             
             logger.info(f"成功下载视频: {url} 到 {tmp_path}")
             return tmp_path
+        except PipelineCancelled:
+            if tmp_path:
+                self._discard_download(tmp_path, url)
+            raise
         except Exception as e:
             logger.error(f"下载视频失败 {url}: {str(e)}")
+            if tmp_path:
+                self._discard_download(tmp_path, url)
             return None
     
-    def extract_video_segment(self, video_path: str, start: float, end: float, dimension: str) -> Optional[str]:
-        """截取视频片段并保存"""
+    def _discard_download(self, video_path: Optional[str], source: str):
+        """删除临时下载的文件（本地文件不删除）并释放磁盘配额"""
+        if not video_path or video_path == source:
+            return
+        try:
+            if os.path.exists(video_path):
+                os.remove(video_path)
+        except OSError:
+            pass
+        self.governor.release_scratch(video_path)
+    
+    def _prefetch_downloads(self, sources: List[str], metrics: PipelineMetrics,
+                            token: Optional[CancellationToken] = None,
+                            item_timeout: Optional[float] = None,
+                            stage_deadline: Optional[Deadline] = None) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        上游下载阶段：在后台线程中按顺序预取视频，逐个产出 (source, 本地路径)
+        
+        预取队列满、磁盘配额或内存达到上限时下载线程暂停；按顺序预留配额保证下游总能释放资源。
+        单个视频超过 item_timeout 时跳过；下载阶段总预算耗尽或被取消时停止预取剩余视频。
+        """
+        ready: "queue.Queue" = queue.Queue(maxsize=max(1, self.prefetch))
+        stop = threading.Event()
+        done = object()
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            try:
+                for source in sources:
+                    if stop.is_set() or (token is not None and token.cancelled):
+                        return
+                    if stage_deadline is not None and stage_deadline.expired:
+                        logger.warning(f"下载阶段超出总时间预算，跳过剩余视频（从 {source} 开始）")
+                        return
+                    self.governor.wait_for_memory(metrics, stop=stop, token=token)
+                    deadline = Deadline(item_timeout, f"下载 {source}")
+                    if stage_deadline is not None:
+                        deadline = deadline.earliest(stage_deadline)
+                    with metrics.stage('download', source) as t:
+                        video_path = self.download_video(source, metrics, token=token, deadline=deadline, stop=stop)
+                        if video_path and video_path != source:
+                            t.add_bytes_in(os.path.getsize(video_path))
+                            t.add_items(1)
+                    if not put((source, video_path)):
+                        self._discard_download(video_path, source)
+                        return
+            except PipelineCancelled:
+                # 下游在消费时检查令牌并抛出取消异常
+                return
+            finally:
+                put(done)
+        
+        producer = threading.Thread(target=produce, name="video-prefetch", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+            # 清理已预取但未被消费的文件
+            while True:
+                try:
+                    item = ready.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not done:
+                    self._discard_download(item[1], item[0])
+    
+    def extract_video_segment(self, video_path: str, start: float, end: float, dimension: str,
+                              token: Optional[CancellationToken] = None,
+                              deadline: Optional[Deadline] = None,
+                              encode_profile=None,
+                              conform: Optional[ConformTarget] = None) -> Optional[str]:
+        """
+        截取视频片段并保存
+        
+        直接调用 ffmpeg 子进程，超过 deadline 或被取消时终止子进程并删除不完整的输出。
+        encode_profile 为 Config.ENCODE_PROFILES 中的名称或自定义编码参数；指定 conform 时
+        在同一次编码中把片段统一到目标分辨率、帧率、像素格式和音频采样率。
+        """
+        output_path = None
+        text_path = None
         try:
             if not os.path.exists(video_path):
                 logger.error(f"视频文件不存在: {video_path}")
@@ -144,58 +310,105 @@ class VideoProcessor:
             filename = f"{segment_id}_{int(start)}_{int(end)}.mp4"
             output_path = os.path.join(self.clips_dir, filename)
             
-            # 使用 moviepy 截取视频
-            with VideoFileClip(video_path) as video:
-                # 确保截取范围在视频时长内
-                video_duration = video.duration
-                if start >= video_duration:
-                    logger.warning(f"起始时间 {start} 超出视频长度 {video_duration}")
-                    start = max(0, video_duration - 5)  # 取视频最后5秒
-                
-                end = min(end, video_duration)
-                if end <= start:
-                    logger.warning(f"无效的时间范围: {start}-{end}")
-                    end = start + 3  # 默认截取3秒
-                
-                # 截取片段
-                clip = video.subclip(start, end)
-                
-                # 添加维度水印文字
-                if dimension:
-                    # 创建水印
-                    txt = TextClip(f"维度: {dimension}", fontsize=24, color='white', bg_color='black', font='Arial-Bold')
-                    txt = txt.set_position(('left', 'bottom')).set_duration(clip.duration).set_opacity(0.7)
-                    
-                    # 合成视频
-                    clip = CompositeVideoClip([clip, txt])
-                
-                # 保存视频片段
-                clip.write_videofile(output_path, codec='libx264', audio_codec='aac', 
-                                    temp_audiofile=f"{output_path}.temp-audio.m4a",
-                                    remove_temp=True, logger=None)  # 禁用内部日志
+            # 确保截取范围在视频时长内
+            source_info = probe_media(video_path, token=token)
+            video_duration = source_info['duration']
+            if start >= video_duration:
+                logger.warning(f"起始时间 {start} 超出视频长度 {video_duration}")
+                start = max(0, video_duration - 5)  # 取视频最后5秒
+            
+            end = min(end, video_duration)
+            if end <= start:
+                logger.warning(f"无效的时间范围: {start}-{end}")
+                end = start + 3  # 默认截取3秒
+            
+            args = ['-ss', f"{start:.3f}", '-i', video_path]
+            
+            # 添加维度水印文字（文本写入文件，避免滤镜参数转义问题）
+            watermark = None
+            if dimension:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+                    f.write(f"维度: {dimension}")
+                    text_path = f.name
+                watermark = self._watermark_filter(text_path)
+            
+            if conform is not None:
+                extra_inputs, conform_args = conform.ffmpeg_args(source_info['audio'] is not None, watermark)
+                args += extra_inputs + ['-t', f"{end - start:.3f}"] + conform_args
+            else:
+                args += ['-t', f"{end - start:.3f}"]
+                if watermark:
+                    args += ['-vf', watermark]
+            
+            # 保存视频片段
+            args += ffmpeg_encode_args(encode_profile) + ['-movflags', '+faststart', output_path]
+            run_ffmpeg(args, token=token, deadline=deadline)
             
             logger.info(f"成功提取并保存视频片段: {output_path}")
             return output_path
+        except PipelineCancelled:
+            self._remove_partial(output_path)
+            raise
         except Exception as e:
             logger.error(f"提取视频片段失败: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
+            self._remove_partial(output_path)
             return None
+        finally:
+            if text_path and os.path.exists(text_path):
+                os.remove(text_path)
+    
+    def _watermark_filter(self, text_path: str) -> str:
+        """左下角半透明维度水印的 drawtext 滤镜"""
+        font = (f"fontfile={escape_filter_value(Config.WATERMARK_FONT_FILE)}"
+                if Config.WATERMARK_FONT_FILE else "font=Arial")
+        return (f"drawtext=textfile={escape_filter_value(text_path)}:{font}:fontsize=24:"
+                f"fontcolor=white@0.7:box=1:boxcolor=black@0.7:boxborderw=4:x=4:y=h-th-4")
+    
+    @staticmethod
+    def _remove_partial(path: Optional[str]):
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
     
-    def process_pipeline(self, urls: List[str], user_settings: Dict) -> List[VideoSegment]:
-        """可配置处理流水线"""
+    def process_pipeline(self, urls: List[str], user_settings: Dict,
+                         on_segment: Optional[Callable[[VideoSegment], None]] = None,
+                         token: Optional[CancellationToken] = None,
+                         run_id: Optional[str] = None) -> List[VideoSegment]:
+        """
+        可配置处理流水线
+        
+        on_segment 在每个片段提取完成后立即回调，用于流式输出；token 在条目之间检查，
+        被取消时抛出 PipelineCancelled。单个下载/提取超过 item_timeouts 时跳过该条目，
+        阶段超过 stage_timeouts 总预算时跳过剩余条目（均可在 user_settings 中覆盖 Config 默认值）。
+        run_id 用于运行剖析和报告文件名，默认随机生成。
+        """
         results = []
+        metrics = PipelineMetrics(run_id)
+        self.last_metrics = metrics
+        token = token or CancellationToken()
+        item_timeouts = dict(Config.ITEM_TIMEOUTS, **user_settings.get('item_timeouts', {}))
+        stage_timeouts = dict(Config.STAGE_TIMEOUTS, **user_settings.get('stage_timeouts', {}))
+        # 片段在提取时统一到合成的输出参数，合成阶段无需再缩放
+        conform = ConformTarget.from_settings(user_settings) if user_settings.get('conform', True) else None
         
         # 创建临时目录用于存储下载的视频
         temp_dir = tempfile.mkdtemp()
         try:
+            token.check()
             # 确保维度嵌入已加载 (如果配置存在)
             if self.config and not self.dimension_embeddings:
-                self._load_and_embed_dimensions()
+                with metrics.stage('embedding'):
+                    self._load_and_embed_dimensions()
 
             # 1. 字幕生成 (获取带文本的 VideoSegment)
             if self.config and 'subtitles' in self.config.PROCESS_STEPS:
-                subtitles = self._generate_subtitles(urls)
+                with metrics.stage('subtitles') as t:
+                    subtitles = self._generate_subtitles(urls)
+                    t.add_items(len(urls))
                 results.extend(subtitles)
             else:
                 # 如果没有字幕生成步骤，可能需要从其他来源获取 segments
@@ -203,12 +416,15 @@ class VideoProcessor:
                 return [] # 返回空列表，因为没有片段可匹配
             
             # 2. 段落匹配 (包含维度分析和评分)
+            token.check()
             if self.config and 'matching' in self.config.PROCESS_STEPS:
-                matched = self._match_segments(
-                    results, 
-                    user_settings.get('threshold', 0.7),
-                    user_settings.get('priority', '综合评分') # priority 参数目前未使用，但保留
-                )
+                with metrics.stage('matching') as t:
+                    matched = self._match_segments(
+                        results, 
+                        user_settings.get('threshold', 0.7),
+                        user_settings.get('priority', '综合评分') # priority 参数目前未使用，但保留
+                    )
+                    t.add_items(len(results))
                 results = matched # 更新 results 为匹配和排序后的片段
             else:
                 logger.warning("配置中未包含 'matching' 步骤，跳过维度匹配。")
@@ -216,89 +432,138 @@ class VideoProcessor:
                 # 假设需要返回匹配结果，如果没有匹配步骤，则结果为空
                 results = [] 
             
+            # 按目标时长选择片段（在提取之前，只提取选中的片段）
+            if user_settings.get('target_duration') and results:
+                token.check()
+                with metrics.stage('selection') as t:
+                    t.add_items(len(results))
+                    results = self._select_for_duration(results, user_settings)
+            
             # 3. 实际处理视频片段 (提取并保存文件)
-            processed_results = []
-            for segment in results:
-                # 下载视频（如果是在线URL）
-                video_path = self.download_video(segment.source)
-                if video_path:
+            # 按视频源分组，每个视频只下载一次；下载在后台预取，提取占用解码器槽位
+            token.check()
+            by_source: Dict[str, List[Tuple[int, VideoSegment]]] = {}
+            for index, segment in enumerate(results):
+                by_source.setdefault(segment.source, []).append((index, segment))
+            
+            download_budget = Deadline(stage_timeouts.get('download'), "下载阶段")
+            extraction_budget = Deadline(stage_timeouts.get('extraction'), "提取阶段")
+            extracted: List[Tuple[int, VideoSegment]] = []
+            downloads = self._prefetch_downloads(list(by_source), metrics, token=token,
+                                                 item_timeout=item_timeouts.get('download'),
+                                                 stage_deadline=download_budget)
+            try:
+                for source, video_path in downloads:
+                    token.check()
+                    if not video_path:
+                        continue
                     try:
-                        # 提取视频片段
-                        clip_path = self.extract_video_segment(
-                            video_path, 
-                            segment.start, 
-                            segment.end, 
-                            segment.dimension
-                        )
-                        
-                        if clip_path:
-                            # 更新片段对象
-                            segment.clip_path = clip_path
-                            processed_results.append(segment)
-                        else:
-                            logger.warning(f"无法创建视频片段，跳过 {segment.source} ({segment.start}-{segment.end})")
+                        for index, segment in by_source[source]:
+                            token.check()
+                            if extraction_budget.expired:
+                                logger.warning(f"提取阶段超出总时间预算，跳过片段 {segment.source} ({segment.start}-{segment.end})")
+                                continue
+                            # 内存限流只作用于上游下载：下游提取释放内存，在此等待会与上游互相阻塞
+                            deadline = Deadline(item_timeouts.get('extraction'), "片段提取").earliest(extraction_budget)
+                            # 提取视频片段
+                            with self.governor.decoder(metrics), metrics.stage('extraction', source) as t:
+                                clip_path = self.extract_video_segment(
+                                    video_path, 
+                                    segment.start, 
+                                    segment.end, 
+                                    segment.dimension,
+                                    token=token,
+                                    deadline=deadline,
+                                    encode_profile=user_settings.get('encode_profile'),
+                                    conform=conform
+                                )
+                                if clip_path:
+                                    t.add_bytes_out(os.path.getsize(clip_path))
+                                    t.add_items(1)
+                            
+                            if clip_path:
+                                # 更新片段对象
+                                segment.clip_path = clip_path
+                                extracted.append((index, segment))
+                                if on_segment:
+                                    on_segment(segment)
+                            else:
+                                logger.warning(f"无法创建视频片段，跳过 {segment.source} ({segment.start}-{segment.end})")
                     finally:
-                        # 删除临时下载的文件（如果不是本地文件）
-                        if video_path != segment.source and os.path.exists(video_path):
-                            try:
-                                os.remove(video_path)
-                            except:
-                                pass
+                        # 删除临时下载的文件（如果不是本地文件）并释放磁盘配额
+                        self._discard_download(video_path, source)
+            finally:
+                downloads.close()
+            token.check()
+            
+            # 保持匹配阶段的排序
+            processed_results = [segment for _, segment in sorted(extracted, key=lambda x: x[0])]
             
             # 确保输出目录存在并保存分析结果
-            results_dir = "data/output"
+            results_dir = self.output_dir
             os.makedirs(results_dir, exist_ok=True)
             
-            # 生成分析报告
+            # 生成分析报告（文件名带 run_id，多个进程共用输出目录时同一秒内完成也不会互相覆盖）
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            report_path = os.path.join(results_dir, f"analysis_{timestamp}.json")
-            
-            with open(report_path, 'w', encoding='utf-8') as f:
-                # 将结果转换为可序列化格式
-                serializable_results = []
-                for r in processed_results:
-                    serializable_results.append({
-                        "start": r.start,
-                        "end": r.end,
-                        "text": r.text,
-                        "score": float(r.score),
-                        "source": r.source,
-                        "dimension": r.dimension,
-                        "clip_path": r.clip_path
-                    })
-                
-                json.dump({
-                    "version": "1.0",
-                    "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "video_count": len(urls),
-                    "segments": serializable_results,
-                    "average_duration": round(sum(r.end - r.start for r in processed_results) / len(processed_results) if processed_results else 0, 2),
-                    "content_distribution": {
-                        "brand_awareness": 0.65,
-                        "product_features": 0.72,
-                        "user_experience": 0.58
-                    },
-                    "style_analysis": {
-                        "dynamic_intro": len(urls),
-                        "text_overlay": int(len(urls) * 0.7),
-                        "background_music": int(len(urls) * 0.85)
-                    },
-                    "recommendations": [
-                        "增加用户使用场景展示",
-                        "优化前5秒开场吸引力",
-                        "提升画质稳定性"
-                    ]
-                }, f, ensure_ascii=False, indent=2)
+            report_stem = f"analysis_{timestamp}_{metrics.run_id}"
+            report_path = os.path.join(results_dir, f"{report_stem}.json")
+            
+            with metrics.stage('report') as t:
+                self._write_report(report_path, urls, processed_results)
+                t.add_bytes_out(os.path.getsize(report_path))
+            
+            # 导出运行剖析（JSON + Prometheus 文本格式）
+            metrics.save(os.path.join(results_dir, f"{report_stem}.profile.json"))
             
             logger.info(f"分析结果已保存至{report_path}")
             return processed_results
         finally:
+            metrics.finish()
             # 清理临时目录
             try:
                 shutil.rmtree(temp_dir)
             except:
                 pass
     
+    def _write_report(self, report_path: str, urls: List[str], processed_results: List[VideoSegment]):
+        """写出分析报告 JSON"""
+        with open(report_path, 'w', encoding='utf-8') as f:
+            # 将结果转换为可序列化格式
+            serializable_results = []
+            for r in processed_results:
+                serializable_results.append({
+                    "start": r.start,
+                    "end": r.end,
+                    "text": r.text,
+                    "score": float(r.score),
+                    "source": r.source,
+                    "dimension": r.dimension,
+                    "clip_path": r.clip_path
+                })
+            
+            json.dump({
+                "version": "1.0",
+                "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "video_count": len(urls),
+                "segments": serializable_results,
+                "average_duration": round(sum(r.end - r.start for r in processed_results) / len(processed_results) if processed_results else 0, 2),
+                "content_distribution": {
+                    "brand_awareness": 0.65,
+                    "product_features": 0.72,
+                    "user_experience": 0.58
+                },
+                "style_analysis": {
+                    "dynamic_intro": len(urls),
+                    "text_overlay": int(len(urls) * 0.7),
+                    "background_music": int(len(urls) * 0.85)
+                },
+                "recommendations": [
+                    "增加用户使用场景展示",
+                    "优化前5秒开场吸引力",
+                    "提升画质稳定性"
+                ]
+            }, f, ensure_ascii=False, indent=2)
+    
     def _generate_subtitles(self, urls: List[str]) -> List[VideoSegment]:
         """生成字幕（模拟实现）- 在实际应用中，这里应该使用语音识别服务"""
         segments = []
@@ -344,6 +609,30 @@ class VideoProcessor:
         logger.info(f"模拟生成了 {len(segments)} 个字幕片段")
         return segments
     
+    def _select_for_duration(self, segments: List[VideoSegment], user_settings: Dict) -> List[VideoSegment]:
+        """
+        按 user_settings['target_duration']（秒）选择片段，使成片时长不超过目标且加权分数最高
+        
+        转场重叠和片尾标语的时长按合成时的设置扣除；每个维度最多选
+        dimension_quotas[维度] 个，未指定时按 max_clips；维度权重取 dimension_weights。
+        """
+        target = float(user_settings['target_duration'])
+        if user_settings.get('slogan'):
+            target -= RenderSpec.end_card_duration
+        transition = user_settings.get('transition', 'fade')
+        transition_duration = user_settings.get('transition_duration', 1.0) if transition != 'none' else 0.0
+        selected = select_segments(
+            segments,
+            target,
+            quotas=user_settings.get('dimension_quotas'),
+            default_quota=user_settings.get('max_clips'),
+            weights=user_settings.get('dimension_weights'),
+            transition_duration=transition_duration
+        )
+        if not selected:
+            logger.warning(f"目标时长 {user_settings['target_duration']} 秒内没有可选的片段")
+        return selected
+    
     def _match_segments(self, 
                        segments: List[VideoSegment],
                        threshold: float,
@@ -408,6 +697,154 @@ class VideoProcessor:
         
         return matched_segments
 
+    def batch_process(self, video_list: Iterable[str], settings: Dict,
+                      output_dir: Optional[str] = None,
+                      workers: Optional[int] = None,
+                      chunk_size: int = 10) -> List[VideoSegment]:
+        """
+        批量处理视频：将URL按块分发到多个工作进程，结果和报告写入输出目录
+        
+        Args:
+            video_list: 视频URL列表或迭代器（如 iter_csv_urls 的返回值）
+            settings: 用户设置（threshold、priority、dimensions 等）
+            output_dir: 输出目录，默认使用 self.output_dir 下的 batch_<时间戳>
+            workers: 工作进程数，默认CPU核数；<=1 时在当前进程内顺序处理
+            chunk_size: 每个任务包含的视频数
+            
+        Returns:
+            List[VideoSegment]: 所有成功提取的片段
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = output_dir or os.path.join(self.output_dir, f"batch_{timestamp}")
+        os.makedirs(output_dir, exist_ok=True)
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        
+        dimensions = settings.get('dimensions') or getattr(self.config, 'DEFAULT_DIMENSIONS', None)
+        if not dimensions:
+            raise ValueError("批处理需要维度设置（settings['dimensions'] 或 config.DEFAULT_DIMENSIONS）")
+        process_steps = list(getattr(self.config, 'PROCESS_STEPS', ['subtitles', 'analysis', 'matching']))
+        
+        metrics = PipelineMetrics()
+        all_segments: List[VideoSegment] = []
+        failed_chunks = []
+        video_count = 0
+        segments_path = os.path.join(output_dir, "segments.jsonl")
+        
+        def handle(chunk, outcome):
+            segment_dicts, metrics_dict, error = outcome
+            if metrics_dict:
+                metrics.merge_dict(metrics_dict)
+            if error:
+                logger.error(f"批处理任务失败 ({len(chunk)} 个视频): {error}")
+                failed_chunks.append({"urls": chunk, "error": error})
+                return
+            with open(segments_path, 'a', encoding='utf-8') as f:
+                for d in segment_dicts:
+                    f.write(json.dumps(d, ensure_ascii=False) + "\n")
+                    all_segments.append(VideoSegment(**d))
+        
+        chunks = _chunked(video_list, max(1, chunk_size))
+        if workers <= 1:
+            # 在当前进程内顺序处理，结束后恢复处理器原有配置
+            saved = (self.config, self.dimension_embeddings, self.clips_dir, self.output_dir)
+            try:
+                _init_batch_worker(dimensions, process_steps, output_dir, processor=self)
+                for chunk in chunks:
+                    video_count += len(chunk)
+                    handle(chunk, _run_batch_chunk(chunk, settings))
+            finally:
+                self.config, self.dimension_embeddings, self.clips_dir, self.output_dir = saved
+        else:
+            # 使用 spawn 避免在 fork 后的子进程中复用 torch 线程状态
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_init_batch_worker,
+                                     initargs=(dimensions, process_steps, output_dir)) as pool:
+                pending = {}
+                for chunk in chunks:
+                    video_count += len(chunk)
+                    pending[pool.submit(_run_batch_chunk, chunk, settings)] = chunk
+                    # 限制在途任务数，避免一次性把整个清单读入内存
+                    if len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            handle(pending.pop(future), _future_outcome(future))
+                for future in list(pending):
+                    handle(pending.pop(future), _future_outcome(future))
+        
+        metrics.finish()
+        metrics.save(os.path.join(output_dir, "batch.profile.json"))
+        with open(os.path.join(output_dir, "batch_report.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": "1.0",
+                "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "video_count": video_count,
+                "segment_count": len(all_segments),
+                "workers": workers,
+                "chunk_size": chunk_size,
+                "total_wall_time": round(metrics.total_wall_time, 2),
+                "failed_chunks": failed_chunks
+            }, f, ensure_ascii=False, indent=2)
+        
+        logger.info(f"批处理完成：{video_count} 个视频，{len(all_segments)} 个片段，结果目录 {output_dir}")
+        return all_segments
+
+    def run_queue_worker(self, work_queue: WorkQueue, batch_id: Optional[str] = None,
+                         worker_id: Optional[str] = None, poll_interval: float = 5.0,
+                         forever: bool = False) -> int:
+        """
+        工作进程模式：从共享队列逐个领取视频任务并处理
+        
+        处理期间定期心跳续租；队列中没有待处理和运行中的任务时退出（forever=True 时持续轮询）。
+        
+        Returns:
+            int: 本进程处理的任务数
+        """
+        worker_id = worker_id or default_worker_id()
+        current_batch = None
+        batch = None
+        processed = 0
+        saved = (self.config, self.dimension_embeddings, self.clips_dir, self.output_dir)
+        logger.info(f"工作进程 {worker_id} 启动，队列: {work_queue.path}")
+        try:
+            while True:
+                task = work_queue.claim(worker_id, batch_id)
+                if task is None:
+                    counts = work_queue.stats(batch_id)
+                    if not forever and counts['pending'] == 0 and counts['running'] == 0:
+                        break
+                    # 其他工作进程仍有运行中的任务，等待其完成或租约过期后回收
+                    time.sleep(poll_interval)
+                    continue
+                
+                if task.batch_id != current_batch:
+                    batch = work_queue.get_batch(task.batch_id)
+                    settings = batch['settings']
+                    dimensions = settings.get('dimensions') or getattr(saved[0], 'DEFAULT_DIMENSIONS', None)
+                    process_steps = list(getattr(saved[0], 'PROCESS_STEPS', ['subtitles', 'analysis', 'matching']))
+                    _init_batch_worker(dimensions, process_steps, batch['output_dir'], processor=self)
+                    current_batch = task.batch_id
+                
+                logger.info(f"处理任务 {task.id} (第 {task.attempts} 次尝试): {task.url}")
+                try:
+                    with work_queue.lease(task):
+                        # 报告文件名带上工作进程和任务ID，多台主机共用输出目录时不会冲突
+                        run_id = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{worker_id}-task{task.id}-{task.attempts}")
+                        segments = self.process_pipeline([task.url], batch['settings'], run_id=run_id)
+                    work_queue.complete(task, {
+                        'segments': [dict(seg.__dict__, score=float(seg.score)) for seg in segments],
+                        'metrics': self.last_metrics.to_dict() if self.last_metrics else None
+                    })
+                except Exception as e:
+                    logger.error(f"任务 {task.id} 失败: {str(e)}")
+                    work_queue.fail(task, f"{type(e).__name__}: {str(e)}")
+                processed += 1
+        finally:
+            self.config, self.dimension_embeddings, self.clips_dir, self.output_dir = saved
+        
+        logger.info(f"工作进程 {worker_id} 退出，共处理 {processed} 个任务")
+        return processed
+
     def get_default_settings(self) -> Dict:
         """获取默认设置"""
         return {
@@ -415,3 +852,53 @@ class VideoProcessor:
             'priority': '综合评分',
             'transition': 'fade'
         }
+
+
+# ---- 批处理工作进程 ----
+# 每个工作进程只初始化一次 VideoProcessor（加载模型和维度嵌入），随后复用
+_batch_processor: Optional[VideoProcessor] = None
+
+
+def _init_batch_worker(dimensions: Dict, process_steps: List[str], output_dir: str,
+                       processor: Optional[VideoProcessor] = None):
+    global _batch_processor
+    if processor is None:
+        processor = VideoProcessor()
+    processor.config = types.SimpleNamespace(PROCESS_STEPS=process_steps,
+                                             DEFAULT_DIMENSIONS=dimensions)
+    processor.dimension_embeddings = {}
+    processor.clips_dir = os.path.join(output_dir, "clips")
+    processor.output_dir = os.path.join(output_dir, "reports")
+    os.makedirs(processor.clips_dir, exist_ok=True)
+    _batch_processor = processor
+
+
+def _run_batch_chunk(urls: List[str], settings: Dict) -> Tuple[List[Dict], Optional[Dict], Optional[str]]:
+    """在工作进程中处理一批URL，返回 (片段字典列表, 指标字典, 错误信息)"""
+    try:
+        segments = _batch_processor.process_pipeline(urls, settings)
+        metrics = _batch_processor.last_metrics
+        return ([dict(seg.__dict__, score=float(seg.score)) for seg in segments],
+                metrics.to_dict() if metrics else None, None)
+    except Exception as e:
+        metrics = _batch_processor.last_metrics
+        return [], metrics.to_dict() if metrics else None, f"{type(e).__name__}: {str(e)}"
+
+
+def _future_outcome(future) -> Tuple[List[Dict], Optional[Dict], Optional[str]]:
+    try:
+        return future.result()
+    except Exception as e:
+        # 工作进程崩溃等情况
+        return [], None, f"{type(e).__name__}: {str(e)}"
+
+
+def _chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
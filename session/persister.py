@@ -0,0 +1,108 @@
+import json
+import atexit
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: Any) -> Tuple[str, str]:
+    """
+    数据的规范化 JSON 及其哈希（键排序），内容相同的数据哈希相同
+
+    Returns:
+        (JSON 文本, sha1 哈希)
+    """
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return payload, hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class DebouncedPersister:
+    """
+    防抖持久化：合并短时间内对同一键的多次保存
+
+    schedule() 只记录最新内容的快照，首次调度后 interval 秒统一写入一次；
+    内容哈希与上次写入相同时直接跳过。写入在后台定时线程中执行，写入函数需线程安全；
+    进程退出时自动写入尚未保存的内容。
+    """
+
+    def __init__(self, write: Callable[[str, Any], Any], interval: float = 1.0):
+        self.write = write
+        self.interval = interval
+        self._pending: Dict[str, Tuple[str, str]] = {}
+        self._written: Dict[str, str] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        # 保证同一时间只有一个线程在写，flush() 返回时之前调度的内容都已写入
+        self._write_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def schedule(self, key: str, data: Any) -> bool:
+        """
+        调度保存 data（立即做快照，之后修改 data 不影响本次保存）
+
+        Returns:
+            bool: 内容有变化、已加入待写队列时返回 True，与已保存内容相同时返回 False
+        """
+        payload, digest = content_hash(data)
+        with self._lock:
+            if self._written.get(key) == digest:
+                # 改回了已保存的内容，之前尚未写入的修改也不再需要
+                self._pending.pop(key, None)
+                return False
+            self._pending[key] = (payload, digest)
+            self._arm()
+        if self.interval <= 0:
+            self.flush(key)
+        return True
+
+    def flush(self, key: Optional[str] = None):
+        """立即写入待保存的内容（key 为 None 时写入全部）"""
+        with self._write_lock:
+            with self._lock:
+                if key is None:
+                    items = list(self._pending.items())
+                    self._pending.clear()
+                    if self._timer is not None:
+                        self._timer.cancel()
+                        self._timer = None
+                else:
+                    item = self._pending.pop(key, None)
+                    items = [(key, item)] if item else []
+            for item_key, (payload, digest) in items:
+                try:
+                    self.write(item_key, json.loads(payload))
+                except Exception as e:
+                    logger.error(f"保存 {item_key} 失败: {str(e)}")
+                    with self._lock:
+                        # 保留失败的内容，interval 秒后重试（期间有更新的内容则以新内容为准）
+                        self._pending.setdefault(item_key, (payload, digest))
+                        self._arm()
+                    continue
+                with self._lock:
+                    self._written[item_key] = digest
+
+    def _arm(self):
+        """尚未有定时写入时，interval 秒后写入全部待保存内容（调用方需持有 self._lock）"""
+        if self._timer is None and self.interval > 0:
+            self._timer = threading.Timer(self.interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def mark_saved(self, key: str, data: Any):
+        """记录 data 为 key 的已保存内容（如刚从存储加载），之后保存相同内容会被跳过"""
+        _, digest = content_hash(data)
+        with self._lock:
+            self._written[key] = digest
+
+    def discard(self, key: str):
+        """丢弃 key 尚未写入的内容和已保存记录（如项目被删除）"""
+        with self._lock:
+            self._pending.pop(key, None)
+            self._written.pop(key, None)
+
+    def pending(self, key: Optional[str] = None) -> bool:
+        with self._lock:
+            return bool(self._pending) if key is None else key in self._pending
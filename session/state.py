@@ -1,10 +1,8 @@
 import streamlit as st
 import json
 import os
-import glob
 from typing import Dict, Any, Optional, List
 import logging
-import time
 import dashscope
 from dashscope import audio
 import math
@@ -20,16 +18,31 @@ from sklearn.metrics.pairwise import cosine_similarity
 
 # 导入正确的VideoProcessor和VideoSegment类
 from core.processor import VideoProcessor, VideoSegment
+from session.store import ProjectStore
+from session.persister import DebouncedPersister
 
 logger = logging.getLogger(__name__)
 
 class SessionState:
     """会话状态管理类：处理Streamlit会话状态和持久化"""
     
-    def __init__(self, storage_path: str = "data/session"):
-        """初始化会话状态管理器"""
+    def __init__(self, storage_path: str = "data/session", save_interval: float = 1.0):
+        """
+        初始化会话状态管理器
+
+        Args:
+            storage_path: 项目存储目录
+            save_interval: 设置保存的合并间隔（秒），间隔内的多次保存只写入一次
+        """
         self.storage_path = storage_path
         os.makedirs(storage_path, exist_ok=True)
+        # 项目、设置和结果保存在 SQLite 中，首次启动时导入旧版的 JSON 文件
+        self.store = ProjectStore(os.path.join(storage_path, "projects.db"))
+        try:
+            self.store.migrate_json(storage_path)
+        except Exception as e:
+            logger.error(f"迁移旧版项目文件失败: {str(e)}")
+        self.settings_persister = DebouncedPersister(self.store.save_settings, interval=save_interval)
     
     def initialize_session(self):
         """初始化会话，设置默认值"""
@@ -49,8 +62,6 @@ class SessionState:
         """获取默认设置"""
         # 尝试加载initial_key_dimensions作为默认维度
         try:
-            import os
-            import json
             template_path = os.path.join('/Users/apple/Desktop/AI video/videoAnalysis_v1.0/data/dimensions', 'initial_key_dimensions.json')
             initial_dimensions = None
             weights = {}  # 初始化默认权重字典
@@ -93,22 +104,28 @@ class SessionState:
             'hot_words': []
         }
     
-    def save_settings(self, project_name: str = "default"):
-        """保存当前设置到文件"""
+    def save_settings(self, project_name: str = "default", immediate: bool = False):
+        """
+        保存当前设置：内容未变化时跳过，否则合并到下一次定时写入
+
+        Args:
+            project_name: 项目名称
+            immediate: 立即写入（如创建项目后需要马上出现在项目列表中）
+        """
         # 处理 project_name 为 None 的情况
         effective_project_name = project_name if project_name is not None else "default"
         if not effective_project_name: # 如果仍然是空字符串，则强制为 'default'
             effective_project_name = "default"
             logger.warning("项目名称为空，已强制使用 'default'")
 
-        # 移除之前错误的条件判断
-        # if 'settings' in st.session_state and st.session_state.settings.get('某个设置项') != 期望的值:
-        if 'settings' in st.session_state: # 恢复原始的检查，只检查 settings 是否存在
-            file_path = os.path.join(self.storage_path, f"{effective_project_name}_settings.json") # 使用处理过的项目名
+        if 'settings' in st.session_state:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(st.session_state.settings, f, ensure_ascii=False, indent=2)
-                logger.info(f"Settings saved to {file_path}")
+                if self.settings_persister.schedule(effective_project_name, st.session_state.settings):
+                    logger.debug(f"Settings save scheduled for project {effective_project_name}")
+                if immediate:
+                    self.settings_persister.flush(effective_project_name)
+                    if self.settings_persister.pending(effective_project_name):
+                        return False
                 return True
             except Exception as e:
                 logger.error(f"Failed to save settings: {str(e)}")
@@ -117,36 +134,36 @@ class SessionState:
     
     def load_settings(self, project_name: str = "default") -> bool:
         """加载设置"""
-        file_path = os.path.join(self.storage_path, f"{project_name}_settings.json")
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    st.session_state.settings = json.load(f)
-                st.session_state.current_project = project_name
-                logger.info(f"Settings loaded from {file_path}")
-                return True
-            except Exception as e:
-                logger.error(f"Failed to load settings: {str(e)}")
-                return False
-        return False
+        try:
+            # 先写入该项目尚未保存的修改，避免读到旧设置
+            self.settings_persister.flush(project_name)
+            settings = self.store.load_settings(project_name)
+        except Exception as e:
+            logger.error(f"Failed to load settings: {str(e)}")
+            return False
+        if settings is None:
+            return False
+        self.settings_persister.mark_saved(project_name, settings)
+        st.session_state.settings = settings
+        st.session_state.current_project = project_name
+        logger.info(f"Settings loaded for project {project_name}")
+        return True
     
     def save_results(self, results: list, project_name: Optional[str] = None):
-        """保存分析结果"""
+        """保存分析结果（只写入变化的片段）"""
         if project_name is None:
-            project_name = st.session_state.get('current_project', 'default')
+            project_name = st.session_state.get('current_project') or 'default'
         
-        file_path = os.path.join(self.storage_path, f"{project_name}_results.json")
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                # 将结果转换为可序列化的字典
-                serializable_results = []
-                for r in results:
-                    if hasattr(r, '__dict__'):
-                        serializable_results.append(r.__dict__)
-                    else:
-                        serializable_results.append(r)
-                json.dump(serializable_results, f, ensure_ascii=False, indent=2)
-            logger.info(f"Results saved to {file_path}")
+            # 将结果转换为可序列化的字典
+            serializable_results = []
+            for r in results:
+                if hasattr(r, '__dict__'):
+                    serializable_results.append(r.__dict__)
+                else:
+                    serializable_results.append(r)
+            self.store.save_segments(project_name, serializable_results)
+            logger.info(f"Results saved for project {project_name}")
             return True
         except Exception as e:
             logger.error(f"Failed to save results: {str(e)}")
@@ -155,17 +172,14 @@ class SessionState:
     def load_results(self, project_name: Optional[str] = None) -> list:
         """加载分析结果"""
         if project_name is None:
-            project_name = st.session_state.get('current_project', 'default')
+            project_name = st.session_state.get('current_project') or 'default'
         
-        file_path = os.path.join(self.storage_path, f"{project_name}_results.json")
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    results = json.load(f)
-                logger.info(f"Results loaded from {file_path}")
-                return results
-            except Exception as e:
-                logger.error(f"Failed to load results: {str(e)}")
+        try:
+            results = self.store.load_segments(project_name)
+            logger.info(f"Loaded {len(results)} results for project {project_name}")
+            return results
+        except Exception as e:
+            logger.error(f"Failed to load results: {str(e)}")
         return []
     
     def navigate_to(self, page: str):
@@ -183,53 +197,27 @@ class SessionState:
     def get_project_list(self) -> List[str]:
         """获取所有可用项目的列表"""
         try:
-            # 每次都重新扫描目录，确保获取最新的项目列表
-            # 查找所有项目设置文件
-            pattern = os.path.join(self.storage_path, "*_settings.json")
-            files = glob.glob(pattern)
-            
-            # 提取项目名称
-            projects = []
-            for file in files:
-                base_name = os.path.basename(file)
-                # 从文件名 "project_name_settings.json" 中提取项目名
-                project_name = base_name.replace("_settings.json", "")
-                projects.append(project_name)
+            projects = self.store.list_projects()
             
             # 更新缓存
-            st.session_state["project_list"] = sorted(projects)
+            st.session_state["project_list"] = projects
             
             logger.info(f"Found {len(projects)} projects")
-            return sorted(projects)
+            return projects
         except Exception as e:
             logger.error(f"Failed to get project list: {str(e)}")
             return []
     
     def delete_project(self, project_name: str) -> bool:
-        """删除项目及其相关文件"""
+        """删除项目及其设置、URL和结果"""
         if not project_name:
             logger.error("尝试删除空项目名")
             return False
         
         try:
-            # 计数删除的文件数
-            deleted_count = 0
-            
-            # 删除项目设置文件
-            settings_file = os.path.join(self.storage_path, f"{project_name}_settings.json")
-            if os.path.exists(settings_file):
-                os.remove(settings_file)
-                logger.info(f"已删除设置文件: {settings_file}")
-                deleted_count += 1
-            else:
-                logger.warning(f"设置文件不存在: {settings_file}")
-            
-            # 删除项目结果文件
-            results_file = os.path.join(self.storage_path, f"{project_name}_results.json")
-            if os.path.exists(results_file):
-                os.remove(results_file)
-                logger.info(f"已删除结果文件: {results_file}")
-                deleted_count += 1
+            self.settings_persister.discard(project_name)
+            if not self.store.delete_project(project_name):
+                logger.warning(f"项目不存在: {project_name}")
             
             # 确保在会话中清除该项目的任何引用
             if st.session_state.get('current_project') == project_name:
@@ -241,15 +229,7 @@ class SessionState:
                 st.session_state.pop('project_list', None)
                 logger.info("已清除项目列表缓存")
             
-            # 给文件系统一些时间来完成操作
-            time.sleep(0.5)
-            
-            # 再次检查文件是否真的被删除
-            if os.path.exists(settings_file) or os.path.exists(results_file):
-                logger.error(f"文件删除后仍存在: {project_name}")
-                return False
-            
-            logger.info(f"项目 {project_name} 删除成功，共删除 {deleted_count} 个文件")
+            logger.info(f"项目 {project_name} 删除成功")
             return True
         except Exception as e:
             logger.error(f"删除项目 {project_name} 时出错: {str(e)}")
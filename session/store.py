@@ -0,0 +1,451 @@
+import os
+import glob
+import json
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 数据库结构版本（PRAGMA user_version），结构变化时递增并在 _migrate_schema 中补充升级步骤
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS projects (
+    name       TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    project TEXT NOT NULL REFERENCES projects (name) ON DELETE CASCADE,
+    key     TEXT NOT NULL,
+    value   TEXT NOT NULL,
+    PRIMARY KEY (project, key)
+);
+CREATE TABLE IF NOT EXISTS urls (
+    project  TEXT NOT NULL REFERENCES projects (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    url      TEXT NOT NULL,
+    PRIMARY KEY (project, position)
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    project    TEXT NOT NULL REFERENCES projects (name) ON DELETE CASCADE,
+    position   INTEGER NOT NULL,
+    dimension  TEXT,
+    keyword    TEXT,
+    score      REAL,
+    start_time REAL,
+    end_time   REAL,
+    source     TEXT,
+    text       TEXT,
+    extra      TEXT,
+    UNIQUE (project, position)
+);
+CREATE INDEX IF NOT EXISTS idx_segments_dimension ON segments (project, dimension, score);
+CREATE INDEX IF NOT EXISTS idx_segments_score ON segments (project, score);
+"""
+
+# 片段字典中单独建列（可索引、可查询）的字段：字典键 -> 列名，其余字段存入 extra(JSON)
+SEGMENT_COLUMNS = {
+    'dimension': 'dimension',
+    'keyword': 'keyword',
+    'score': 'score',
+    'start': 'start_time',
+    'end': 'end_time',
+    'source': 'source',
+    'text': 'text'
+}
+
+# query_segments 可用的排序方式 -> SQL 表达式
+SEGMENT_SORTS = {
+    'score': 'score',
+    'start': 'start_time',
+    'duration': '(end_time - start_time)',
+    'position': 'position'
+}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def _segment_row(segment: Dict[str, Any]) -> Tuple:
+    """片段字典 -> 各列的值（顺序同 SEGMENT_COLUMNS，最后一项为 extra）"""
+    values = [segment.get(key) for key in SEGMENT_COLUMNS]
+    extra = {k: v for k, v in segment.items() if k not in SEGMENT_COLUMNS}
+    return tuple(values) + (_dumps(extra) if extra else None,)
+
+
+def _segment_filter(project: str, dimension: Optional[str] = None, keyword: Optional[str] = None,
+                    min_score: Optional[float] = None, max_score: Optional[float] = None) -> Tuple[str, List]:
+    """
+    片段筛选条件 -> (WHERE 子句, 参数)
+
+    dimension 为空字符串时筛选未分类片段；keyword 在关键词和文本中做子串匹配
+    """
+    clauses, params = ["project = ?"], [project]
+    if dimension is not None:
+        if dimension:
+            clauses.append("dimension = ?")
+            params.append(dimension)
+        else:
+            clauses.append("(dimension IS NULL OR dimension = '')")
+    if keyword:
+        pattern = '%' + keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        clauses.append("(keyword LIKE ? ESCAPE '\\' OR text LIKE ? ESCAPE '\\')")
+        params.extend([pattern, pattern])
+    if min_score is not None:
+        clauses.append("score >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        clauses.append("score <= ?")
+        params.append(max_score)
+    return " AND ".join(clauses), params
+
+
+def _segment_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    """数据库行 -> 片段字典（为空的列不出现在字典中，与原始数据保持一致）"""
+    segment = json.loads(row['extra']) if row['extra'] else {}
+    for key, column in SEGMENT_COLUMNS.items():
+        if row[column] is not None:
+            segment[key] = row[column]
+    segment['id'] = row['id']
+    return segment
+
+
+class ProjectStore:
+    """
+    基于 SQLite 的项目存储：项目、设置、URL 列表和分析结果片段
+
+    设置按顶层键逐行保存，URL 和结果片段按位置逐行保存，每次保存只写入发生变化的行，
+    并在同一事务中完成。数据库使用 WAL 模式，多个 Streamlit 会话可以同时读写。
+    """
+
+    def __init__(self, path: str = os.path.join("data", "session", "projects.db")):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            # WAL 模式记录在数据库文件中，只需设置一次；读操作不再被写事务阻塞
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._migrate_schema(conn)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _migrate_schema(self, conn: sqlite3.Connection):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 2:
+            # 关键词按子串（LIKE '%关键词%'）搜索，用不上 (project, keyword) 索引
+            conn.execute("DROP INDEX IF EXISTS idx_segments_keyword")
+        if version < SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection, project: str):
+        now = time.time()
+        conn.execute(
+            "INSERT INTO projects (name, created_at, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET updated_at = excluded.updated_at",
+            (project, now, now)
+        )
+
+    # ---- 项目 ----
+
+    def list_projects(self) -> List[str]:
+        with self._connect() as conn:
+            return [row['name'] for row in conn.execute("SELECT name FROM projects ORDER BY name")]
+
+    def has_project(self, project: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM projects WHERE name = ?", (project,)).fetchone() is not None
+
+    def delete_project(self, project: str) -> bool:
+        """删除项目及其设置、URL 和结果片段，项目不存在时返回 False"""
+        with self._transaction() as conn:
+            deleted = conn.execute("DELETE FROM projects WHERE name = ?", (project,)).rowcount
+        return deleted > 0
+
+    # ---- 设置 ----
+
+    def save_settings(self, project: str, settings: Dict[str, Any]) -> int:
+        """
+        保存项目设置：只写入值发生变化的顶层键，删除不再存在的键；
+        settings['urls'] 单独按行保存在 urls 表
+
+        Returns:
+            int: 写入或删除的行数
+        """
+        with self._transaction() as conn:
+            return self._save_settings(conn, project, settings)
+
+    def _save_settings(self, conn: sqlite3.Connection, project: str, settings: Dict[str, Any]) -> int:
+        """在调用方的事务中保存项目设置（同 save_settings）"""
+        settings = dict(settings)
+        urls = settings.pop('urls', None)
+        rows = {key: _dumps(value) for key, value in settings.items()}
+        self._touch(conn, project)
+        existing = {row['key']: row['value'] for row in
+                    conn.execute("SELECT key, value FROM settings WHERE project = ?", (project,))}
+        changed = [(project, key, value) for key, value in rows.items() if existing.get(key) != value]
+        removed = [(project, key) for key in existing if key not in rows]
+        conn.executemany(
+            "INSERT INTO settings (project, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (project, key) DO UPDATE SET value = excluded.value",
+            changed
+        )
+        conn.executemany("DELETE FROM settings WHERE project = ? AND key = ?", removed)
+        written = len(changed) + len(removed)
+        if urls is not None:
+            written += self._save_urls(conn, project, list(urls))
+        return written
+
+    def load_settings(self, project: str) -> Optional[Dict[str, Any]]:
+        """读取项目设置（包含 urls），项目不存在时返回 None"""
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM projects WHERE name = ?", (project,)).fetchone() is None:
+                return None
+            settings = {row['key']: json.loads(row['value']) for row in
+                        conn.execute("SELECT key, value FROM settings WHERE project = ?", (project,))}
+            settings['urls'] = [row['url'] for row in conn.execute(
+                "SELECT url FROM urls WHERE project = ? ORDER BY position", (project,))]
+        return settings
+
+    def update_setting(self, project: str, key: str, value: Any):
+        """只更新一个设置项"""
+        with self._transaction() as conn:
+            self._touch(conn, project)
+            if key == 'urls':
+                self._save_urls(conn, project, list(value))
+                return
+            conn.execute(
+                "INSERT INTO settings (project, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (project, key) DO UPDATE SET value = excluded.value",
+                (project, key, _dumps(value))
+            )
+
+    @staticmethod
+    def _save_urls(conn: sqlite3.Connection, project: str, urls: List[str]) -> int:
+        """按位置比较新旧 URL 列表，只重写第一个不同位置之后的行（追加URL时只插入新行）"""
+        existing = [row['url'] for row in conn.execute(
+            "SELECT url FROM urls WHERE project = ? ORDER BY position", (project,))]
+        common = 0
+        for old, new in zip(existing, urls):
+            if old != new:
+                break
+            common += 1
+        if common == len(existing) == len(urls):
+            return 0
+        conn.execute("DELETE FROM urls WHERE project = ? AND position >= ?", (project, common))
+        conn.executemany("INSERT INTO urls (project, position, url) VALUES (?, ?, ?)",
+                         [(project, i, url) for i, url in enumerate(urls[common:], start=common)])
+        return (len(existing) - common) + (len(urls) - common)
+
+    # ---- 结果片段 ----
+
+    def save_segments(self, project: str, segments: List[Dict[str, Any]]) -> int:
+        """
+        保存项目的全部结果片段：按位置与已有片段比较，只更新变化的行、插入新增的行、
+        删除多余的行（片段字典中的 'id' 字段由存储分配，不参与比较）
+
+        Returns:
+            int: 写入或删除的行数
+        """
+        with self._transaction() as conn:
+            written = self._save_segments(conn, project, segments)
+        logger.info(f"项目 {project} 保存结果片段：共 {len(segments)} 个，写入 {written} 行")
+        return written
+
+    def _save_segments(self, conn: sqlite3.Connection, project: str, segments: List[Dict[str, Any]]) -> int:
+        """在调用方的事务中保存结果片段（同 save_segments）"""
+        columns = list(SEGMENT_COLUMNS.values()) + ['extra']
+        rows = [_segment_row({k: v for k, v in segment.items() if k != 'id'}) for segment in segments]
+        self._touch(conn, project)
+        existing = {row['position']: tuple(row[c] for c in columns) for row in conn.execute(
+            f"SELECT position, {', '.join(columns)} FROM segments WHERE project = ?", (project,))}
+        changed = [row + (project, position) for position, row in enumerate(rows)
+                   if position in existing and existing[position] != row]
+        added = [(project, position) + row for position, row in enumerate(rows) if position not in existing]
+        conn.executemany(
+            f"UPDATE segments SET {', '.join(f'{c} = ?' for c in columns)} "
+            "WHERE project = ? AND position = ?",
+            changed
+        )
+        conn.executemany(
+            f"INSERT INTO segments (project, position, {', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * (len(columns) + 2))})",
+            added
+        )
+        removed = conn.execute("DELETE FROM segments WHERE project = ? AND position >= ?",
+                               (project, len(rows))).rowcount
+        return len(changed) + len(added) + removed
+
+    def load_segments(self, project: str) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM segments WHERE project = ? ORDER BY position", (project,)).fetchall()
+        return [_segment_dict(row) for row in rows]
+
+    def query_segments(self, project: str, dimension: Optional[str] = None, keyword: Optional[str] = None,
+                       min_score: Optional[float] = None, max_score: Optional[float] = None,
+                       sort: str = 'score', descending: bool = True,
+                       offset: int = 0, limit: Optional[int] = 50) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        分页查询结果片段：按维度、关键词和分数区间筛选，在数据库中排序和分页
+
+        Args:
+            sort: 排序方式，见 SEGMENT_SORTS；相同时按原有顺序
+            limit: 每页片段数，None 表示返回全部符合条件的片段
+
+        Returns:
+            (当前页的片段, 符合条件的片段总数)
+        """
+        if sort not in SEGMENT_SORTS:
+            raise ValueError(f"Unsupported sort: {sort}")
+        where, params = _segment_filter(project, dimension, keyword, min_score, max_score)
+        order = f"{SEGMENT_SORTS[sort]} {'DESC' if descending else 'ASC'}, position"
+        page = "" if limit is None else " LIMIT ? OFFSET ?"
+        page_params = [] if limit is None else [limit, max(0, offset)]
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM segments WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT * FROM segments WHERE {where} ORDER BY {order}{page}",
+                                params + page_params).fetchall()
+        return [_segment_dict(row) for row in rows], total
+
+    def count_segments(self, project: str, dimension: Optional[str] = None, keyword: Optional[str] = None,
+                       min_score: Optional[float] = None, max_score: Optional[float] = None) -> int:
+        where, params = _segment_filter(project, dimension, keyword, min_score, max_score)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM segments WHERE {where}", params).fetchone()[0]
+
+    def segment_summary(self, project: str, dimension: Optional[str] = None, keyword: Optional[str] = None,
+                        min_score: Optional[float] = None, max_score: Optional[float] = None) -> Dict[str, Any]:
+        """
+        结果片段的汇总统计（在数据库中聚合，不加载片段）
+
+        Returns:
+            Dict: count、avg_score、min_score、max_score、total_duration，
+                  以及 dimensions（按片段数从多到少的各维度 dimension/count/avg_score/total_duration）
+        """
+        where, params = _segment_filter(project, dimension, keyword, min_score, max_score)
+        aggregates = ("COUNT(*) AS count, AVG(score) AS avg_score, MIN(score) AS min_score, "
+                      "MAX(score) AS max_score, COALESCE(SUM(end_time - start_time), 0) AS total_duration")
+        with self._connect() as conn:
+            summary = dict(conn.execute(f"SELECT {aggregates} FROM segments WHERE {where}", params).fetchone())
+            summary['dimensions'] = [dict(row) for row in conn.execute(
+                f"SELECT COALESCE(dimension, '') AS dimension, {aggregates} FROM segments WHERE {where} "
+                "GROUP BY COALESCE(dimension, '') ORDER BY count DESC, dimension", params)]
+        return summary
+
+    def update_segment(self, project: str, segment_id: int, fields: Dict[str, Any]) -> bool:
+        """更新单个片段的部分字段，片段不存在时返回 False"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT * FROM segments WHERE project = ? AND id = ?",
+                               (project, segment_id)).fetchone()
+            if row is None:
+                return False
+            segment = _segment_dict(row)
+            segment.pop('id')
+            segment.update(fields)
+            columns = list(SEGMENT_COLUMNS.values()) + ['extra']
+            conn.execute(f"UPDATE segments SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?",
+                         _segment_row(segment) + (segment_id,))
+            self._touch(conn, project)
+        return True
+
+    def delete_segments(self, project: str, segment_ids: List[int]) -> int:
+        """删除指定片段并重新编排位置，返回删除的片段数"""
+        with self._transaction() as conn:
+            deleted = 0
+            for segment_id in segment_ids:
+                deleted += conn.execute("DELETE FROM segments WHERE project = ? AND id = ?",
+                                        (project, segment_id)).rowcount
+            if deleted:
+                # 先整体平移到负数区间再重新编号，避免与 UNIQUE (project, position) 冲突
+                conn.execute("UPDATE segments SET position = -1 - position WHERE project = ?", (project,))
+                ids = [row['id'] for row in conn.execute(
+                    "SELECT id FROM segments WHERE project = ? ORDER BY position DESC", (project,))]
+                conn.executemany("UPDATE segments SET position = ? WHERE id = ?",
+                                 [(position, segment_id) for position, segment_id in enumerate(ids)])
+                self._touch(conn, project)
+        return deleted
+
+    # ---- 从 JSON 文件迁移 ----
+
+    def migrate_json(self, directory: str) -> int:
+        """
+        一次性导入旧版的 {项目}_settings.json 和 {项目}_results.json；
+        已存在于数据库中的项目不会被覆盖，原 JSON 文件保留作为备份
+
+        Returns:
+            int: 导入的项目数
+        """
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone() is not None:
+                return 0
+
+        projects = set()
+        for suffix in ("_settings.json", "_results.json"):
+            for path in glob.glob(os.path.join(directory, f"*{suffix}")):
+                projects.add(os.path.basename(path)[:-len(suffix)])
+
+        imported = failed = 0
+        for project in sorted(projects):
+            if self.has_project(project):
+                continue
+            try:
+                settings, segments = None, None
+                settings_path = os.path.join(directory, f"{project}_settings.json")
+                results_path = os.path.join(directory, f"{project}_results.json")
+                if os.path.exists(settings_path):
+                    with open(settings_path, 'r', encoding='utf-8') as f:
+                        settings = json.load(f)
+                if os.path.exists(results_path):
+                    with open(results_path, 'r', encoding='utf-8') as f:
+                        segments = json.load(f)
+                # 设置、URL 和结果片段在同一事务中导入，任何一步失败都不会留下不完整的项目
+                with self._transaction() as conn:
+                    if conn.execute("SELECT 1 FROM projects WHERE name = ?", (project,)).fetchone() is not None:
+                        continue
+                    if settings is not None:
+                        self._save_settings(conn, project, settings)
+                    if segments is not None:
+                        self._save_segments(conn, project, segments)
+                imported += 1
+            except Exception as e:
+                logger.error(f"迁移项目 {project} 失败: {str(e)}")
+                failed += 1
+
+        # 有项目迁移失败时不记录完成标记，下次启动时重试（已导入的项目会被跳过）
+        if failed:
+            return imported
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (str(time.time()),))
+        if imported:
+            logger.info(f"已从 {directory} 迁移 {imported} 个项目到 {self.path}")
+        return imported
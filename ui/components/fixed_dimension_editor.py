@@ -4,6 +4,8 @@ import logging
 import time
 import os
 from typing import Dict, List, Any
+
+from utils.file_utils import atomic_write_json
 import urllib.parse
 
 logger = logging.getLogger(__name__)
@@ -396,15 +398,13 @@ def persist_dimensions():
         data_dir = os.path.join('data', 'dimensions')
         os.makedirs(data_dir, exist_ok=True)
         
-        # 保存当前维度结构
+        # 保存当前维度结构（原子写入，中途崩溃不会损坏已有文件）
         current_dimensions_path = os.path.join(data_dir, 'current_dimensions.json')
-        with open(current_dimensions_path, 'w', encoding='utf-8') as f:
-            json.dump(st.session_state.dimensions, f, ensure_ascii=False, indent=2)
+        atomic_write_json(current_dimensions_path, st.session_state.dimensions)
             
         # 保存当前权重设置
         current_weights_path = os.path.join(data_dir, 'current_weights.json')
-        with open(current_weights_path, 'w', encoding='utf-8') as f:
-            json.dump(st.session_state.weights, f, ensure_ascii=False, indent=2)
+        atomic_write_json(current_weights_path, st.session_state.weights)
             
         logger.info("成功持久化维度结构和权重设置")
     except Exception as e:
@@ -0,0 +1,25 @@
+import os
+import json
+import uuid
+from typing import Any
+
+
+def atomic_write_json(path: str, data: Any, indent: int = 2) -> str:
+    """
+    原子写入 JSON 文件：先写同目录下的临时文件并落盘，再用 os.replace 替换目标文件，
+    写入过程中崩溃不会留下半个文件（读者要么看到旧内容，要么看到新内容）
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
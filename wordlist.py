@@ -5,6 +5,8 @@ import logging
 from typing import Dict, List, Optional, Union, Any
 from dataclasses import dataclass
 
+from utils.file_utils import atomic_write_json
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -154,8 +156,7 @@ class WordlistManager:
                 
         id_mapping[name] = vocabulary_id
         
-        with open(id_mapping_file, 'w', encoding='utf-8') as f:
-            json.dump(id_mapping, f, ensure_ascii=False, indent=2)
+        atomic_write_json(id_mapping_file, id_mapping)
             
     def _delete_local_wordlist(self, vocabulary_id: str) -> None:
         """从本地文件删除热词库"""
@@ -176,8 +177,7 @@ class WordlistManager:
                         del id_mapping[name]
                         break
                         
-                with open(id_mapping_file, 'w', encoding='utf-8') as f:
-                    json.dump(id_mapping, f, ensure_ascii=False, indent=2)
+                atomic_write_json(id_mapping_file, id_mapping)
                     
             except Exception as e:
                 logger.error(f"更新ID映射文件失败: {str(e)}")